@@ -5,9 +5,8 @@ Simple script to check the most recent NASDAQ data availability
 and calculate how many days behind today it is.
 """
 
-import pandas as pd
-import requests
 import os
+import sys
 from datetime import datetime, date
 import warnings
 
@@ -19,6 +18,10 @@ except ImportError:
 if load_dotenv:
     load_dotenv()
 
+# Stdlib-only FRED probe (no pandas/requests), so the check starts in well under a second
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from src.freshness import probe
+
 # Suppress warnings for cleaner output
 warnings.filterwarnings('ignore')
 
@@ -33,58 +36,24 @@ def fetch_nasdaq_from_fred(series_id="NASDAQCOM", days_back=10):
     Returns:
         tuple: (most_recent_date, most_recent_value) or (None, None) if failed
     """
-    api_key = os.environ.get("FRED_API_KEY")
-    
-    if not api_key:
+    if not os.environ.get("FRED_API_KEY"):
         print("❌ Error: FRED_API_KEY not found in environment variables")
         return None, None
     
-    # Calculate date range (look back from today)
-    today = date.today()
-    start_date = (today - pd.Timedelta(days=days_back)).strftime("%Y-%m-%d")
-    end_date = today.strftime("%Y-%m-%d")
-    
-    print(f"🔍 Checking NASDAQ data from {start_date} to {end_date}...")
+    print(f"🔍 Checking NASDAQ data for the last {days_back} days...")
     
     try:
-        # FRED API endpoint
-        url = "https://api.stlouisfed.org/fred/series/observations"
-        params = {
-            "series_id": series_id,
-            "api_key": api_key,
-            "file_type": "json",
-            "observation_start": start_date,
-            "observation_end": end_date,
-            "sort_order": "desc",  # Most recent first
-            "limit": 10
-        }
-        
-        response = requests.get(url, params=params, timeout=10)
-        response.raise_for_status()
-        
-        data = response.json()
-        observations = data.get("observations", [])
-        
-        if not observations:
-            print("❌ No observations returned from FRED API")
-            return None, None
-        
-        # Find most recent non-missing observation
-        for obs in observations:
-            if obs["value"] != "." and obs["value"]:
-                most_recent_date = pd.to_datetime(obs["date"]).date()
-                most_recent_value = float(obs["value"])
-                return most_recent_date, most_recent_value
-        
-        print("❌ No valid (non-missing) observations found")
-        return None, None
-        
-    except requests.RequestException as e:
-        print(f"❌ Network error: {e}")
-        return None, None
-    except Exception as e:
+        # Conditional: one series request when the FRED vintage is unchanged since the last check
+        info = probe(series_id, days_back=days_back)
+    except RuntimeError as e:
         print(f"❌ Error fetching data: {e}")
         return None, None
+    
+    if info["latest_date"] is None:
+        print("❌ No valid (non-missing) observations found")
+        return None, None
+    print(f"   FRED vintage {info['vintage']} ({info['requests']} request(s))")
+    return date.fromisoformat(info["latest_date"]), info["value"]
 
 def calculate_data_lag():
     """
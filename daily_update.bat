@@ -33,11 +33,18 @@ if %errorlevel% neq 0 (
     pause
     exit /b 1
 )
+xcopy /y /i "chart_payloads\*.json" "src\API_Usage2_0\web_6\public\chart_payloads\"
+if %errorlevel% neq 0 (
+    echo ERROR: Failed to copy chart payloads
+    pause
+    exit /b 1
+)
 
 echo.
 echo Step 4: Adding files to git...
 git add signals_with_equity.csv
 git add src\API_Usage2_0\web_6\public\signals_with_equity.csv
+git add src\API_Usage2_0\web_6\public\chart_payloads
 git add .
 
 echo.
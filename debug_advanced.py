@@ -28,22 +28,25 @@ class MLDebugger:
         
     def load_and_analyze_data(self, start_date="2000-01-01"):
         """Ladda data och skapa grundläggande analys."""
-        from src.fetch_data import fetch_sp500_from_fred
-        from src.features import build_feature_set
         from src.labels import make_std_labels
         from src.config import LABEL_HORIZON
-        
+        from src.stage_cache import sp500_pipeline
+
+        # fetch/features/labels cachas på disk (src/stage_cache.py), så omkörningar går direkt
+        pipe = sp500_pipeline(start=start_date, label_fn=make_std_labels,
+                              label_params={"horizon": LABEL_HORIZON}, log=print)
+
         # Ladda rådata
         print("🔄 Laddar rådata från FRED...")
-        self.df_raw = fetch_sp500_from_fred(start=start_date)
+        self.df_raw = pipe.run("fetch")
         
         # Bygg features
         print("🔄 Bygger features...")
-        self.df_features = build_feature_set(self.df_raw)
+        self.df_features = pipe.run("features")
         
         # Skapa labels
         print("🔄 Skapar labels...")
-        self.df_labeled = make_std_labels(self.df_features, horizon=LABEL_HORIZON)
+        self.df_labeled = pipe.run("labels")
         
         # Definiera feature kolumner
         exclude = {"Date","Close","label","fwd_return","vol_h"}
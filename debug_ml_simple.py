@@ -28,11 +28,10 @@ if 'FRED_API_KEY' not in os.environ:
 import pandas as pd
 import numpy as np
 import matplotlib.pyplot as plt
-from src.fetch_data import fetch_sp500_from_fred
-from src.features import build_feature_set
 from src.labels import make_std_labels
 from src.config import LABEL_HORIZON
 from src.model import make_mlp_bagging, fit_predict
+from src.stage_cache import sp500_pipeline
 
 def main():
     """Main debugging function - set breakpoints here!"""
@@ -40,7 +39,10 @@ def main():
     
     # BREAKPOINT 1: Set breakpoint here to start debugging
     print("🔄 Loading S&P 500 data...")
-    df_raw = fetch_sp500_from_fred(start="2020-01-01")  # Smaller dataset for faster debugging
+    # fetch/features/labels cachas på disk (src/stage_cache.py), så omkörningar går direkt
+    pipe = sp500_pipeline(start="2020-01-01", label_fn=make_std_labels,  # Smaller dataset for faster debugging
+                          label_params={"horizon": LABEL_HORIZON}, log=print)
+    df_raw = pipe.run("fetch")
     
     # BREAKPOINT 2: Inspect raw data
     print(f"Raw data shape: {df_raw.shape}")
@@ -49,7 +51,7 @@ def main():
     
     # BREAKPOINT 3: Feature building
     print("🔄 Building features...")
-    df_features = build_feature_set(df_raw)
+    df_features = pipe.run("features")
     
     # BREAKPOINT 4: Inspect features
     print(f"Features shape: {df_features.shape}")
@@ -58,7 +60,7 @@ def main():
     
     # BREAKPOINT 5: Label creation
     print("🔄 Creating labels...")
-    df_labeled = make_std_labels(df_features, horizon=LABEL_HORIZON)
+    df_labeled = pipe.run("labels")
     
     # BREAKPOINT 6: Inspect labeled data
     exclude = {"Date", "Close", "label", "fwd_return", "vol_h"}
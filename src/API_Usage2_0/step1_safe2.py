@@ -1,5 +1,6 @@
 import os
 import sys
+import time
 
 # Add the project root to Python path
 project_root = os.path.join(os.path.dirname(__file__), '..', '..')
@@ -19,16 +20,32 @@ from sklearn.utils.class_weight import compute_sample_weight
 
 # Imports from this project
 try:
-    from src.features import build_feature_set
-    from src.fetch_data import fetch_sp500_from_fred
-    from src.labels import labels_give_data_set_with_0_or_1
-    from src.model import make_mlp_bagging, make_hgb
+    from src.model import make_mlp_bagging, make_hgb, make_online, fit_model, OnlineLogistic
+    from src.instrumentation import timed, timer, increment, profiled_run
+    from src.feature_matrix import FeatureMatrix
+    from src.stage_cache import sp500_pipeline
+    from src.purged_cv import walk_forward_folds, cross_val_oof_proba
+    from src.drift import DriftRetrainScheduler
+    from src.serving import SignalService
+    from src.freshness import has_new_data, mark_processed
+    from src.run_store import RunStore
+    from src.training_budget import TrainingBudget
+    from src.trading_calendar import TradingCalendar
+    from src.config import LABEL_HORIZON, FRED_SERIES_ID
 except ImportError:
     sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
-    from features import build_feature_set
-    from fetch_data import fetch_sp500_from_fred
-    from labels import labels_give_data_set_with_0_or_1
-    from model import make_mlp_bagging, make_hgb
+    from model import make_mlp_bagging, make_hgb, make_online, fit_model, OnlineLogistic
+    from instrumentation import timed, timer, increment, profiled_run
+    from feature_matrix import FeatureMatrix
+    from stage_cache import sp500_pipeline
+    from purged_cv import walk_forward_folds, cross_val_oof_proba
+    from drift import DriftRetrainScheduler
+    from serving import SignalService
+    from freshness import has_new_data, mark_processed
+    from run_store import RunStore
+    from training_budget import TrainingBudget
+    from trading_calendar import TradingCalendar
+    from config import LABEL_HORIZON, FRED_SERIES_ID
 
 
 # --- Global state (mirrors step1) ---
@@ -41,7 +58,84 @@ df_signals = pd.DataFrame(columns=["Date", "Close", "Signal"])  # will gain extr
 # Model/threshold selection configuration via env
 MODEL_NAME = os.environ.get("STEP1_MODEL", "mlp_bagging").lower()
 
+# Threshold validation on the last rows: out-of-fold scores from purged walk-forward CV ("oof",
+# default), out-of-bag scores from the bagging fit itself ("oob", mlp_bagging only; cheaper but
+# not leak-free, since members trained on neighbouring rows share their 70-day labels) or
+# in-sample scores ("insample")
+THRESH_SOURCE = os.environ.get("STEP1_THRESH_SOURCE", "oof").lower()
+THRESH_VALIDATION_ROWS = 300
+CV_FOLDS = int(os.environ.get("STEP1_CV_FOLDS", "3"))
+CV_JOBS = int(os.environ.get("STEP1_CV_JOBS", "-1"))
 
+# Retrain schedule: "fixed" (every 30 days) or "drift" (on feature/proba drift or max age, see drift.py)
+RETRAIN_MODE = os.environ.get("STEP1_RETRAIN", "fixed").lower()
+retrain_scheduler = DriftRetrainScheduler() if RETRAIN_MODE == "drift" else None
+
+# Snapshot for the signal service (python -m src.serving)
+SERVING_STATE_PATH = os.environ.get("STEP1_SERVING_STATE", "serving_state.pkl")
+
+# Skip the whole run when FRED has no new observation/vintage since the last run (see freshness.py)
+SKIP_UNCHANGED = os.environ.get("STEP1_SKIP_UNCHANGED", "1").lower() not in ("0", "false", "no")
+
+
+def _env_seconds(name):
+    try:
+        value = float(os.environ.get(name, "") or 0)
+    except ValueError:
+        return None
+    return value if value > 0 else None
+
+
+# Time budget for training ("anytime" mode, see training_budget.py): seconds per model fit
+# and/or wall-clock seconds for the whole run; unset or 0 = no limit
+training_budget = TrainingBudget(per_fit=_env_seconds("STEP1_FIT_BUDGET"),
+                                 per_run=_env_seconds("STEP1_RUN_BUDGET"))
+_skipped_slot = None  # last retrain slot skipped because the run budget was spent
+
+# Online model (STEP1_MODEL=online): number of leading training rows already absorbed
+_online_rows = 0
+
+# Feature matrix built once per df_feat_label; per-day slices are views into it
+_fm = None
+_fm_source = None
+
+# Trading calendar of the full price series (set by something()); the label of a row needs the
+# next LABEL_HORIZON closes, so it is known on day d only if those closes are on or before d
+_price_calendar = None
+
+# (latest_date, vintage) from the freshness probe in main(); part of the fetch cache key so a
+# new observation or revision later the same day is fetched instead of read from the cache
+_fred_vintage = None
+
+
+def _pipeline(start):
+    return sp500_pipeline(start=start, vintage=_fred_vintage)
+
+
+def _feature_matrix(df_feat_label: pd.DataFrame) -> FeatureMatrix:
+    global _fm, _fm_source
+    if _fm is None or _fm_source is not df_feat_label:
+        feature_cols = [c for c in df_feat_label.columns if c not in ("label", "Close", "Date")]
+        _fm = FeatureMatrix.from_frame(df_feat_label, feature_cols)
+        _fm_source = df_feat_label
+    return _fm
+
+
+def _matured_end(fm: FeatureMatrix, date) -> int:
+    """
+    Rows [0, end) of fm whose labels are known on date: Date <= the trading day LABEL_HORIZON
+    rows before date. Without the price calendar fm's own rows are counted (conservative at
+    the end of the series, where the unlabeled tail is missing from fm).
+    """
+    if _price_calendar is None:
+        return max(fm.position(date, side="right") - LABEL_HORIZON, 0)
+    cutoff = _price_calendar.position(date, side="right") - 1 - LABEL_HORIZON
+    if cutoff < 0:
+        return 0
+    return fm.position(_price_calendar.date(cutoff), side="right")
+
+
+@timed("step1.threshold_search")
 def _choose_threshold(
     y_true: np.ndarray,
     y_score: np.ndarray,
@@ -89,6 +183,7 @@ def _choose_threshold(
 
 
 def something(start: str = None):
+    global _price_calendar
     # Allow overriding fetch start and years-back via env
     fetch_start = os.environ.get("STEP1_FETCH_START", None)
     years_back_env = os.environ.get("STEP1_YEARS_BACK", "2")
@@ -97,9 +192,11 @@ def something(start: str = None):
     except Exception:
         years_back = 2
 
-    df = fetch_sp500_from_fred(start=fetch_start or start or "1999-01-01")
-    df_feat = build_feature_set(df, price_col="Close")
-    df_feat_label = labels_give_data_set_with_0_or_1(df_feat, price_col="Close")
+    # fetch -> features -> labels via stegcachen (räknas bara om när data, parametrar eller kod ändrats)
+    pipe = _pipeline(fetch_start or start or "1999-01-01")
+    df = pipe.run("fetch")
+    _price_calendar = TradingCalendar(df["Date"])
+    df_feat_label = pipe.run("labels")
     df_feat_label = df_feat_label.dropna(subset=["label"])  # only rows with labels for training
 
     feature_cols = [c for c in df_feat_label.columns if c not in ("label", "Close", "Date")]
@@ -112,12 +209,49 @@ def something(start: str = None):
     date_most_recent = df["Date"].max()
 
     loop_start = date_most_recent - pd.DateOffset(years=years_back)
-    for date in pd.date_range(end=date_most_recent, start=loop_start):
+    loop_dates = pd.date_range(end=date_most_recent, start=loop_start)
+    if training_budget.enabled:
+        # initial fit + a retrain every 30 days
+        training_budget.plan((len(loop_dates) // 30 + 1) * _fits_per_retrain())
+    for date in loop_dates:
         get_predictions(date, df_feat_label)
 
+    if retrain_scheduler is not None:
+        summary = retrain_scheduler.summary()
+        increment("retrain.fits", summary["fits"])
+        increment("retrain.skipped", summary["skipped"])
+        print(f"Drift-triggered retraining: {summary['fits']} fits, {summary['skipped']} fixed "
+              f"30-day retrains skipped, triggers {summary['reasons']}")
+
+
+def _predict_proba(X):
+    """clf.predict_proba with timing and a predict-call counter."""
+    increment("model.predict_calls")
+    with timer("step1.predict"):
+        return clf.predict_proba(X)
+
+
+def _fits_per_retrain():
+    """Model fit plus, unless the threshold comes from OOB or in-sample scores, the CV fits."""
+    uses_cv = THRESH_SOURCE != "insample" and not (THRESH_SOURCE == "oob" and MODEL_NAME == "mlp_bagging")
+    return 2 if uses_cv else 1
 
+
+def _record_fit(kind, start, allowance, info=None):
+    """Log a fit against the training budget (no-op without STEP1_FIT_BUDGET/STEP1_RUN_BUDGET)."""
+    if allowance is None:
+        return
+    training_budget.record(kind, time.perf_counter() - start, info, allowance)
+    if info is not None and info.get("truncated"):
+        increment("budget.truncated_fits")
+
+
+@timed("step1.fit_model")
 def _fit_model(X, Y):
-    global clf
+    global clf, _online_rows
+    increment("model.fit_calls")
+    allowance = training_budget.allowance()
+    start = time.perf_counter()
     if MODEL_NAME == "hgb":
         y_arr = np.asarray(Y).astype(int)
         classes, counts = np.unique(y_arr, return_counts=True)
@@ -130,23 +264,84 @@ def _fit_model(X, Y):
             clf = make_hgb(early_stopping=False)
         else:
             clf = make_hgb()
-        # manual balanced weights: n / (k * n_c)
-        cw = {c: (n / (k * cnt)) for c, cnt in zip(classes, counts)}
-        sw = np.array([cw[int(c)] for c in y_arr], dtype=float)
-        clf.fit(X, y_arr, sample_weight=sw)
+        # balanced weights n / (k * n_c), boosting iterations capped by the time budget
+        fit_model(clf, X, y_arr, time_budget=allowance)
+    elif MODEL_NAME == "online":
+        if isinstance(clf, OnlineLogistic):
+            # keep learning from where we left off instead of retraining from scratch
+            _absorb_new_rows(X, Y, len(Y))
+            return
+        clf = fit_model(make_online(), X, np.asarray(Y).astype(int), time_budget=allowance)
+        _online_rows = len(Y)
     else:
-        clf = make_mlp_bagging()
+        clf = make_mlp_bagging(oob_proba=THRESH_SOURCE == "oob", oob_rows=THRESH_VALIDATION_ROWS)
         y_arr = np.asarray(Y).astype(int)
-        clf.fit(X, y_arr)
+        fit_model(clf, X, y_arr, time_budget=allowance)
+    _record_fit("fit", start, allowance, getattr(clf, "budget_info_", None))
+
 
+def _absorb_new_rows(X, Y, n_rows):
+    """
+    Online model: partial_fit on rows [_online_rows, n_rows) of the (growing) training set of
+    matured labels; _online_rows only advances to the last row whose label is known.
+    """
+    global _online_rows
+    if n_rows <= _online_rows:
+        return
+    increment("model.partial_fit_calls")
+    with timer("step1.partial_fit"):
+        clf.partial_fit(X[_online_rows:n_rows], np.asarray(Y[_online_rows:n_rows]).astype(int))
+    _online_rows = n_rows
 
+
+def _validation_scores(X, Y):
+    """
+    (y, score) för tröskelvalet på de senaste THRESH_VALIDATION_ROWS raderna.
+    X, Y är de rader vars labels redan är kända (se _matured_end), så valideringsraderna
+    tittar inte förbi dagens datum.
+    STEP1_THRESH_SOURCE=oof (default): out-of-fold-sannolikheter från purged walk-forward CV,
+    dvs. modeller som inte sett raderna och vars träningslabels inte överlappar dem.
+    STEP1_THRESH_SOURCE=oob: out-of-bag-sannolikheter som baggingen samlade under fit
+    (clf.oob_proba_), dvs. ingen extra träning eller predict-körning. Inte läckfritt: en
+    OOB-rad poängsätts av medlemmar som tränats på grannrader vars labels överlappar dess.
+    Andra modeller saknar OOB och använder då oof.
+    STEP1_THRESH_SOURCE=insample: den tränade modellens egna sannolikheter (tidigare beteende).
+    """
+    oob = getattr(clf, "oob_proba_", None)
+    if THRESH_SOURCE == "oob" and oob is not None and len(oob) == len(Y):
+        increment("threshold.oob")
+        yv, score = Y[-THRESH_VALIDATION_ROWS:], oob[-THRESH_VALIDATION_ROWS:, 1]
+        ok = np.isfinite(score)
+        return yv[ok], score[ok]
+    if THRESH_SOURCE == "insample":
+        return Y[-THRESH_VALIDATION_ROWS:], _predict_proba(X[-THRESH_VALIDATION_ROWS:])[:, 1]
+    folds = walk_forward_folds(len(Y), n_folds=CV_FOLDS, test_size=THRESH_VALIDATION_ROWS // CV_FOLDS,
+                               purge=LABEL_HORIZON, min_train=100)
+    if not folds:
+        return Y[:0], np.empty(0)
+    allowance = training_budget.allowance()
+    start = time.perf_counter()
+    oof, _ = cross_val_oof_proba(X, Y, folds, model=MODEL_NAME, n_jobs=CV_JOBS, time_budget=allowance)
+    _record_fit("cv", start, allowance)
+    ok = np.isfinite(oof)
+    return Y[ok], oof[ok]
+
+
+def _select_threshold(X, Y, **policy):
+    yv, yv_score = _validation_scores(X, Y)
+    if len(yv) > 5:
+        return _choose_threshold(yv, yv_score, **policy)
+    return 0.3
+
+
+@timed("step1.get_predictions")
 def get_predictions(date_most_recent: pd.Timestamp, df_feat_label: pd.DataFrame):
     """Safe fix #2 (no look-ahead on retrain days):
     - If retrain is due, first predict the current date with the OLD model (using the last threshold),
       record that signal, then retrain and retune threshold for future days.
     - If no retrain, predict with the current model.
     """
-    global clf, last_train_date, y_proba_storage, df_signals, decision_threshold
+    global clf, last_train_date, y_proba_storage, df_signals, decision_threshold, _skipped_slot
 
     # env controls
     threshold_env = os.environ.get("STEP1_THRESHOLD", "")
@@ -155,42 +350,37 @@ def get_predictions(date_most_recent: pd.Timestamp, df_feat_label: pd.DataFrame)
     target_precision_env = float(os.environ.get("STEP1_TARGET_PRECISION", "0.60"))
     policy_env = os.environ.get("STEP1_THRESH_POLICY", "prec_at_recall").lower()
 
-    # Remove future rows
-    df_sub = df_feat_label[df_feat_label["Date"] <= date_most_recent].copy()
-    feature_cols = [c for c in df_sub.columns if c not in ("label", "Close", "Date")]
+    # Remove future rows: rows [0, end) have Date <= date_most_recent (views, no copy). Training
+    # and threshold validation only use rows whose label is already known on date_most_recent.
+    fm = _feature_matrix(df_feat_label)
+    end = fm.position(date_most_recent, side="right")
+    X, Y, _ = fm.window(0, _matured_end(fm, date_most_recent), require_label=True)
 
     # If model not trained yet, train on history up to current date and set threshold for future days
     if clf is None:
-        if len(df_sub) < 50:
+        if end < 50:
             # Not enough history with clean features yet
             return
-        X, Y = df_sub[feature_cols], df_sub["label"]
         if len(X) == 0:
             return
         _fit_model(X, Y)
         last_train_date = date_most_recent
+        if retrain_scheduler is not None:
+            retrain_scheduler.fitted(date_most_recent.toordinal(), X, "initial")
         # threshold selection for future
-        labeled = df_sub.dropna(subset=["label"])  # all are labeled here
-        val = labeled.tail(min(300, len(labeled)))
-        if len(val) > 5:
-            Xv = val[feature_cols].values
-            yv = val["label"].values.astype(int)
-            yv_score = clf.predict_proba(Xv)[:, 1]
-            decision_threshold = _choose_threshold(
-                yv,
-                yv_score,
-                target_recall=target_recall_env,
-                min_precision=min_precision_env,
-                target_precision=target_precision_env,
-                mode=policy_env,
-            )
-        else:
-            decision_threshold = 0.3
+        decision_threshold = _select_threshold(
+            X, Y,
+            target_recall=target_recall_env,
+            min_precision=min_precision_env,
+            target_precision=target_precision_env,
+            mode=policy_env,
+        )
         return  # no signal for the very first date (cold start)
 
     # Otherwise, we have a model; decide if we should retrain
     days_since = (date_most_recent - last_train_date).days
-    features_today = df_sub[df_sub["Date"] == date_most_recent][feature_cols]
+    today_rows = slice(fm.position(date_most_recent, side="left"), end)
+    features_today = fm.X[today_rows]
 
     def _append_signal(y_proba: np.ndarray):
         global df_signals
@@ -203,7 +393,7 @@ def get_predictions(date_most_recent: pd.Timestamp, df_feat_label: pd.DataFrame)
         else:
             thr = decision_threshold if decision_threshold is not None else 0.3
 
-        current_date_data = df_sub[df_sub["Date"] == date_most_recent]
+        current_date_data = df_feat_label.iloc[today_rows]
         new_signals = pd.DataFrame({
             "Date": current_date_data["Date"],
             "Close": current_date_data["Close"],
@@ -216,45 +406,59 @@ def get_predictions(date_most_recent: pd.Timestamp, df_feat_label: pd.DataFrame)
             "proba_buy": y_proba[:, 1],
             "proba_hold": y_proba[:, 0],
         })
+        if retrain_scheduler is not None:
+            retrain_scheduler.observe(features_today, y_proba[:, 1])
         # store
         y_proba_storage.append(y_proba)
         df_signals = pd.concat([df_signals, new_signals], ignore_index=True)
 
-    if days_since >= 30:
+    if retrain_scheduler is not None:
+        retrain_due, retrain_reason = retrain_scheduler.due(date_most_recent.toordinal())
+    else:
+        retrain_due, retrain_reason = days_since >= 30, "fixed"
+
+    if retrain_due and training_budget.exhausted(_fits_per_retrain()):
+        # run budget spent: keep the current model and threshold; counted once per 30-day slot
+        slot = (last_train_date, days_since // 30)
+        if slot != _skipped_slot:
+            _skipped_slot = slot
+            training_budget.skip()
+            increment("budget.skipped_retrains")
+        retrain_due = False
+
+    if retrain_due:
         # 1) Predict with OLD model for current date and store
         if len(features_today) > 0:
-            y_proba_old = clf.predict_proba(features_today)
+            y_proba_old = _predict_proba(features_today)
             _append_signal(y_proba_old)
 
         # 2) Retrain on all data <= today for use starting NEXT day
-        X, Y = df_sub[feature_cols], df_sub["label"]
         if len(X) > 0:
             _fit_model(X, Y)
         last_train_date = date_most_recent
+        if retrain_scheduler is not None:
+            retrain_scheduler.fitted(date_most_recent.toordinal(), X, retrain_reason)
 
         # 3) Select threshold for future days
-        labeled = df_sub.dropna(subset=["label"])  # safety
-        val = labeled.tail(min(300, len(labeled)))
-        if len(val) > 5:
-            Xv = val[feature_cols].values
-            yv = val["label"].values.astype(int)
-            yv_score = clf.predict_proba(Xv)[:, 1]
-            decision_threshold = _choose_threshold(
-                yv,
-                yv_score,
-                target_recall=target_recall_env,
-                min_precision=min_precision_env,
-                target_precision=target_precision_env,
-                mode=policy_env,
-            )
-        else:
-            decision_threshold = 0.3
+        decision_threshold = _select_threshold(
+            X, Y,
+            target_recall=target_recall_env,
+            min_precision=min_precision_env,
+            target_precision=target_precision_env,
+            mode=policy_env,
+        )
         # Do NOT re-predict for this date with the new model
         return
 
-    # No retrain due; predict with current model
+    # No retrain due. The online model first absorbs the labels that matured since its last
+    # update: X, Y end at the last row whose LABEL_HORIZON look-ahead is known today
+    # (_matured_end), so it stays current daily without a full refit or future prices.
+    if MODEL_NAME == "online" and isinstance(clf, OnlineLogistic):
+        _absorb_new_rows(X, Y, len(Y))
+
+    # Predict with current model
     if len(features_today) > 0:
-        y_proba = clf.predict_proba(features_today)
+        y_proba = _predict_proba(features_today)
         _append_signal(y_proba)
 
 
@@ -268,8 +472,7 @@ def add_recent_signals():
     last_signal_date = df_signals["Date"].max()
     print(f"Last evaluated signal date: {last_signal_date}")
 
-    df_recent = fetch_sp500_from_fred(start="1999-01-01")
-    df_feat_recent = build_feature_set(df_recent, price_col="Close")
+    df_feat_recent = _pipeline("1999-01-01").run("features")
     feature_cols = [c for c in df_feat_recent.columns if c not in ("Close", "Date")]
     df_feat_clean = df_feat_recent.dropna(subset=feature_cols)
 
@@ -293,7 +496,7 @@ def add_recent_signals():
 
     for _, row in recent_dates.iterrows():
         features = row[feature_cols].values.reshape(1, -1)
-        y_proba = clf.predict_proba(features)
+        y_proba = _predict_proba(features)
         signal = "Buy" if y_proba[0, 1] > thr else "Hold"
         new_signal = pd.DataFrame({
             "Date": [row["Date"]],
@@ -307,56 +510,127 @@ def add_recent_signals():
     print(f"OK: Successfully added {len(recent_dates)} recent trading signals")
 
 
+def save_serving_state(path: str = SERVING_STATE_PATH):
+    """Write the trained model, threshold and price history for src/serving.py."""
+    if clf is None:
+        print("ERROR: No trained model available. Run something() first.")
+        return
+    df = _pipeline(os.environ.get("STEP1_FETCH_START") or "1999-01-01").run("fetch")
+    thr = decision_threshold if decision_threshold is not None else 0.3
+    service = SignalService.from_frame(clf, thr, df, _fm.feature_cols, meta={
+        "model": MODEL_NAME, "last_train_date": str(pd.Timestamp(last_train_date).date())})
+    service.save(path)
+    print(f"Serving snapshot written to {path} ({len(service.dates)} days, threshold {thr:.3f})")
+
+
+def record_run(path: str = None):
+    """Signals, settings and model metadata of this run -> SQLite run store (PIPELINE_DB)."""
+    if clf is None or not RunStore.enabled():
+        return None
+    params = {
+        "model": MODEL_NAME,
+        "thresh_source": THRESH_SOURCE,
+        "thresh_policy": os.environ.get("STEP1_THRESH_POLICY", "prec_at_recall").lower(),
+        "threshold_override": os.environ.get("STEP1_THRESHOLD", "") or None,
+        "retrain": RETRAIN_MODE,
+        "years_back": os.environ.get("STEP1_YEARS_BACK", "2"),
+        "cv_folds": CV_FOLDS,
+    }
+    if retrain_scheduler is not None:
+        params["retrain_summary"] = retrain_scheduler.summary()
+    if training_budget.enabled:
+        params["training_budget"] = training_budget.summary()
+    with RunStore(path) as store:
+        run_id = store.start_run("step1_safe2", kind="walkforward", params=params)
+        store.add_signals(run_id, df_signals)
+        store.set_model_meta(run_id, MODEL_NAME, decision_threshold, last_train_date,
+                             _fm.feature_cols if _fm is not None else (), clf.get_params(deep=False))
+    print(f"Run {run_id} recorded in {store.path}")
+    return run_id
+
+
+def main():
+    """Walk-forward, recent signals, signals.csv export, serving snapshot and metrics.
+
+    Returns False (and does nothing) when SKIP_UNCHANGED and FRED has nothing new.
+    """
+    global _fred_vintage
+    fresh = None
+    if SKIP_UNCHANGED:
+        new_data, fresh = has_new_data(FRED_SERIES_ID)
+        if not new_data:
+            print(f"No new {FRED_SERIES_ID} data since the last run (latest {fresh['latest_date']}, "
+                  f"vintage {fresh['vintage']}); skipping. Set STEP1_SKIP_UNCHANGED=0 to force.")
+            return False
+    _fred_vintage = None if fresh is None else (fresh["latest_date"], fresh["vintage"])
+
+    # Stage timings/counters -> run_profiles/ (cProfile dump with PIPELINE_CPROFILE=1)
+    training_budget.start()
+    with profiled_run("step1_safe2"):
+        # 1) Walk-forward with no look-ahead on retrain days
+        something()
+
+        # 2) Add recent unlabeled signals
+        print("\n=== Adding recent signals ===")
+        add_recent_signals()
+
+        # 3) Export signals
+        with timer("step1.export_csv"):
+            df_signals.to_csv("signals.csv", index=False)
+        with timer("step1.run_store"):
+            record_run()
+
+        # 4) Snapshot for the signal service
+        with timer("step1.serving_snapshot"):
+            save_serving_state()
+
+        # 5) Summaries & metrics for labeled portion
+        with_eval = df_signals[df_signals["TN_TP_FP_FN"] != ""]
+        without_eval = df_signals[df_signals["TN_TP_FP_FN"] == ""]
+        print("\n=== FINAL SUMMARY ===")
+        print(f"Total signals: {len(df_signals)}")
+        print(f"With evaluation: {len(with_eval)}")
+        print(f"Recent predictions: {len(without_eval)}")
+        print(f"Date range: {df_signals['Date'].min()} to {df_signals['Date'].max()}")
+
+        if len(with_eval) > 0:
+            tn_tp_fp_fn = with_eval["TN_TP_FP_FN"].values
+            y_true, y_pred = [], []
+            for val in tn_tp_fp_fn:
+                if val == "TP":
+                    y_true.append(1); y_pred.append(1)
+                elif val == "FN":
+                    y_true.append(1); y_pred.append(0)
+                elif val == "FP":
+                    y_true.append(0); y_pred.append(1)
+                elif val == "TN":
+                    y_true.append(0); y_pred.append(0)
+            y_true = np.array(y_true); y_pred = np.array(y_pred)
+            accuracy = accuracy_score(y_true, y_pred)
+            precision, recall, f1, support = precision_recall_fscore_support(y_true, y_pred, labels=[0, 1])
+            try:
+                y_score = with_eval["proba_buy"].to_numpy()
+                auc = roc_auc_score(y_true, y_score)
+                pr_auc = average_precision_score(y_true, y_score)
+                print(f"ROC-AUC: {auc:.4f}")
+                print(f"PR-AUC:  {pr_auc:.4f}")
+            except Exception as e:
+                print(f"AUC/PR-AUC: Could not calculate: {e}")
+            print(f"\nOverall Accuracy: {accuracy:.4f}")
+            print(f"\n{'Class':<10} {'Precision':<12} {'Recall':<12} {'F1-Score':<12} {'Support':<10}")
+            print("=" * 60)
+            print(f"{'Label 0':<10} {precision[0]:<12.4f} {recall[0]:<12.4f} {f1[0]:<12.4f} {support[0]:<10}")
+            print(f"{'Label 1':<10} {precision[1]:<12.4f} {recall[1]:<12.4f} {f1[1]:<12.4f} {support[1]:<10}")
+            cm = confusion_matrix(y_true, y_pred)
+            print("\nConfusion Matrix:")
+            print(f"                 Predicted Hold  Predicted Buy")
+            print(f"Actual Hold      {cm[0,0]:<15} {cm[0,1]:<15}")
+            print(f"Actual Buy       {cm[1,0]:<15} {cm[1,1]:<15}")
+
+    if fresh is not None:
+        mark_processed(fresh)
+    return True
+
+
 if __name__ == "__main__":
-    # 1) Walk-forward with no look-ahead on retrain days
-    something()
-
-    # 2) Add recent unlabeled signals
-    print("\n=== Adding recent signals ===")
-    add_recent_signals()
-
-    # 3) Export signals
-    df_signals.to_csv("signals.csv", index=False)
-
-    # 4) Summaries & metrics for labeled portion
-    with_eval = df_signals[df_signals["TN_TP_FP_FN"] != ""]
-    without_eval = df_signals[df_signals["TN_TP_FP_FN"] == ""]
-    print("\n=== FINAL SUMMARY ===")
-    print(f"Total signals: {len(df_signals)}")
-    print(f"With evaluation: {len(with_eval)}")
-    print(f"Recent predictions: {len(without_eval)}")
-    print(f"Date range: {df_signals['Date'].min()} to {df_signals['Date'].max()}")
-
-    if len(with_eval) > 0:
-        tn_tp_fp_fn = with_eval["TN_TP_FP_FN"].values
-        y_true, y_pred = [], []
-        for val in tn_tp_fp_fn:
-            if val == "TP":
-                y_true.append(1); y_pred.append(1)
-            elif val == "FN":
-                y_true.append(1); y_pred.append(0)
-            elif val == "FP":
-                y_true.append(0); y_pred.append(1)
-            elif val == "TN":
-                y_true.append(0); y_pred.append(0)
-        y_true = np.array(y_true); y_pred = np.array(y_pred)
-        accuracy = accuracy_score(y_true, y_pred)
-        precision, recall, f1, support = precision_recall_fscore_support(y_true, y_pred, labels=[0, 1])
-        try:
-            y_score = with_eval["proba_buy"].to_numpy()
-            auc = roc_auc_score(y_true, y_score)
-            pr_auc = average_precision_score(y_true, y_score)
-            print(f"ROC-AUC: {auc:.4f}")
-            print(f"PR-AUC:  {pr_auc:.4f}")
-        except Exception as e:
-            print(f"AUC/PR-AUC: Could not calculate: {e}")
-        print(f"\nOverall Accuracy: {accuracy:.4f}")
-        print(f"\n{'Class':<10} {'Precision':<12} {'Recall':<12} {'F1-Score':<12} {'Support':<10}")
-        print("=" * 60)
-        print(f"{'Label 0':<10} {precision[0]:<12.4f} {recall[0]:<12.4f} {f1[0]:<12.4f} {support[0]:<10}")
-        print(f"{'Label 1':<10} {precision[1]:<12.4f} {recall[1]:<12.4f} {f1[1]:<12.4f} {support[1]:<10}")
-        cm = confusion_matrix(y_true, y_pred)
-        print("\nConfusion Matrix:")
-        print(f"                 Predicted Hold  Predicted Buy")
-        print(f"Actual Hold      {cm[0,0]:<15} {cm[0,1]:<15}")
-        print(f"Actual Buy       {cm[1,0]:<15} {cm[1,1]:<15}")
+    main()
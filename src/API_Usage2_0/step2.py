@@ -1,4 +1,25 @@
-﻿import pandas as pnd
+﻿import os
+import sys
+
+import pandas as pnd
+
+# Add the project root to Python path
+project_root = os.path.join(os.path.dirname(__file__), '..', '..')
+sys.path.insert(0, project_root)
+
+try:
+    from src.chart_payloads import write_chart_payloads
+    from src.plot import plot_equity_vs_dca, show_or_save
+    from src.instrumentation import timer, profiled_run
+    from src.trading_calendar import TradingCalendar
+    from src.evaluate import signal_dca_positions, dca_units
+except ImportError:
+    sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+    from chart_payloads import write_chart_payloads
+    from plot import plot_equity_vs_dca, show_or_save
+    from instrumentation import timer, profiled_run
+    from trading_calendar import TradingCalendar
+    from evaluate import signal_dca_positions, dca_units
 
 
 def read_csv(file_path: str = "signals.csv") -> pnd.DataFrame:
@@ -7,78 +28,50 @@ def read_csv(file_path: str = "signals.csv") -> pnd.DataFrame:
     return df
 
 
-if __name__ == "__main__":
-    df_signals = read_csv("signals.csv")
-    print(df_signals.tail())
-    print(df_signals.dtypes)
-    print(df_signals["Date"].max())
-    print(df_signals["Date"].min())
+def main(signals_path: str = "signals.csv"):
+    """Equity vs DCA from signals.csv: plot, signals_with_equity.csv and chart payloads."""
+    with profiled_run("step2"):
+        with timer("step2.read_csv"):
+            df_signals = read_csv(signals_path)
+        print(df_signals.tail())
+        print(df_signals.dtypes)
+        print(df_signals["Date"].max())
+        print(df_signals["Date"].min())
 
-    # Initialize columns for calculated values
-    df_signals["Equity Value"] = 0.0
-    df_signals["DCA Value"] = 0.0
-    
-    # Equity calculation, with new capital 10 th on each month
-    has_gotten_capital_this_month = False
-    equity = 0.0
-    DCA_counter_example_shares = 0.0
-    shares = 0.0
-    
-    for idx, row in df_signals.iterrows():
-        # Temp debug, if date is 2025-04-17
-        if row["Date"] == pnd.to_datetime("2025-04-17"):
-            print("Date is 2025-04-17")
-        # 10th of each month or later that month if 10th is not trading day
-        if row["Date"].day >= 10:
-            if not has_gotten_capital_this_month:
-                equity += 1000.0
-                has_gotten_capital_this_month = True
-                # DCA
-                DCA_counter_example_shares += 1000.0 / row["Close"]
-        # Reset at start of new month  
-        if row["Date"].day <= 10:
-            has_gotten_capital_this_month = False
-        
-        if row["Signal"] == "Buy":
-            new_shares = equity / row["Close"]
-            shares += new_shares
-            equity -= new_shares * row["Close"]
+        # Equity calculation, with new capital on the first trading day >= the 10th of each month.
+        # Both curves deposit on the same calendar rows; the signal curve invests all waiting cash on Buy.
+        with timer("step2.equity"):
+            calendar = TradingCalendar.from_frame(df_signals)
+            deposit_rows = calendar.deposit_rows(10)
+            close = df_signals["Close"].to_numpy(dtype=float)
+            cash, shares = signal_dca_positions(close, (df_signals["Signal"] == "Buy").to_numpy(),
+                                                deposit_rows, 1000.0)
+            df_signals["Equity Value"] = cash + shares * close
+            df_signals["DCA Value"] = dca_units(close, deposit_rows, 1000.0) * close
 
-        # Calculate value of shares at current close price
-        equity_value = equity + shares * row["Close"]
-        dca_value = DCA_counter_example_shares * row["Close"]
-        
-        # Store values directly in DataFrame
-        df_signals.at[idx, "Equity Value"] = equity_value
-        df_signals.at[idx, "DCA Value"] = dca_value
-        
-        print(f"{row['Date']}: Equity value: {equity_value:.2f}, DCA value: {dca_value:.2f}, Signal: {row['Signal']}, TN_TP_FP_FN: {row['TN_TP_FP_FN']}")
-    
-    print(f"Final equity value: {equity + shares * row['Close']:.2f}, Final DCA value: {DCA_counter_example_shares * row['Close']:.2f}")
+        print("\n".join(f"{d}: Equity value: {e:.2f}, DCA value: {v:.2f}, Signal: {sig}, TN_TP_FP_FN: {c}"
+                        for d, e, v, sig, c in zip(df_signals["Date"], df_signals["Equity Value"],
+                                                   df_signals["DCA Value"], df_signals["Signal"],
+                                                   df_signals["TN_TP_FP_FN"])))
+        print(f"Final equity value: {df_signals['Equity Value'].iloc[-1]:.2f}, "
+              f"Final DCA value: {df_signals['DCA Value'].iloc[-1]:.2f}")
 
-    # Plot equity_value and dca_value over time, close prices, and signals
-    import matplotlib.pyplot as plt
+        # Plot equity_value and dca_value over time, close prices, and signals
+        # (decimated to pixel width; saved to PNG when running headless, e.g. MPLBACKEND=Agg in CI)
+        with timer("step2.plot"):
+            fig = plot_equity_vs_dca(df_signals)
+            show_or_save(fig, "equity_vs_dca.png")
 
-    fig, ax1 = plt.subplots(figsize=(14, 7))
-    
-    # Plot equity and DCA values on primary Y-axis
-    ax1.plot(df_signals["Date"], df_signals["Equity Value"], label="Equity Value", alpha=0.7, color='blue')
-    ax1.plot(df_signals["Date"], df_signals["DCA Value"], label="DCA Value", alpha=0.7, color='orange')
-    ax1.set_xlabel("Date")
-    ax1.set_ylabel("Portfolio Value ($)", color='black')
-    ax1.legend(loc='upper left')
-    
-    # Create secondary Y-axis for close prices
-    ax2 = ax1.twinx()
-    ax2.plot(df_signals["Date"], df_signals["Close"], label="Close Price", alpha=0.5, color='gray')
-    ax2.scatter(df_signals["Date"], df_signals["Close"], c=df_signals["Signal"].map({"Buy": "green", "Hold": "red"}), label="Signals", s=20)
-    ax2.set_ylabel("Stock Price ($)", color='gray')
-    ax2.legend(loc='upper right')
-    
-    plt.title("Equity and DCA Value Over Time with Stock Price")
-    plt.tight_layout()
-    plt.show()
+        # Write to new CSV
+        with timer("step2.export_csv"):
+            df_signals.to_csv("signals_with_equity.csv", index=False)
+        print("Wrote to signals_with_equity.csv")
 
-    # Write to new CSV
-    df_signals.to_csv("signals_with_equity.csv", index=False)
-    print("Wrote to signals_with_equity.csv")
+        # Pre-aggregated, downsampled JSON per zoom level for the web dashboard
+        with timer("step2.chart_payloads"):
+            payload_paths = write_chart_payloads(df_signals, out_dir="chart_payloads")
+        print(f"Wrote {len(payload_paths)} chart payloads to chart_payloads/")
+
+
+if __name__ == "__main__":
+    main()
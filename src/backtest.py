@@ -5,10 +5,16 @@ Ettårs-backtest (6x2 mån) med fast Sub-model 4 feature-set.
 import pandas as pd
 import numpy as np
 from dateutil.relativedelta import relativedelta
+from .config import LABEL_HORIZON
 from .model import make_mlp_bagging, fit_predict
+from .feature_matrix import FeatureMatrix
+from .trading_calendar import TradingCalendar
 
-def six_two_month_windows(df):
-    end_all = pd.to_datetime(df["Date"].max()).normalize()
+def six_two_month_windows(df, calendar=None):
+    if calendar is not None:
+        end_all = calendar.date(-1)
+    else:
+        end_all = pd.to_datetime(df["Date"].max()).normalize()
     start_all = end_all - relativedelta(months=12)
     windows = []
     cur = start_all
@@ -18,33 +24,39 @@ def six_two_month_windows(df):
         cur = nxt
     return windows
 
-def train_on_older_data(df, cutoff_date):
-    return df[df["Date"] < cutoff_date].copy()
+def train_on_older_data(df, cutoff_date, purge=LABEL_HORIZON):
+    # Raderna närmast cutoff har labels som tittar in i testperioden -> purge
+    older = df[df["Date"] < cutoff_date]
+    return older.iloc[:max(0, len(older) - purge)].copy()
 
 def test_on_window(df, start, end):
     mask = (df["Date"] >= start) & (df["Date"] < end)
     return df[mask].copy()
 
-def backtest_six_windows(df_feat_label, feature_cols):
-    wins = six_two_month_windows(df_feat_label)
+def backtest_six_windows(df_feat_label, feature_cols, decision_threshold=0.5):
     results = []
     reports = []
 
-    for (start, end) in wins:
-        train_df = train_on_older_data(df_feat_label, start).dropna(subset=["label"] + feature_cols)
-        test_df = test_on_window(df_feat_label, start, end).dropna(subset=feature_cols)
+    # Datumsorterad feature-matris och handelskalender byggda en gång; fönstrens gränser
+    # slås upp med searchsorted på kalenderns dagnummer
+    df_sorted = df_feat_label.sort_values("Date").reset_index(drop=True)
+    fm = FeatureMatrix.from_frame(df_sorted, feature_cols)
+    calendar = TradingCalendar.from_frame(df_sorted)
+    wins = six_two_month_windows(df_sorted, calendar)
+    bounds = calendar.positions([d for w in wins for d in w]).reshape(-1, 2)
 
-        if len(train_df) < 500 or len(test_df) == 0:
-            continue
+    for (start, end), (pos_start, pos_end) in zip(wins, bounds):
+        # purge: träningslabels får inte titta in i testfönstret (LABEL_HORIZON dagar framåt)
+        X_train, y_train, _ = fm.window(0, pos_start - LABEL_HORIZON, require_label=True)
+        X_test, _, test_rows = fm.window(pos_start, pos_end)
 
-        X_train = train_df[feature_cols].values
-        y_train = train_df["label"].values
-        X_test = test_df[feature_cols].values
+        if len(X_train) < 500 or len(X_test) == 0:
+            continue
 
-        clf = make_mlp_bagging()
+        clf = make_mlp_bagging(decision_threshold=decision_threshold)
         y_pred, y_proba, _ = fit_predict(clf, X_train, y_train, X_test)
 
-        test_df = test_df.copy()
+        test_df = df_sorted.iloc[test_rows].copy()
         test_df["pred"] = y_pred.astype(float)
         test_df["proba"] = y_proba.astype(float)
         results.append(test_df)
@@ -0,0 +1,12 @@
+# -*- coding: utf-8 -*-
+"""
+Benchmark-svit för signal-pipelinen.
+
+Kör på syntetiska prisserier (GBM, regimväxling eller hopp; ingen nätverksåtkomst) och
+skriver resultat till JSON så att körningar kan jämföras mellan commits:
+
+    python -m src.benchmarks --sizes 1000 5000 --out bench.json
+    python -m src.benchmarks.compare old.json new.json
+"""
+from .synthetic import gbm_prices, synthetic_prices, PROCESSES
+from .suite import BENCHMARKS, run_benchmarks
@@ -0,0 +1,81 @@
+# -*- coding: utf-8 -*-
+"""
+Kör benchmark-sviten och skriv resultat till JSON.
+
+    python -m src.benchmarks --sizes 1000 5000 20000 --repeat 3 --out bench.json
+    python -m src.benchmarks --only indicators features --sizes 100000 --all-sizes
+    python -m src.benchmarks --only equity indicators.sma --sizes 1000000 10000000 --process regime
+"""
+import argparse
+import json
+import platform
+import subprocess
+import sys
+from datetime import datetime, timezone
+
+from .suite import BENCHMARKS, run_benchmarks
+from .synthetic import PROCESSES
+
+
+def _git_commit():
+    try:
+        return subprocess.check_output(["git", "rev-parse", "HEAD"], text=True,
+                                       stderr=subprocess.DEVNULL).strip()
+    except Exception:
+        return None
+
+
+def _versions():
+    out = {"python": platform.python_version()}
+    for mod in ("numpy", "pandas", "sklearn"):
+        try:
+            out[mod] = __import__(mod).__version__
+        except Exception:
+            out[mod] = None
+    return out
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Benchmark the signal pipeline on synthetic price series.")
+    ap.add_argument("--sizes", type=int, nargs="+", default=[2000, 5000],
+                    help="Series lengths in trading days (1k-10M).")
+    ap.add_argument("--repeat", type=int, default=3, help="Timed repetitions per case.")
+    ap.add_argument("--only", nargs="*", default=None,
+                    help="Only run cases whose name starts with, or whose group equals, one of these.")
+    ap.add_argument("--all-sizes", action="store_true",
+                    help="Ignore per-case max_n limits (slow for model/walk-forward cases).")
+    ap.add_argument("--seed", type=int, default=0)
+    ap.add_argument("--process", default="gbm", choices=list(PROCESSES),
+                    help="Synthetic price process for the series.")
+    ap.add_argument("--out", default="bench.json")
+    ap.add_argument("--list", action="store_true", help="List cases and exit.")
+    args = ap.parse_args(argv)
+
+    if args.list:
+        for name, b in BENCHMARKS.items():
+            print(f"{b.group:<12} {name:<50} max_n={b.max_n}")
+        return 0
+
+    results = run_benchmarks(args.sizes, repeat=args.repeat, only=args.only,
+                             all_sizes=args.all_sizes, seed=args.seed, process=args.process)
+    payload = {
+        "meta": {
+            "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "git_commit": _git_commit(),
+            "platform": platform.platform(),
+            "versions": _versions(),
+            "sizes": args.sizes,
+            "repeat": args.repeat,
+            "seed": args.seed,
+            "process": args.process,
+        },
+        "results": results,
+    }
+    with open(args.out, "w", encoding="utf-8") as f:
+        json.dump(payload, f, indent=2)
+    print(f"Wrote {len(results)} results to {args.out}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
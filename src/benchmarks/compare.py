@@ -0,0 +1,53 @@
+# -*- coding: utf-8 -*-
+"""
+Jämför två benchmark-JSON-filer (t.ex. från två commits).
+
+    python -m src.benchmarks.compare base.json new.json --threshold 1.2
+
+Returnerar exit-kod 1 om något fall är långsammare än threshold x basen (median).
+"""
+import argparse
+import json
+import sys
+
+
+def load_results(path):
+    with open(path, encoding="utf-8") as f:
+        payload = json.load(f)
+    return {(r["name"], r["n"]): r for r in payload["results"] if "median_s" in r}
+
+
+def compare(base, new, threshold=1.2):
+    """Returnerar rader (name, n, base_s, new_s, ratio, regression) för fall som finns i båda."""
+    rows = []
+    for key in sorted(set(base) & set(new)):
+        b, c = base[key]["median_s"], new[key]["median_s"]
+        ratio = c / b if b > 0 else float("inf")
+        rows.append((key[0], key[1], b, c, ratio, ratio > threshold))
+    return rows
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Compare two benchmark result files.")
+    ap.add_argument("base")
+    ap.add_argument("new")
+    ap.add_argument("--threshold", type=float, default=1.2,
+                    help="Flag cases whose median time grew by more than this factor.")
+    args = ap.parse_args(argv)
+
+    rows = compare(load_results(args.base), load_results(args.new), args.threshold)
+    print(f"{'case':<50} {'n':>7} {'base[s]':>10} {'new[s]':>10} {'ratio':>7}")
+    print("=" * 88)
+    for name, n, b, c, ratio, bad in rows:
+        flag = "  <-- regression" if bad else ""
+        print(f"{name:<50} {n:>7} {b:>10.4f} {c:>10.4f} {ratio:>7.2f}{flag}")
+
+    n_bad = sum(r[5] for r in rows)
+    if n_bad:
+        print(f"\n{n_bad} regression(s) above {args.threshold:.2f}x")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
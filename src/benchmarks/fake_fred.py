@@ -0,0 +1,235 @@
+# -*- coding: utf-8 -*-
+"""
+FakeFred: en lokal HTTP-server som svarar som FRED:s API (fred/series och
+fred/series/observations) med syntetiska serier, så att fetch_data, freshness och hela
+pipelinen kan köras och benchmarkas utan nätverk och API-nyckel.
+
+Som kontexthanterare startas servern på en ledig port i en bakgrundstråd och
+PIPELINE_FRED_URL (och FRED_API_KEY om den saknas) pekas om under blocket:
+
+    with FakeFred(n_days=8000, process="regime") as fred:
+        df = fetch_sp500_from_fred(start="1990-01-01")
+        fred.append("SP500", 5123.4)      # ny observation, ny vintage (last_updated)
+
+Fristående, för t.ex. step1_safe2 i en annan process:
+
+    python -m src.benchmarks.fake_fred --days 8000 --process regime --port 8766
+    PIPELINE_FRED_URL=http://127.0.0.1:8766/fred FRED_API_KEY=fake python -m src walkforward --force
+
+Okända series_id genereras vid första anropet (frö från namnet). Serierna slutar på senaste
+vardagen före idag, så färskhetskontrollen ser en aktuell serie och append() utan datum lägger
+till dagens observation (som fetch_data och färskhetskontrollen, med observation_end = idag,
+returnerar). Vintagen (last_updated) har mikrosekundsupplösning och ökar strikt vid varje
+ändring, även flera gånger inom samma sekund. Värdena avrundas till två decimaler som hos FRED. JSON-svaret byggs i minnet: använd synthetic_prices direkt för
+serier över några hundra tusen rader.
+"""
+import argparse
+import json
+import os
+import sys
+import threading
+import zlib
+from datetime import date, datetime, timedelta, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+import numpy as np
+import pandas as pd
+
+from .synthetic import PROCESSES, synthetic_prices
+
+FRED_URL_ENV = "PIPELINE_FRED_URL"
+
+
+class FakeFred:
+    def __init__(self, series=None, n_days=5000, process="gbm", seed=0, end=None,
+                 host="127.0.0.1", port=0):
+        """
+        series: {series_id: DataFrame med Date/Close}; saknade id genereras med
+        synthetic_prices(n_days, process) som slutar på end (default senaste vardagen före idag).
+        """
+        self.n_days = n_days
+        self.process = process
+        self.seed = seed
+        if end is None:
+            # senaste vardagen före idag (fredag på en lördag eller söndag)
+            self.end = np.busday_offset(np.datetime64(date.today(), "D"), -1, roll="forward")
+        else:
+            self.end = np.busday_offset(np.datetime64(pd.Timestamp(end).date(), "D"), 0, roll="backward")
+        self.host, self.port = host, port
+        self.requests = 0
+        self._series = {}
+        self._lock = threading.Lock()
+        self._server = None
+        self._thread = None
+        self._saved_env = {}
+        self._last_vintage = None
+        for sid, df in (series or {}).items():
+            self.set_series(sid, df)
+
+    # --- Serier ---
+
+    def _vintage(self):
+        """Ny last_updated, strikt större än den förra (anropas med låset taget)."""
+        now = datetime.now(timezone.utc)
+        if self._last_vintage is not None and now <= self._last_vintage:
+            now = self._last_vintage + timedelta(microseconds=1)
+        self._last_vintage = now
+        return now.strftime("%Y-%m-%d %H:%M:%S.%f+00")
+
+    def set_series(self, series_id, df):
+        dates = np.asarray(pd.to_datetime(df["Date"]).to_numpy(), dtype="datetime64[D]")
+        close = np.round(np.asarray(df["Close"], dtype=float), 2)
+        with self._lock:
+            self._series[series_id] = {"dates": dates, "close": close, "last_updated": self._vintage()}
+
+    def _get(self, series_id):
+        with self._lock:
+            entry = self._series.get(series_id)
+        if entry is None:
+            start = np.busday_offset(self.end, -(self.n_days - 1), roll="backward")
+            seed = self.seed + zlib.crc32(str(series_id).encode())
+            self.set_series(series_id, synthetic_prices(self.n_days, self.process, seed=seed, start=str(start)))
+            with self._lock:
+                entry = self._series[series_id]
+        return entry
+
+    def frame(self, series_id="SP500") -> pd.DataFrame:
+        """Serien som FakeFred levererar den (Date/Close, avrundad), för jämförelser i tester."""
+        e = self._get(series_id)
+        return pd.DataFrame({"Date": e["dates"].astype("datetime64[us]"), "Close": e["close"]})
+
+    def append(self, series_id, close, day=None):
+        """
+        Lägger till (eller skriver över) en observation och uppdaterar seriens vintage.
+        Utan day: dagens observation (en andra append samma dag reviderar den).
+        """
+        e = self._get(series_id)
+        day = np.datetime64(pd.Timestamp(day or date.today()).date(), "D")
+        with self._lock:
+            i = int(np.searchsorted(e["dates"], day))
+            if i < len(e["dates"]) and e["dates"][i] == day:
+                e["close"][i] = round(float(close), 2)
+            else:
+                e["dates"] = np.insert(e["dates"], i, day)
+                e["close"] = np.insert(e["close"], i, round(float(close), 2))
+            e["last_updated"] = self._vintage()
+
+    # --- API-svar ---
+
+    def observations(self, params):
+        e = self._get(params["series_id"])
+        dates, close = e["dates"], e["close"]
+        lo = np.searchsorted(dates, np.datetime64(params.get("observation_start", "1776-07-04"), "D"))
+        hi = np.searchsorted(dates, np.datetime64(params.get("observation_end", "9999-12-31"), "D"), side="right")
+        rows = np.arange(lo, hi)
+        if params.get("sort_order") == "desc":
+            rows = rows[::-1]
+        if "limit" in params:
+            rows = rows[:int(params["limit"])]
+        today = date.today().isoformat()
+        days = np.datetime_as_string(dates[rows], unit="D")
+        obs = [{"realtime_start": today, "realtime_end": today, "date": d, "value": f"{v:.2f}"}
+               for d, v in zip(days.tolist(), close[rows].tolist())]
+        return {"realtime_start": today, "realtime_end": today, "count": len(obs),
+                "offset": 0, "limit": int(params.get("limit", 100000)), "observations": obs}
+
+    def series(self, params):
+        e = self._get(params["series_id"])
+        return {"seriess": [{
+            "id": params["series_id"], "title": f"Synthetic {self.process} series",
+            "observation_start": str(e["dates"][0]), "observation_end": str(e["dates"][-1]),
+            "frequency": "Daily, Close", "last_updated": e["last_updated"],
+        }]}
+
+    # --- Server ---
+
+    @property
+    def url(self):
+        return f"http://{self.host}:{self.port}/fred"
+
+    def start(self):
+        fake = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+            disable_nagle_algorithm = True
+
+            def _send(self, status, payload):
+                body = json.dumps(payload).encode()
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def do_GET(self):
+                url = urlparse(self.path)
+                params = {k: v[0] for k, v in parse_qs(url.query).items()}
+                fake.requests += 1
+                if not params.get("api_key"):
+                    return self._send(400, {"error_code": 400, "error_message": "Bad Request. api_key is not set."})
+                if "series_id" not in params:
+                    return self._send(400, {"error_code": 400, "error_message": "Bad Request. series_id is not set."})
+                if url.path.rstrip("/").endswith("/series/observations"):
+                    return self._send(200, fake.observations(params))
+                if url.path.rstrip("/").endswith("/series"):
+                    return self._send(200, fake.series(params))
+                self._send(404, {"error_code": 404, "error_message": f"Not Found: {url.path}"})
+
+            def log_message(self, format, *args):
+                pass
+
+        self._server = ThreadingHTTPServer((self.host, self.port), Handler)
+        self._server.daemon_threads = True
+        self.port = self._server.server_port
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+
+    def __enter__(self):
+        self.start()
+        for key, value in ((FRED_URL_ENV, self.url), ("FRED_API_KEY", os.environ.get("FRED_API_KEY") or "fake")):
+            self._saved_env[key] = os.environ.get(key)
+            os.environ[key] = value
+        return self
+
+    def __exit__(self, *exc):
+        for key, value in self._saved_env.items():
+            if value is None:
+                os.environ.pop(key, None)
+            else:
+                os.environ[key] = value
+        self._saved_env = {}
+        self.stop()
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Serve synthetic series through a local FRED-compatible API.")
+    ap.add_argument("--days", type=int, default=8000, help="Length of each generated series.")
+    ap.add_argument("--process", default="gbm", choices=list(PROCESSES))
+    ap.add_argument("--seed", type=int, default=0)
+    ap.add_argument("--host", default="127.0.0.1")
+    ap.add_argument("--port", type=int, default=8766)
+    args = ap.parse_args(argv)
+
+    fake = FakeFred(n_days=args.days, process=args.process, seed=args.seed, host=args.host, port=args.port).start()
+    print(f"FakeFred serving {args.process} series on {fake.url}")
+    print(f"  export {FRED_URL_ENV}={fake.url} FRED_API_KEY=fake")
+    try:
+        fake._thread.join()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        fake.stop()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,167 @@
+# -*- coding: utf-8 -*-
+"""
+Lasttest av signaltjänsten (src/serving.py): p50/p99-latens per endpoint.
+
+    python -m src.benchmarks.serve_load --synthetic 5000 --requests 2000 --clients 4
+    python -m src.benchmarks.serve_load --url http://127.0.0.1:8765 --requests 5000
+
+Utan --url startas en lokal instans (syntetisk serie) i en egen process, så att klienttrådarna
+inte delar GIL med servern. Varje klient har en egen keep-alive-anslutning; latensen är tiden
+från skickad request till läst svar.
+Blandningen är GET /signal (senaste), GET /signal?date=<slumpat datum> och POST /price
+(intradagskurs på sista dagen), i proportionerna --mix.
+"""
+import argparse
+import http.client
+import json
+import os
+import socket
+import subprocess
+import sys
+import threading
+import time
+from urllib.parse import urlparse
+
+import numpy as np
+
+project_root = os.path.join(os.path.dirname(__file__), '..', '..')
+
+
+def _client(host, port, ops, latencies, errors):
+    conn = http.client.HTTPConnection(host, port, timeout=10)
+    for kind, method, path, body in ops:
+        headers = {"Content-Type": "application/json"} if body is not None else {}
+        t0 = time.perf_counter()
+        try:
+            conn.request(method, path, body=body, headers=headers)
+            resp = conn.getresponse()
+            resp.read()
+            ok = resp.status == 200
+        except (OSError, http.client.HTTPException):
+            conn.close()
+            conn = http.client.HTTPConnection(host, port, timeout=10)
+            ok = False
+        latencies[kind].append(time.perf_counter() - t0)
+        if not ok:
+            errors[kind] += 1
+    conn.close()
+
+
+def _start_local(n_days, timeout=300):
+    """Startar python -m src.serving --synthetic n_days på en ledig port; returnerar (process, port)."""
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        port = sock.getsockname()[1]
+    proc = subprocess.Popen([sys.executable, "-m", "src.serving", "--synthetic", str(n_days),
+                             "--port", str(port)], cwd=os.path.abspath(project_root),
+                            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        if proc.poll() is not None:
+            raise RuntimeError(f"Signaltjänsten avslutades med kod {proc.returncode}")
+        try:
+            conn = http.client.HTTPConnection("127.0.0.1", port, timeout=1)
+            conn.request("GET", "/health")
+            conn.getresponse().read()
+            conn.close()
+            return proc, port
+        except OSError:
+            time.sleep(0.2)
+    proc.terminate()
+    raise RuntimeError(f"Signaltjänsten svarade inte inom {timeout}s")
+
+
+def _make_ops(n, health, mix, rng):
+    first, last, close = health["first_date"], health["last_date"], health["close"]
+    days = np.arange(np.datetime64(first), np.datetime64(last) + 1)
+    kinds = rng.choice(["latest", "by_date", "price"], size=n, p=np.asarray(mix) / np.sum(mix))
+    ops = []
+    for kind in kinds:
+        if kind == "latest":
+            ops.append((kind, "GET", "/signal", None))
+        elif kind == "by_date":
+            ops.append((kind, "GET", f"/signal?date={rng.choice(days)}", None))
+        else:
+            px = close * (1.0 + 0.01 * rng.standard_normal())
+            ops.append((kind, "POST", "/price", json.dumps({"close": px}).encode()))
+    return ops
+
+
+def run_load(host, port, n_requests=2000, clients=4, mix=(0.6, 0.3, 0.1), seed=0):
+    """{endpoint: {n, errors, p50_ms, p99_ms, mean_ms}} plus "all" och throughput_rps."""
+    conn = http.client.HTTPConnection(host, port, timeout=10)
+    conn.request("GET", "/health")
+    health = json.loads(conn.getresponse().read())
+    conn.request("GET", "/signal")
+    latest = json.loads(conn.getresponse().read())
+    conn.close()
+    info = {"first_date": health["first_date"], "last_date": latest["date"], "close": latest["close"]}
+
+    rng = np.random.default_rng(seed)
+    ops = _make_ops(n_requests, info, mix, rng)
+    latencies = {k: [] for k in ("latest", "by_date", "price")}
+    errors = {k: 0 for k in latencies}
+    chunks = [ops[i::clients] for i in range(clients)]
+    threads = [threading.Thread(target=_client, args=(host, port, c, latencies, errors)) for c in chunks]
+    t0 = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    wall = time.perf_counter() - t0
+
+    def stats(vals, n_err):
+        ms = np.asarray(vals) * 1000.0
+        if len(ms) == 0:
+            return {"n": 0, "errors": n_err}
+        return {"n": int(len(ms)), "errors": n_err, "p50_ms": float(np.percentile(ms, 50)),
+                "p99_ms": float(np.percentile(ms, 99)), "mean_ms": float(ms.mean())}
+
+    out = {k: stats(v, errors[k]) for k, v in latencies.items()}
+    out["all"] = stats(sum(latencies.values(), []), sum(errors.values()))
+    out["throughput_rps"] = n_requests / wall if wall > 0 else float("inf")
+    return out
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Load-test the local signal service (p50/p99 latency).")
+    ap.add_argument("--url", default=None, help="Running instance; default starts one in-process.")
+    ap.add_argument("--synthetic", type=int, default=5000, help="Days for the in-process instance.")
+    ap.add_argument("--requests", type=int, default=2000)
+    ap.add_argument("--clients", type=int, default=4)
+    ap.add_argument("--mix", type=float, nargs=3, default=[0.6, 0.3, 0.1],
+                    metavar=("LATEST", "BY_DATE", "PRICE"))
+    ap.add_argument("--seed", type=int, default=0)
+    ap.add_argument("--out", default=None, help="Write results as JSON.")
+    args = ap.parse_args(argv)
+
+    proc = None
+    if args.url:
+        u = urlparse(args.url)
+        host, port = u.hostname, u.port or 80
+    else:
+        proc, port = _start_local(args.synthetic)
+        host = "127.0.0.1"
+
+    try:
+        res = run_load(host, port, args.requests, args.clients, args.mix, args.seed)
+    finally:
+        if proc is not None:
+            proc.terminate()
+            proc.wait()
+
+    print(f"{'endpoint':<10} {'n':>6} {'err':>5} {'p50[ms]':>9} {'p99[ms]':>9} {'mean[ms]':>9}")
+    print("=" * 52)
+    for k in ("latest", "by_date", "price", "all"):
+        r = res[k]
+        if r["n"]:
+            print(f"{k:<10} {r['n']:>6} {r['errors']:>5} {r['p50_ms']:>9.3f} {r['p99_ms']:>9.3f} {r['mean_ms']:>9.3f}")
+    print(f"\nThroughput: {res['throughput_rps']:.0f} req/s with {args.clients} clients")
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            json.dump(res, f, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
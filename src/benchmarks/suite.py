@@ -0,0 +1,322 @@
+# -*- coding: utf-8 -*-
+"""
+Benchmark-fall för hela signal-pipelinen.
+
+Varje fall registreras med @benchmark(namn, grupp, max_n=...). Funktionen får en
+BenchContext (data för en viss serielängd, byggs lat och cachas) och returnerar en
+callable utan argument som tidsätts. Allt som inte ska mätas görs innan callable returneras.
+"""
+import gc
+import statistics
+import time
+import warnings
+from dataclasses import dataclass
+from typing import Callable, Optional
+
+import numpy as np
+import pandas as pd
+
+from .synthetic import gbm_prices, synthetic_prices
+
+# name -> Benchmark
+BENCHMARKS = {}
+
+
+@dataclass
+class Benchmark:
+    name: str
+    group: str
+    setup: Callable
+    # största serielängd som körs som standard (None = ingen gräns); --all-sizes ignorerar den
+    max_n: Optional[int] = None
+    # antal upprepningar som standard för tunga fall (None = använd --repeat)
+    repeat: Optional[int] = None
+
+
+def benchmark(name: str, group: str, max_n: Optional[int] = None, repeat: Optional[int] = None):
+    def deco(fn):
+        BENCHMARKS[name] = Benchmark(name=name, group=group, setup=fn, max_n=max_n, repeat=repeat)
+        return fn
+    return deco
+
+
+class BenchContext:
+    """Syntetisk data för en serielängd n. Mellansteg byggs första gången de efterfrågas."""
+
+    def __init__(self, n: int, seed: int = 0, process: str = "gbm"):
+        self.n = n
+        self.seed = seed
+        self.process = process
+        self._cache = {}
+
+    def _get(self, key, build):
+        if key not in self._cache:
+            self._cache[key] = build()
+        return self._cache[key]
+
+    @property
+    def df(self) -> pd.DataFrame:
+        return self._get("df", lambda: synthetic_prices(self.n, self.process, seed=self.seed))
+
+    @property
+    def close(self) -> pd.Series:
+        return self.df["Close"]
+
+    @property
+    def df_feat(self) -> pd.DataFrame:
+        from src.features import build_feature_set
+        return self._get("df_feat", lambda: build_feature_set(self.df, price_col="Close"))
+
+    @property
+    def df_lab(self) -> pd.DataFrame:
+        from src.labels import labels_give_data_set_with_0_or_1
+        return self._get("df_lab", lambda: labels_give_data_set_with_0_or_1(self.df_feat, price_col="Close"))
+
+    @property
+    def feature_cols(self):
+        return [c for c in self.df_lab.columns if c not in ("label", "Close", "Date")]
+
+    @property
+    def df_clean(self) -> pd.DataFrame:
+        """Rader med både label och alla features (som i step1_safe2.something)."""
+        return self._get(
+            "df_clean",
+            lambda: self.df_lab.dropna(subset=["label"] + self.feature_cols).reset_index(drop=True),
+        )
+
+    def train_test(self, frac: float = 0.8):
+        d = self.df_clean
+        split = int(len(d) * frac)
+        X = d[self.feature_cols].values
+        y = d["label"].values.astype(int)
+        return X[:split], y[:split], X[split:], y[split:]
+
+
+# --- Features & labels ---
+
+@benchmark("features.build_feature_set", "features")
+def _bench_build_feature_set(ctx):
+    from src.features import build_feature_set
+    df = ctx.df
+    return lambda: build_feature_set(df, price_col="Close")
+
+
+@benchmark("labels.labels_give_data_set_with_0_or_1", "labels")
+def _bench_labels(ctx):
+    from src.labels import labels_give_data_set_with_0_or_1
+    df = ctx.df
+    return lambda: labels_give_data_set_with_0_or_1(df, price_col="Close")
+
+
+# --- Indicators (en post per funktion i indicators.py) ---
+
+# indicators.tema() saknas: den anropar ema() som är utkommenterad i indicators.py
+_INDICATOR_CASES = {
+    "sma": lambda ind, s: ind.sma(s, 100),
+    "momentum": lambda ind, s: ind.momentum(s, 30),
+    "rate_of_change": lambda ind, s: ind.rate_of_change(s, 30),
+    "rsma": lambda ind, s: ind.rsma(s, 100),
+    "ema_seeded": lambda ind, s: ind.ema_seeded(s, 150),
+    "tema_paper": lambda ind, s: ind.tema_paper(s, 100),
+    "mom_ema": lambda ind, s: ind.mom_ema(s, n=150, ofs=15),
+    "mom_tema": lambda ind, s: ind.mom_tema(s, n=300, ofs=15),
+    "rc_tema": lambda ind, s: ind.rc_tema(s, n=200),
+    "log_return": lambda ind, s: ind.log_return(s, 30),
+    "linreg_slope": lambda ind, s: ind.linreg_slope(s, 70),
+    "rtf": lambda ind, s: ind.rtf(s, window=70),
+    "rtf_recursive_ses_H_eq_n": lambda ind, s: ind.rtf_recursive_ses_H_eq_n(s, alpha=0.5),
+}
+
+
+def _register_indicator(ind_name, case):
+    def setup(ctx):
+        from src import indicators
+        close = ctx.close
+        return lambda: case(indicators, close)
+    benchmark(f"indicators.{ind_name}", "indicators")(setup)
+
+
+for _name, _case in _INDICATOR_CASES.items():
+    _register_indicator(_name, _case)
+
+
+@benchmark("panel_indicators.compute_feature_arrays[50 assets]", "features")
+def _bench_feature_panel(ctx):
+    from src.panel_indicators import compute_feature_arrays
+    P = np.column_stack([gbm_prices(ctx.n, seed=ctx.seed + j)["Close"].to_numpy() for j in range(50)])
+    return lambda: compute_feature_arrays(P)
+
+
+# --- Model ---
+
+@benchmark("model.make_mlp_bagging.fit", "model", max_n=10000)
+def _bench_mlp_fit(ctx):
+    from src.model import make_mlp_bagging
+    X_tr, y_tr, _, _ = ctx.train_test()
+    return lambda: make_mlp_bagging().fit(X_tr, y_tr)
+
+
+@benchmark("model.make_mlp_bagging.predict_proba", "model", max_n=10000)
+def _bench_mlp_predict(ctx):
+    from src.model import make_mlp_bagging
+    X_tr, y_tr, X_te, _ = ctx.train_test()
+    clf = make_mlp_bagging().fit(X_tr, y_tr)
+    return lambda: clf.predict_proba(X_te)
+
+
+# --- Rolling training, backtest, equity ---
+
+@benchmark("train_predict.rolling_train_predict", "walkforward", max_n=2000, repeat=1)
+def _bench_rolling(ctx):
+    from src.train_predict import rolling_train_predict
+    d, cols = ctx.df_clean, ctx.feature_cols
+    return lambda: rolling_train_predict(d, cols)
+
+
+@benchmark("train_predict.AdaptiveRanking[top_k=8]", "walkforward")
+def _bench_adaptive_ranking(ctx):
+    """Top-K-rankningen över alla återträningsfönster, utan modellträning."""
+    from src.config import RETRAIN_STEP, ROLLING_TRAIN_WINDOW, LABEL_HORIZON
+    from src.feature_matrix import FeatureMatrix
+    from src.schedule import training_window_indices
+    from src.train_predict import AdaptiveRanking
+    fm = FeatureMatrix.from_frame(ctx.df_clean, ctx.feature_cols)
+
+    def run():
+        ranking = AdaptiveRanking(fm, top_k=8)
+        for anchor in range(RETRAIN_STEP, len(fm.X), RETRAIN_STEP):
+            # samma purgade fönster som rolling_train_predict (tomma fönster tränas aldrig)
+            tr_start, tr_end = training_window_indices(max(anchor - LABEL_HORIZON + 1, 0), ROLLING_TRAIN_WINDOW)
+            if tr_end > tr_start:
+                ranking.keep(tr_start, tr_end)
+        # med standardinställningarna ska rankningen återanvändas även när fönstret är fullt
+        if len(fm.X) > 2 * ROLLING_TRAIN_WINDOW and ranking.counts["reused"] == 0:
+            raise RuntimeError(f"AdaptiveRanking återanvände aldrig rankningen: {ranking.counts}")
+        return ranking.counts
+    return run
+
+
+@benchmark("backtest.backtest_six_windows", "walkforward", max_n=10000, repeat=1)
+def _bench_backtest(ctx):
+    from src.backtest import backtest_six_windows
+    d, cols = ctx.df_clean, ctx.feature_cols
+    return lambda: backtest_six_windows(d, cols)
+
+
+def _with_random_pred(ctx):
+    rng = np.random.default_rng(ctx.seed)
+    d = ctx.df.copy()
+    d["pred"] = (rng.random(len(d)) > 0.7).astype(float)
+    return d
+
+
+@benchmark("evaluate.equity_curve_buy_next_one", "equity")
+def _bench_equity_signal(ctx):
+    from src.evaluate import equity_curve_buy_next_one
+    d = _with_random_pred(ctx)
+    return lambda: equity_curve_buy_next_one(d)
+
+
+@benchmark("evaluate.equity_curve_dca_baseline", "equity")
+def _bench_equity_dca(ctx):
+    from src.evaluate import equity_curve_dca_baseline
+    d = _with_random_pred(ctx)
+    return lambda: equity_curve_dca_baseline(d)
+
+
+# --- step1_safe2 walk-forward ---
+
+def _reset_step1_state(mod, model_name, retrain="fixed"):
+    from src.drift import DriftRetrainScheduler
+    mod.MODEL_NAME = model_name
+    mod.clf = None
+    mod._online_rows = 0
+    mod._price_calendar = None
+    mod.retrain_scheduler = DriftRetrainScheduler() if retrain == "drift" else None
+    mod.decision_threshold = None
+    mod.last_train_date = pd.to_datetime("1900-01-01")
+    mod.y_proba_storage = []
+    mod.df_signals = pd.DataFrame(columns=["Date", "Close", "Signal"])
+
+
+def _register_step1(model_name, wf_days=120, retrain="fixed"):
+    def setup(ctx):
+        from src.API_Usage2_0 import step1_safe2 as mod
+        d = ctx.df_clean
+        end = d["Date"].max()
+        dates = pd.date_range(end=end, start=end - pd.Timedelta(days=wf_days))
+
+        def run():
+            _reset_step1_state(mod, model_name, retrain)
+            for date in dates:
+                mod.get_predictions(date, d)
+            return mod.df_signals
+        return run
+
+    suffix = "" if retrain == "fixed" else f",{retrain}"
+    benchmark(f"step1_safe2.walkforward[{model_name}{suffix}]", "walkforward", max_n=10000, repeat=1)(setup)
+
+
+_register_step1("hgb")
+_register_step1("mlp_bagging")
+_register_step1("online")
+_register_step1("hgb", retrain="drift")
+
+
+# --- Runner ---
+
+def _time_callable(fn, repeat):
+    times = []
+    for _ in range(repeat):
+        gc.collect()
+        t0 = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - t0)
+    return times
+
+
+def run_benchmarks(sizes, repeat=3, only=None, all_sizes=False, seed=0, process="gbm", log=print):
+    """
+    Kör alla (eller filtrerade) benchmarks för varje serielängd i sizes.
+    only: lista av prefix/grupper, t.ex. ["indicators", "model.make_mlp_bagging"].
+    process: syntetisk prisprocess (se synthetic.PROCESSES).
+    Returnerar en lista med resultat-dicts.
+    """
+    results = []
+    for n in sizes:
+        ctx = BenchContext(n, seed=seed, process=process)
+        for name, bench in BENCHMARKS.items():
+            if only and not any(name.startswith(p) or bench.group == p for p in only):
+                continue
+            row = {"name": name, "group": bench.group, "n": int(n)}
+            if not all_sizes and bench.max_n is not None and n > bench.max_n:
+                row["skipped"] = f"n > max_n ({bench.max_n}); use --all-sizes"
+                results.append(row)
+                log(f"[skip] {name:<50} n={n:<7} {row['skipped']}")
+                continue
+
+            reps = bench.repeat or repeat
+            with warnings.catch_warnings():
+                warnings.simplefilter("ignore")
+                try:
+                    t0 = time.perf_counter()
+                    fn = bench.setup(ctx)
+                    setup_s = time.perf_counter() - t0
+                    times = _time_callable(fn, reps)
+                except Exception as e:  # ett trasigt fall ska inte stoppa hela sviten
+                    row["error"] = f"{type(e).__name__}: {e}"
+                    results.append(row)
+                    log(f"[fail] {name:<50} n={n:<7} {row['error']}")
+                    continue
+
+            row.update({
+                "repeat": reps,
+                "setup_s": setup_s,
+                "times_s": times,
+                "min_s": min(times),
+                "median_s": statistics.median(times),
+                "mean_s": statistics.fmean(times),
+            })
+            results.append(row)
+            log(f"[ok]   {name:<50} n={n:<7} min={row['min_s']:.4f}s median={row['median_s']:.4f}s")
+    return results
@@ -0,0 +1,129 @@
+# -*- coding: utf-8 -*-
+"""
+Syntetiska prisserier för benchmarks och offline-körningar (samma schema som
+fetch_sp500_from_fred: Date, Close).
+
+Processer (seedade och deterministiska, 1k till 10M rader):
+  - "gbm":    geometrisk brownsk rörelse
+  - "regime": Markov-växlande regimer (t.ex. lugn uppgång / volatil nedgång) med egna mu/sigma
+  - "jump":   Merton-hopp (GBM plus Poisson-hopp med normalfördelad logstorlek)
+mu och sigma anges per år; dagssteg dt = 1/252. Datumen är handelsdagar (M-F) räknade med
+np.busday_offset, så även 10M rader (långt efter år 2262) får giltiga datetime64[us]-datum.
+Serier vars logpris skulle överstiga MAX_LOG_LEVEL (bara vid miljontals dagar) avtrendas så att
+Close förblir ändligt; avkastningarnas fördelning runt medel är oförändrad.
+
+    df = synthetic_prices(1_000_000, process="regime", seed=1)
+"""
+import numpy as np
+import pandas as pd
+
+DT = 1.0 / 252.0
+
+
+def trading_dates(n_days: int, start: str = "1990-01-01") -> np.ndarray:
+    """n_days vardagar (M-F) från start, som datetime64[us] (samma som pd.bdate_range)."""
+    first = np.datetime64(pd.Timestamp(start).date(), "D")
+    return np.busday_offset(first, np.arange(n_days), roll="forward").astype("datetime64[us]")
+
+
+# |log(Close/s0)| över detta skulle ge overflow i exp (float64 tål ~709)
+MAX_LOG_LEVEL = 600.0
+
+
+def _frame(log_ret, s0, start):
+    log_ret[0] = 0.0
+    level = np.cumsum(log_ret)
+    if np.abs(level).max() > MAX_LOG_LEVEL:
+        # mycket långa serier (miljoner dagar): ta bort driften så att priset förblir ändligt
+        level -= np.arange(len(level)) * (level[-1] / max(len(level) - 1, 1))
+    close = s0 * np.exp(level)
+    return pd.DataFrame({"Date": trading_dates(len(close), start), "Close": close})
+
+
+def gbm_prices(n_days: int, s0: float = 1000.0, mu: float = 0.07, sigma: float = 0.18,
+               seed: int = 0, start: str = "1990-01-01") -> pd.DataFrame:
+    """
+    Geometrisk brownsk rörelse på handelsdagar (M-F).
+    mu och sigma anges per år; dagssteg dt = 1/252.
+    """
+    rng = np.random.default_rng(seed)
+    shocks = rng.standard_normal(n_days)
+    log_ret = (mu - 0.5 * sigma ** 2) * DT + sigma * np.sqrt(DT) * shocks
+    return _frame(log_ret, s0, start)
+
+
+def regime_states(n_days: int, transition, rng) -> np.ndarray:
+    """
+    Regim per dag från en Markov-kedja med övergångsmatrisen transition (K x K, rader summerar
+    till 1). Varaktigheten i en regim är geometrisk, så kedjan dras segment för segment
+    (en iteration per regimbyte, inte per dag).
+    """
+    P = np.asarray(transition, dtype=float)
+    K = len(P)
+    stay = np.diag(P)
+    # nästa regim givet att vi lämnar den nuvarande
+    leave = np.where(np.eye(K, dtype=bool), 0.0, P)
+    leave = leave / np.maximum(leave.sum(axis=1, keepdims=True), 1e-300)
+
+    states = np.empty(n_days, dtype=np.int8)
+    pos, s = 0, int(rng.integers(K))
+    while pos < n_days:
+        length = n_days - pos if stay[s] >= 1.0 else int(rng.geometric(1.0 - stay[s]))
+        states[pos:pos + length] = s
+        pos += length
+        s = int(rng.choice(K, p=leave[s])) if K > 1 else s
+    return states
+
+
+def regime_switching_prices(n_days: int, s0: float = 1000.0,
+                            regimes=((0.12, 0.12), (-0.20, 0.35)),
+                            transition=((0.995, 0.005), (0.02, 0.98)),
+                            seed: int = 0, start: str = "1990-01-01") -> pd.DataFrame:
+    """
+    Regimväxlande GBM: regimes är (mu, sigma) per regim, transition den dagliga
+    övergångsmatrisen. Default: lugn uppgång (~200 dagar) och volatil nedgång (~50 dagar).
+    """
+    rng = np.random.default_rng(seed)
+    mu, sigma = (np.asarray(v, dtype=float) for v in zip(*regimes))
+    states = regime_states(n_days, transition, rng)
+    shocks = rng.standard_normal(n_days)
+    m, s = mu[states], sigma[states]
+    log_ret = (m - 0.5 * s ** 2) * DT + s * np.sqrt(DT) * shocks
+    df = _frame(log_ret, s0, start)
+    df.attrs["regime"] = states
+    return df
+
+
+def jump_diffusion_prices(n_days: int, s0: float = 1000.0, mu: float = 0.07, sigma: float = 0.15,
+                          jump_rate: float = 3.0, jump_mean: float = -0.03, jump_std: float = 0.05,
+                          seed: int = 0, start: str = "1990-01-01") -> pd.DataFrame:
+    """
+    Merton jump-diffusion: GBM plus Poisson(jump_rate per år)-hopp vars logstorlek är
+    N(jump_mean, jump_std). mu är den totala förväntade avkastningen per år (hoppens
+    medelbidrag kompenseras i driften).
+    """
+    rng = np.random.default_rng(seed)
+    shocks = rng.standard_normal(n_days)
+    n_jumps = rng.poisson(jump_rate * DT, n_days)
+    # summan av k normalfördelade hopp är N(k*m, k*s^2)
+    jumps = n_jumps * jump_mean + np.sqrt(n_jumps) * jump_std * rng.standard_normal(n_days)
+    kappa = np.exp(jump_mean + 0.5 * jump_std ** 2) - 1.0
+    log_ret = (mu - 0.5 * sigma ** 2 - jump_rate * kappa) * DT + sigma * np.sqrt(DT) * shocks + jumps
+    return _frame(log_ret, s0, start)
+
+
+PROCESSES = {
+    "gbm": gbm_prices,
+    "regime": regime_switching_prices,
+    "jump": jump_diffusion_prices,
+}
+
+
+def synthetic_prices(n_days: int, process: str = "gbm", seed: int = 0, start: str = "1990-01-01",
+                     **params) -> pd.DataFrame:
+    """Date/Close-serie från en av PROCESSES; params skickas vidare till processens funktion."""
+    try:
+        fn = PROCESSES[process]
+    except KeyError:
+        raise ValueError(f"Okänd process: {process!r} (välj bland {', '.join(PROCESSES)})") from None
+    return fn(n_days, seed=seed, start=start, **params)
@@ -0,0 +1,209 @@
+# -*- coding: utf-8 -*-
+"""
+Förberäknade, nedsamplade JSON-payloads för webb-dashboarden.
+
+Istället för att webbläsaren laddar hela signals_with_equity.csv och ritar varje dag
+skriver vi en liten JSON-fil per zoomnivå (1M/1Y/5Y/all):
+  - Close, Equity Value och DCA Value nedsamplas med LTTB (eller min/max per hink)
+  - raderna som behålls är unionen av de punkter som varje serie valt, så alla
+    serier delar samma x-axel (passar recharts radformat)
+  - sammanfattande nyckeltal beräknas på hela (icke-nedsamplade) fönstret
+Storleken blir därmed begränsad av max_points oavsett hur lång historiken är.
+"""
+import json
+import os
+
+import numpy as np
+import pandas as pd
+
+SERIES_COLS = ("Close", "Equity Value", "DCA Value")
+
+# zoomnivå -> tillbakablick (None = hela historiken)
+ZOOM_LEVELS = {
+    "1M": pd.DateOffset(months=1),
+    "1Y": pd.DateOffset(years=1),
+    "5Y": pd.DateOffset(years=5),
+    "all": None,
+}
+
+
+def lttb_indices(x: np.ndarray, y: np.ndarray, n_out: int) -> np.ndarray:
+    """
+    Largest-Triangle-Three-Buckets: väljer n_out punkter som bevarar kurvans form.
+    Första och sista punkten behålls alltid. Returnerar sorterade indexpositioner.
+    """
+    n = len(y)
+    if n_out >= n or n_out < 3:
+        return np.arange(n)
+
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+    # n_out-2 hinkar mellan första och sista punkten
+    edges = np.linspace(1, n - 1, n_out - 1).astype(np.int64)
+
+    out = np.empty(n_out, dtype=np.int64)
+    out[0] = 0
+    out[-1] = n - 1
+    a = 0
+    for i in range(n_out - 2):
+        start, end = edges[i], edges[i + 1]
+        if i + 2 < len(edges):
+            nxt_start, nxt_end = edges[i + 1], edges[i + 2]
+        else:
+            nxt_start, nxt_end = n - 1, n
+        avg_x = x[nxt_start:nxt_end].mean()
+        avg_y = y[nxt_start:nxt_end].mean()
+
+        # (dubbla) triangelarean mellan föregående vald punkt, kandidaten och nästa hinks medel
+        area = np.abs(
+            (x[a] - avg_x) * (y[start:end] - y[a])
+            - (x[a] - x[start:end]) * (avg_y - y[a])
+        )
+        a = start + int(np.argmax(area))
+        out[i + 1] = a
+    return out
+
+
+def minmax_indices(y: np.ndarray, n_out: int) -> np.ndarray:
+    """
+    Min/max-nedsampling: för varje hink behålls index för min och max.
+    Ger högst n_out punkter (n_out // 2 hinkar) plus första/sista punkten.
+    """
+    n = len(y)
+    if n_out >= n or n_out < 4:
+        return np.arange(n)
+
+    y = np.asarray(y, dtype=float)
+    n_buckets = max(1, n_out // 2)
+    edges = np.linspace(0, n, n_buckets + 1).astype(np.int64)
+    keep = [0, n - 1]
+    for start, end in zip(edges[:-1], edges[1:]):
+        if end <= start:
+            continue
+        seg = y[start:end]
+        keep.append(start + int(np.argmin(seg)))
+        keep.append(start + int(np.argmax(seg)))
+    return np.unique(np.asarray(keep, dtype=np.int64))
+
+
+def _max_drawdown(values: np.ndarray) -> float:
+    values = np.asarray(values, dtype=float)
+    values = values[np.isfinite(values)]
+    if len(values) == 0:
+        return 0.0
+    peak = np.maximum.accumulate(values)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        dd = np.where(peak > 0, values / peak - 1.0, 0.0)
+    return float(dd.min())
+
+
+def summary_stats(df: pd.DataFrame) -> dict:
+    """Nyckeltal för ett fönster (beräknas på full upplösning)."""
+    if len(df) == 0:
+        return {"n_rows": 0}
+
+    first, last = df.iloc[0], df.iloc[-1]
+    stats = {
+        "start": pd.Timestamp(first["Date"]).strftime("%Y-%m-%d"),
+        "end": pd.Timestamp(last["Date"]).strftime("%Y-%m-%d"),
+        "n_rows": int(len(df)),
+        "close_first": float(first["Close"]),
+        "close_last": float(last["Close"]),
+        "close_change_pct": float((last["Close"] / first["Close"] - 1.0) * 100.0),
+    }
+    if "Equity Value" in df.columns and "DCA Value" in df.columns:
+        eq, dca = float(last["Equity Value"]), float(last["DCA Value"])
+        stats.update({
+            "equity_last": eq,
+            "dca_last": dca,
+            "outperformance_pct": float((eq / dca - 1.0) * 100.0) if dca > 0 else None,
+            "equity_max_drawdown_pct": _max_drawdown(df["Equity Value"].to_numpy()) * 100.0,
+            "dca_max_drawdown_pct": _max_drawdown(df["DCA Value"].to_numpy()) * 100.0,
+        })
+    if "Signal" in df.columns:
+        stats["n_buy"] = int((df["Signal"] == "Buy").sum())
+    if "TN_TP_FP_FN" in df.columns:
+        counts = df["TN_TP_FP_FN"].value_counts()
+        stats["confusion"] = {k: int(counts.get(k, 0)) for k in ("TP", "FP", "TN", "FN")}
+    return stats
+
+
+def downsample_frame(df: pd.DataFrame, max_points: int = 500, method: str = "lttb",
+                     series_cols=SERIES_COLS) -> pd.DataFrame:
+    """
+    Nedsampla df så att varje serie i series_cols har högst max_points punkter.
+    Raderna som returneras är unionen av de index varje serie valt.
+    """
+    if len(df) <= max_points:
+        return df
+
+    x = pd.to_datetime(df["Date"]).to_numpy().astype("datetime64[D]").astype(np.int64)
+    keep = []
+    for col in series_cols:
+        if col not in df.columns:
+            continue
+        y = df[col].astype(float).ffill().bfill().to_numpy()
+        if method == "minmax":
+            keep.append(minmax_indices(y, max_points))
+        elif method == "lttb":
+            keep.append(lttb_indices(x, y, max_points))
+        else:
+            raise ValueError(f"Okänd nedsamplingsmetod: {method!r} (välj 'lttb' eller 'minmax')")
+    if not keep:
+        return df
+    idx = np.unique(np.concatenate(keep))
+    return df.iloc[idx]
+
+
+def build_chart_payloads(df: pd.DataFrame, max_points: int = 500, method: str = "lttb",
+                         zoom_levels=None) -> dict:
+    """
+    Bygger en payload per zoomnivå: {"zoom", "method", "columns", "rows", "summary"}.
+    'rows' är en lista av listor i samma ordning som 'columns' (kompaktare än objekt).
+    """
+    zoom_levels = ZOOM_LEVELS if zoom_levels is None else zoom_levels
+    df = df.copy()
+    df["Date"] = pd.to_datetime(df["Date"])
+    df = df.sort_values("Date").reset_index(drop=True)
+
+    columns = ["Date"] + [c for c in SERIES_COLS if c in df.columns]
+    if "Signal" in df.columns:
+        columns.append("Signal")
+
+    end = df["Date"].max()
+    payloads = {}
+    for zoom, offset in zoom_levels.items():
+        win = df if offset is None else df[df["Date"] >= end - offset]
+        ds = downsample_frame(win, max_points=max_points, method=method)
+
+        out = ds[columns].copy()
+        out["Date"] = out["Date"].dt.strftime("%Y-%m-%d")
+        for c in SERIES_COLS:
+            if c in out.columns:
+                out[c] = out[c].astype(float).round(2)
+        rows = out.astype(object).where(out.notna(), None).values.tolist()
+
+        payloads[zoom] = {
+            "zoom": zoom,
+            "method": method,
+            "columns": columns,
+            "rows": rows,
+            "summary": summary_stats(win),
+        }
+    return payloads
+
+
+def write_chart_payloads(df: pd.DataFrame, out_dir: str = "chart_payloads", max_points: int = 500,
+                         method: str = "lttb") -> list:
+    """
+    Skriver chart_<zoom>.json för varje zoomnivå till out_dir. Returnerar skrivna sökvägar.
+    """
+    os.makedirs(out_dir, exist_ok=True)
+    payloads = build_chart_payloads(df, max_points=max_points, method=method)
+    paths = []
+    for zoom, payload in payloads.items():
+        path = os.path.join(out_dir, f"chart_{zoom}.json")
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(payload, f, separators=(",", ":"))
+        paths.append(path)
+    return paths
@@ -0,0 +1,180 @@
+# -*- coding: utf-8 -*-
+"""
+Gemensam kommandorad för pipelinen:
+
+    python -m src fetch --start 1999-01-01 --out prices.csv
+    python -m src features --labels --out features.csv
+    python -m src walkforward --model hgb --years-back 2
+    python -m src equity --signals signals.csv
+    python -m src check-freshness --series SP500 --max-lag 4
+    python -m src check-freshness --require-new     # exit 1 om inget nytt sedan senaste körningen
+    python -m src runs --kind walkforward --start 2024-01-01   # jämför sparade körningar
+    python -m src --import-time check-freshness
+
+Själva modulen importerar bara standardbiblioteket. Tunga moduler (pandas, sklearn,
+matplotlib, ...) laddas först i det underkommando som behöver dem, via _load(), som också
+mäter importtiden per modul; --import-time skriver ut den (till stderr) när kommandot är klart.
+check-freshness använder bara freshness.py (urllib) och startar därför utan pandas.
+"""
+import argparse
+import importlib
+import os
+import sys
+import time
+
+_t_start = time.perf_counter()
+_import_times = {}
+
+
+def _load(name):
+    """importlib.import_module med tidmätning (räknas bara första gången modulen laddas)."""
+    if name in sys.modules:
+        return sys.modules[name]
+    t0 = time.perf_counter()
+    mod = importlib.import_module(name)
+    _import_times[name] = time.perf_counter() - t0
+    return mod
+
+
+def _print_import_times():
+    total = sum(_import_times.values())
+    print(f"\n=== IMPORT TIME (startup {time.perf_counter() - _t_start:.3f}s total, "
+          f"{total:.3f}s in lazy imports) ===", file=sys.stderr)
+    for name, s in sorted(_import_times.items(), key=lambda kv: kv[1], reverse=True):
+        print(f"  {name:<36} {s:>8.3f}s", file=sys.stderr)
+
+
+# --- Underkommandon ---
+
+def cmd_fetch(args):
+    stage_cache = _load("src.stage_cache")
+    df = stage_cache.sp500_pipeline(start=args.start, end=args.end, series_id=args.series).run("fetch")
+    df.to_csv(args.out, index=False)
+    print(f"Wrote {len(df)} rows ({df['Date'].min().date()} .. {df['Date'].max().date()}) to {args.out}")
+    return 0
+
+
+def cmd_features(args):
+    stage_cache = _load("src.stage_cache")
+    pipe = stage_cache.sp500_pipeline(start=args.start, end=args.end, series_id=args.series)
+    df = pipe.run("labels" if args.labels else "features")
+    df.to_csv(args.out, index=False)
+    print(f"Wrote {len(df)} rows x {df.shape[1]} columns to {args.out}")
+    return 0
+
+
+def cmd_walkforward(args):
+    # step1_safe2 läser sina STEP1_*-inställningar vid import
+    for env, value in (("STEP1_MODEL", args.model), ("STEP1_RETRAIN", args.retrain),
+                       ("STEP1_YEARS_BACK", args.years_back), ("STEP1_FETCH_START", args.start)):
+        if value is not None:
+            os.environ[env] = str(value)
+    if args.force:
+        os.environ["STEP1_SKIP_UNCHANGED"] = "0"
+    _load("src.API_Usage2_0.step1_safe2").main()
+    return 0
+
+
+def cmd_equity(args):
+    _load("src.API_Usage2_0.step2").main(args.signals)
+    return 0
+
+
+def cmd_check_freshness(args):
+    freshness = _load("src.freshness")
+    try:
+        info = freshness.data_lag(args.series, days_back=args.days_back)
+    except RuntimeError as e:
+        print(f"ERROR: {e}", file=sys.stderr)
+        return 2
+    if info["latest_date"] is None:
+        print(f"{args.series}: no observations in the last {args.days_back} days")
+        return 1
+    stale = info["lag_days"] > args.max_lag
+    print(f"{args.series}: latest {info['latest_date']} = {info['value']:,.2f}, "
+          f"{info['lag_days']} day(s) behind {info['today']}{' (STALE)' if stale else ''}")
+    print(f"  vintage {info['vintage']}, {info['requests']} request(s); last processed "
+          f"{info['processed_date']} -> {'NEW DATA' if info['new_data'] else 'nothing new'}")
+    if args.require_new:
+        return 0 if info["new_data"] else 1
+    return 1 if stale else 0
+
+
+def cmd_runs(args):
+    run_store = _load("src.run_store")
+    pd = _load("pandas")
+    with run_store.RunStore(args.db) as store:
+        ids = None
+        if args.kind or args.name:
+            ids = store.runs(kind=args.kind, name=args.name)["run_id"].tolist()
+        df = store.compare_runs(ids, start=args.start, end=args.end).tail(args.last)
+    with pd.option_context("display.width", 200, "display.max_columns", None):
+        print(df.drop(columns=["created_at"]).to_string(index=False) if len(df) else "No runs recorded")
+    return 0
+
+
+def build_parser():
+    ap = argparse.ArgumentParser(prog="python -m src", description="S&P 500 signal pipeline.")
+    ap.add_argument("--import-time", action="store_true",
+                    help="Print per-module import time of the subcommand to stderr.")
+    sub = ap.add_subparsers(dest="command", required=True)
+
+    def data_args(p):
+        p.add_argument("--start", default="1999-01-01")
+        p.add_argument("--end", default=None, help="Default today.")
+        p.add_argument("--series", default="SP500")
+
+    p = sub.add_parser("fetch", help="Fetch prices from FRED (via the stage cache) to CSV.")
+    data_args(p)
+    p.add_argument("--out", default="prices.csv")
+    p.set_defaults(func=cmd_fetch)
+
+    p = sub.add_parser("features", help="Build the feature set (optionally with labels) to CSV.")
+    data_args(p)
+    p.add_argument("--labels", action="store_true", help="Include the label column.")
+    p.add_argument("--out", default="features.csv")
+    p.set_defaults(func=cmd_features)
+
+    p = sub.add_parser("walkforward", help="Run the step1_safe2 walk-forward and write signals.csv.")
+    p.add_argument("--model", default=None, help="STEP1_MODEL (mlp_bagging, hgb, online).")
+    p.add_argument("--retrain", default=None, choices=["fixed", "drift"], help="STEP1_RETRAIN.")
+    p.add_argument("--years-back", type=int, default=None, help="STEP1_YEARS_BACK.")
+    p.add_argument("--start", default=None, help="STEP1_FETCH_START.")
+    p.add_argument("--force", action="store_true", help="Run even if FRED has nothing new.")
+    p.set_defaults(func=cmd_walkforward)
+
+    p = sub.add_parser("equity", help="Equity vs DCA from signals.csv (step2).")
+    p.add_argument("--signals", default="signals.csv")
+    p.set_defaults(func=cmd_equity)
+
+    p = sub.add_parser("check-freshness", help="Latest FRED observation and lag in days (no pandas).")
+    p.add_argument("--series", default="SP500")
+    p.add_argument("--days-back", type=int, default=10)
+    p.add_argument("--max-lag", type=int, default=4,
+                   help="Exit code 1 if the latest observation is older than this many days.")
+    p.add_argument("--require-new", action="store_true",
+                   help="Exit code 1 if nothing new arrived since the pipeline last ran (ignores --max-lag).")
+    p.set_defaults(func=cmd_check_freshness)
+
+    p = sub.add_parser("runs", help="Compare runs recorded in the SQLite run store.")
+    p.add_argument("--db", default=None, help="Default PIPELINE_DB or runs.sqlite.")
+    p.add_argument("--kind", default=None, help="walkforward or backtest.")
+    p.add_argument("--name", default=None)
+    p.add_argument("--start", default=None, help="Only signals on/after this date.")
+    p.add_argument("--end", default=None, help="Only signals on/before this date.")
+    p.add_argument("--last", type=int, default=20, help="Show the last N runs.")
+    p.set_defaults(func=cmd_runs)
+    return ap
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    try:
+        return args.func(args)
+    finally:
+        if args.import_time:
+            _print_import_times()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -25,6 +25,28 @@ BACKTEST_WINDOWS = 24  # 1 mån/fönster
 STD_UP_MULT = 1.0  # TODO: justera efter behov/övning
 # (vill du även ha en nedre gräns kan du lägga till STD_DOWN_MULT)
 
+# Drift-styrd återträning (se drift.py): tränas om när feature-medel (median över features)
+# flyttat sig mer än DRIFT_FEATURE_THRESHOLD standardavvikelser från träningsfönstrets sista
+# DRIFT_BASELINE_ROWS rader eller PSI på proba_buy överstiger
+# DRIFT_PSI_THRESHOLD, tidigast efter DRIFT_MIN_AGE och senast efter DRIFT_MAX_AGE (dagar/rader)
+DRIFT_FEATURE_THRESHOLD = 2.0
+DRIFT_BASELINE_ROWS = 250
+DRIFT_PSI_THRESHOLD = 0.25
+DRIFT_MIN_AGE = 5
+DRIFT_MAX_AGE = 4 * RETRAIN_STEP
+DRIFT_CHECK_STEP = 5
+# "fixed" (var RETRAIN_STEP) eller "drift"
+RETRAIN_MODE = "fixed"
+
+# Adaptiv feature-subset i rolling_train_predict: None = alla features, annars top-K per ankare
+ADAPTIVE_TOP_K = None
+# Återanvänd senaste rankningen så länge högst denna andel av träningsfönstrets rader är nya
+# (med fullt fönster på ROLLING_TRAIN_WINDOW rader flyttar varje ankare det RETRAIN_STEP rader)
+RANK_REUSE_FRAC = 0.02
+
+# Datatyp för feature-matrisen (se feature_matrix.py); "float64" ger samma precision som tidigare
+FEATURE_DTYPE = "float32"
+
 
 def get_fred_api_key() -> str:
 	"""Return the FRED API key from environment variables.
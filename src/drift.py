@@ -0,0 +1,188 @@
+# -*- coding: utf-8 -*-
+"""
+Drift-styrd återträning istället för fast RETRAIN_STEP.
+
+- Welford: strömmande medel/varians (rad för rad eller i block via Chans sammanslagning)
+- psi(): Population Stability Index mellan två fördelningar (kvantilhinkar från referensen
+  eller fasta hinkgränser)
+- DriftMonitor: jämför strömmen sedan senaste träningen mot träningsfönstret
+    * feature-drift: median över features av |medel_nu - medel_bas| / std_bas, där basen är
+      träningsfönstrets sista baseline_rows rader (nuvarande regim; hela fönstret spänner över
+      decennier av prisnivåer). Median, eftersom prisnivå-features som SMA_* följer trenden.
+      Kräver minst min_recent nya rader, annars dominerar brus från enstaka dagar
+    * prediktionsdrift: PSI på proba_buy. Referensen är de första psi_ref prognoserna efter
+      träningen (out-of-sample); modellens egna sannolikheter på träningsfönstret är
+      överanpassade och skulle ge hög PSI direkt. Hinkarna är fasta på [0, 1]: kvantilhinkar
+      från 20 prognoser ligger så tätt att varje liten nivåförskjutning ger hög PSI. Med så få prognoser är PSI positivt
+      biaserad (ungefär (bins-1)*(1/n_ref + 1/n_nu) även utan drift), så det förväntade
+      bruset dras av innan jämförelse med tröskeln
+- DriftRetrainScheduler: tränar om bara när drift överstiger tröskeln (efter min_age) eller
+  när modellen nått max_age, och räknar hur många fasta RETRAIN_STEP-omträningar som hoppades över
+"""
+import numpy as np
+
+try:
+    from src.config import (RETRAIN_STEP, DRIFT_FEATURE_THRESHOLD, DRIFT_PSI_THRESHOLD, DRIFT_BASELINE_ROWS,
+                            DRIFT_MIN_AGE, DRIFT_MAX_AGE)
+except ImportError:
+    try:
+        from .config import (RETRAIN_STEP, DRIFT_FEATURE_THRESHOLD, DRIFT_PSI_THRESHOLD, DRIFT_BASELINE_ROWS,
+                             DRIFT_MIN_AGE, DRIFT_MAX_AGE)
+    except ImportError:
+        from config import (RETRAIN_STEP, DRIFT_FEATURE_THRESHOLD, DRIFT_PSI_THRESHOLD, DRIFT_BASELINE_ROWS,
+                            DRIFT_MIN_AGE, DRIFT_MAX_AGE)
+
+
+class Welford:
+    """Strömmande medel och varians per kolumn."""
+
+    def __init__(self, n_features=None):
+        self.n = 0
+        self.mean = None if n_features is None else np.zeros(n_features)
+        self.m2 = None if n_features is None else np.zeros(n_features)
+
+    def update(self, X):
+        """Lägger till en rad (1-D) eller ett block rader (2-D)."""
+        X = np.atleast_2d(np.asarray(X, dtype=float))
+        if len(X) == 0:
+            return self
+        n_b = len(X)
+        mean_b = X.mean(axis=0)
+        m2_b = ((X - mean_b) ** 2).sum(axis=0)
+        if self.n == 0:
+            self.n, self.mean, self.m2 = n_b, mean_b, m2_b
+            return self
+        n = self.n + n_b
+        delta = mean_b - self.mean
+        self.mean = self.mean + delta * (n_b / n)
+        self.m2 = self.m2 + m2_b + delta ** 2 * (self.n * n_b / n)
+        self.n = n
+        return self
+
+    @property
+    def var(self):
+        return self.m2 / (self.n - 1) if self.n > 1 else np.full_like(self.mean, np.nan)
+
+    @property
+    def std(self):
+        return np.sqrt(self.var)
+
+
+def psi(expected, actual, bins=10, eps=1e-4, edges=None):
+    """Population Stability Index; hinkgränser = inre edges, annars kvantiler av expected."""
+    expected = np.asarray(expected, dtype=float)
+    actual = np.asarray(actual, dtype=float)
+    if len(expected) == 0 or len(actual) == 0:
+        return 0.0
+    if edges is None:
+        edges = np.unique(np.quantile(expected, np.linspace(0, 1, bins + 1)[1:-1]))
+    e = np.bincount(np.searchsorted(edges, expected, side="right"), minlength=len(edges) + 1) / len(expected)
+    a = np.bincount(np.searchsorted(edges, actual, side="right"), minlength=len(edges) + 1) / len(actual)
+    e, a = np.maximum(e, eps), np.maximum(a, eps)
+    return float(np.sum((a - e) * np.log(a / e)))
+
+
+class DriftMonitor:
+    def __init__(self, feature_threshold=DRIFT_FEATURE_THRESHOLD, psi_threshold=DRIFT_PSI_THRESHOLD,
+                 baseline_rows=DRIFT_BASELINE_ROWS, min_recent=10, psi_ref=20, psi_bins=5):
+        self.feature_threshold = feature_threshold
+        self.psi_threshold = psi_threshold
+        self.baseline_rows = baseline_rows
+        self.min_recent = min_recent
+        self.psi_ref = psi_ref
+        self.psi_bins = psi_bins
+        self.train_stats = None
+        self.recent = None
+        self.proba_ref = []
+        self.proba_recent = []
+
+    def reset(self, X_train):
+        """Ny baslinje efter träning på X_train."""
+        self.train_stats = Welford().update(X_train[-self.baseline_rows:])
+        self.recent = Welford()
+        self.proba_ref = []
+        self.proba_recent = []
+
+    def observe(self, X=None, proba=None):
+        if X is not None:
+            self.recent.update(X)
+        if proba is not None:
+            for p in np.atleast_1d(np.asarray(proba, dtype=float)):
+                (self.proba_ref if len(self.proba_ref) < self.psi_ref else self.proba_recent).append(p)
+
+    def status(self):
+        shift = 0.0
+        if self.recent is not None and self.recent.n >= self.min_recent:
+            std = np.where(self.train_stats.std > 0, self.train_stats.std, np.nan)
+            shift = float(np.nanmedian(np.abs(self.recent.mean - self.train_stats.mean) / std))
+        psi_val = 0.0
+        if len(self.proba_recent) >= self.psi_ref:
+            noise = (self.psi_bins - 1) * (1 / len(self.proba_ref) + 1 / len(self.proba_recent))
+            psi_val = max(0.0, psi(self.proba_ref, self.proba_recent,
+                                   edges=np.linspace(0, 1, self.psi_bins + 1)[1:-1]) - noise)
+        return {"feature_shift": shift, "psi": psi_val, "n_recent": 0 if self.recent is None else self.recent.n}
+
+    def drifted(self):
+        st = self.status()
+        if st["feature_shift"] > self.feature_threshold:
+            return "feature_drift"
+        if st["psi"] > self.psi_threshold:
+            return "proba_psi"
+        return None
+
+
+class DriftRetrainScheduler:
+    """
+    Bestämmer när modellen ska tränas om. t är en monoton tidpunkt i valfri enhet
+    (radposition i rolling_train_predict, dagnummer i step1_safe2); åldrar mäts i samma enhet.
+    skipped = antal träningar ett fast schema (var fixed_step sedan första träningen) hade
+    gjort fram till senaste kontrollpunkten, minus antal gjorda träningar.
+    """
+
+    def __init__(self, fixed_step=RETRAIN_STEP, min_age=DRIFT_MIN_AGE, max_age=DRIFT_MAX_AGE, **monitor_kw):
+        self.fixed_step = fixed_step
+        self.min_age = min_age
+        self.max_age = max_age
+        self.monitor = DriftMonitor(**monitor_kw)
+        self.first_fit = None
+        self.last_fit = None
+        self.last_t = None
+        self.fits = 0
+        self.reasons = {}
+
+    def due(self, t):
+        """(True/False, orsak). Anropas vid varje kontrollpunkt innan dagens/blockets prognos."""
+        self.last_t = t
+        if self.last_fit is None:
+            return True, "initial"
+        age = t - self.last_fit
+        if age >= self.max_age:
+            return True, "max_age"
+        if age >= self.min_age:
+            reason = self.monitor.drifted()
+            if reason:
+                return True, reason
+        return False, None
+
+    def fitted(self, t, X_train, reason="initial"):
+        if self.first_fit is None:
+            self.first_fit = t
+        self.last_fit = t
+        self.last_t = t
+        self.fits += 1
+        self.reasons[reason] = self.reasons.get(reason, 0) + 1
+        self.monitor.reset(X_train)
+
+    def observe(self, X=None, proba=None):
+        self.monitor.observe(X, proba)
+
+    @property
+    def skipped(self):
+        if self.first_fit is None:
+            return 0
+        fixed_fits = (self.last_t - self.first_fit) // self.fixed_step + 1
+        return int(max(0, fixed_fits - self.fits))
+
+    def summary(self):
+        return {"fits": self.fits, "skipped": self.skipped, "reasons": dict(self.reasons),
+                **self.monitor.status()}
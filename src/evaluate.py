@@ -1,10 +1,20 @@
 # -*- coding: utf-8 -*-
 """
 Utvärdering och enkel equity-kurva för regeln "köp på nästa '1'-dag efter insättning".
+
+Insättningsdagar kommer från en TradingCalendar (första handelsdagen >= monthly_day i varje
+månad), och kurvorna räknas med kumulativa summor istället för en iterrows-loop.
 """
-import pandas as pd
 import numpy as np
 
+try:
+    from src.trading_calendar import TradingCalendar
+except ImportError:
+    try:
+        from .trading_calendar import TradingCalendar
+    except ImportError:
+        from trading_calendar import TradingCalendar
+
 def confusion_counts(y_true, y_pred):
     tp = int(((y_pred == 1) & (y_true == 1)).sum())
     tn = int(((y_pred == 0) & (y_true == 0)).sum())
@@ -18,96 +28,82 @@ def precision_recall_f1(tp, tn, fp, fn):
     f1 = 2 * precision * recall / (precision + recall) if (precision + recall) > 0 else 0.0
     return precision, recall, f1
 
-def equity_curve_buy_next_one(df, monthly_day=25, contribution=1000.0, price_col="Close"):
+
+def signal_dca_positions(close, buy, deposit_rows, contribution=1000.0):
+    """
+    (cash, units) per rad när contribution sätts in på deposit_rows och alla kontanter
+    investeras till close på varje rad där buy är sant (insättning före köp samma dag).
+    close/buy är (T,) eller (T x A) (t.ex. A simulerade banor med samma kalender).
+    """
+    close = np.asarray(close, dtype=float)
+    buy = np.asarray(buy, dtype=bool)
+    deposits = np.zeros(len(close))
+    deposits[deposit_rows] = contribution
+    deposited = np.cumsum(deposits)
+    if close.ndim == 2:
+        deposited = deposited[:, None]
+
+    rows = np.arange(len(close)).reshape((-1,) + (1,) * (close.ndim - 1))
+    last_buy = np.maximum.accumulate(np.where(buy, rows, -1), axis=0)  # senaste köprad <= t
+    prev_buy = np.empty_like(last_buy)  # senaste köprad < t
+    prev_buy[0] = -1
+    prev_buy[1:] = last_buy[:-1]
+
+    def deposited_at(idx):
+        at = np.take_along_axis(np.broadcast_to(deposited, close.shape), np.maximum(idx, 0), axis=0)
+        return np.where(idx >= 0, at, 0.0)
+
+    cash = deposited - deposited_at(last_buy)
+    # på en köpdag investeras allt som satts in sedan förra köpet
+    bought = np.where(buy, (deposited - deposited_at(prev_buy)) / np.where(buy, close, 1.0), 0.0)
+    return cash, np.cumsum(bought, axis=0)
+
+
+def dca_units(close, deposit_rows, contribution=1000.0):
+    """Andelar per rad ((T,) eller (T x A)) när contribution alltid investeras direkt på deposit_rows."""
+    close = np.asarray(close, dtype=float)
+    bought = np.zeros_like(close)
+    at = close[deposit_rows]
+    bought[deposit_rows] = np.where(at > 0, contribution / np.where(at > 0, at, 1.0), 0.0)
+    return np.cumsum(bought, axis=0)
+
+
+def _priced(df, price_col, calendar):
+    df = df.dropna(subset=[price_col]).reset_index(drop=True)
+    if calendar is None or len(calendar) != len(df):
+        calendar = TradingCalendar.from_frame(df)
+    return df, calendar
+
+
+def equity_curve_buy_next_one(df, monthly_day=25, contribution=1000.0, price_col="Close", calendar=None):
     """
     Förenklad DCA-simulering:
-      - varje månad vid 'monthly_day' sätts en kontant-insättning (contribution)
+      - varje månad sätts en kontant-insättning (contribution) in på första handelsdagen
+        >= 'monthly_day'
       - köp utförs på första handelsdag >= insättningsdagen där pred == 1
-      - köpet sker till 'Close' den dagen, andelsmängd = contribution / Close
+      - köpet sker till 'Close' den dagen, andelsmängd = väntande kontanter / Close
       - annars ligger kontanter kvar tills villkor inträffar
       - återinvestera inte utdelningar (index)
+    calendar: TradingCalendar för df efter dropna på price_col (byggs annars här).
     Returnerar DataFrame med kolumner: cash, units, equity.
     """
-    df = df.copy()
-    df = df.dropna(subset=[price_col]).reset_index(drop=True)
-
-    df["cash"] = 0.0
-    df["units"] = 0.0
-
-    cash = 0.0
-    units = 0.0
-    last_month = None
-    pending = 0.0
-
-    for i, row in df.iterrows():
-        d = pd.to_datetime(row["Date"])
-        # månatlig insättning
-        if (last_month is None) or (d.month != last_month):
-            last_month = d.month
-            # hitta månadens "betalningsdag"
-            if d.day >= monthly_day:
-                # om vi är på eller efter "betalningsdagen" denna månad
-                cash += contribution
-                pending += contribution
-            else:
-                # vänta tills vi når betalningsdagen
-                pass
-
-        # om dagen är exakt betalningsdag, lägg in pengarna
-        if d.day == monthly_day:
-            cash += contribution
-            pending += contribution
-
-        # köp om pred == 1 och pending > 0
-        if (row.get("pred", np.nan) == 1) and (pending > 0):
-            price = row[price_col]
-            if price > 0:
-                buy_units = pending / price
-                units += buy_units
-                cash -= pending
-                pending = 0.0
-
-        df.loc[i, "cash"] = cash + pending  # pending räknas som kontanter tills köp sker
-        df.loc[i, "units"] = units
-
+    df, calendar = _priced(df, price_col, calendar)
+    close = df[price_col].to_numpy(dtype=float)
+    pred = df["pred"].to_numpy(dtype=float) if "pred" in df.columns else np.full(len(df), np.nan)
+    cash, units = signal_dca_positions(close, (pred == 1) & (close > 0),
+                                       calendar.deposit_rows(monthly_day), contribution)
+    df["cash"] = cash
+    df["units"] = units
     df["equity"] = df["units"] * df[price_col] + df["cash"]
     return df
 
 
-def equity_curve_dca_baseline(df, monthly_day=25, contribution=1000.0, price_col="Close"):
+def equity_curve_dca_baseline(df, monthly_day=25, contribution=1000.0, price_col="Close", calendar=None):
     """
     Baseline DCA: köp alltid på 'monthly_day' (eller första handelsdagen >= monthly_day).
     """
-    df = df.copy().dropna(subset=[price_col]).reset_index(drop=True)
+    df, calendar = _priced(df, price_col, calendar)
     df["cash"] = 0.0
-    df["units"] = 0.0
-
-    cash = 0.0
-    units = 0.0
-    last_month = None
-
-    for i, row in df.iterrows():
-        d = pd.to_datetime(row["Date"])
-        if (last_month is None) or (d.month != last_month):
-            last_month = d.month
-            if d.day >= monthly_day:
-                # köp direkt på denna dag
-                price = row[price_col]
-                if price > 0:
-                    buy_units = contribution / price
-                    units += buy_units
-            else:
-                # vänta tills vi når betalningsdagen denna månad
-                pass
-
-        if d.day == monthly_day:
-            price = row[price_col]
-            if price > 0:
-                buy_units = contribution / price
-                units += contribution / price
-
-        df.loc[i, "cash"] = cash
-        df.loc[i, "units"] = units
-
+    df["units"] = dca_units(df[price_col].to_numpy(dtype=float), calendar.deposit_rows(monthly_day), contribution)
     df["equity"] = df["units"] * df[price_col] + df["cash"]
     return df
@@ -0,0 +1,99 @@
+# -*- coding: utf-8 -*-
+"""
+Feature-matris: en sammanhängande (C-ordnad) array för alla features, byggd en gång.
+
+Istället för att varje ankare/fönster gör df.copy() -> dropna -> [feature_cols].values
+(en ny float64-kopia per träning) bygger vi:
+  - X:      (n_rader, n_features) i FEATURE_DTYPE (default float32), C-ordnad
+  - y:      label som float (NaN där label saknas)
+  - valid:  True där alla features är ändliga
+  - dates:  datetime64-array för searchsorted-uppslag
+Tränings- och testutsnitt blir vyer (ingen kopia) så länge de giltiga raderna i fönstret
+ligger i ett sammanhängande block, vilket är normalfallet: NaN finns bara i features
+uppvärmningsprefix och i labelns sista horisont-dagar.
+"""
+import numpy as np
+import pandas as pd
+import sys
+import os
+
+# Add project root to path if not already there
+project_root = os.path.join(os.path.dirname(__file__), '..')
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+
+try:
+    from src.config import FEATURE_DTYPE
+except ImportError:
+    try:
+        from .config import FEATURE_DTYPE
+    except ImportError:
+        from config import FEATURE_DTYPE
+
+
+class FeatureMatrix:
+    def __init__(self, X, y, dates, feature_cols):
+        self.X = X
+        self.y = y
+        self.dates = dates
+        self.feature_cols = list(feature_cols)
+        self.valid = np.isfinite(X).all(axis=1)
+        self.labeled = np.isfinite(y) if y is not None else np.zeros(len(X), dtype=bool)
+
+    @classmethod
+    def from_frame(cls, df: pd.DataFrame, feature_cols, label_col="label", date_col="Date",
+                   dtype=FEATURE_DTYPE):
+        X = np.ascontiguousarray(df[list(feature_cols)].to_numpy(dtype=dtype))
+        y = df[label_col].to_numpy(dtype=float) if label_col in df.columns else None
+        dates = pd.to_datetime(df[date_col]).to_numpy()
+        return cls(X, y, dates, feature_cols)
+
+    def __len__(self):
+        return len(self.X)
+
+    @property
+    def nbytes(self):
+        return self.X.nbytes
+
+    def position(self, date, side="left") -> int:
+        """Radposition för date (side='left': första rad >= date, 'right': första rad > date)."""
+        return int(np.searchsorted(self.dates, np.datetime64(pd.Timestamp(date)), side=side))
+
+    def rows(self, start, end, require_label=False):
+        """
+        Giltiga radpositioner i [start, end) som en slice om de är sammanhängande
+        (ger vyer vid indexering), annars som en int-array.
+        """
+        start, end = max(0, int(start)), min(len(self), int(end))
+        if end <= start:
+            return slice(start, start)
+        m = self.valid[start:end]
+        if require_label:
+            m = m & self.labeled[start:end]
+        idx = np.flatnonzero(m)
+        if len(idx) == 0:
+            return slice(start, start)
+        if idx[-1] - idx[0] + 1 == len(idx):
+            return slice(start + int(idx[0]), start + int(idx[-1]) + 1)
+        return idx + start
+
+    def window(self, start, end, require_label=False):
+        """
+        (X, y, rows) för giltiga rader i [start, end). X/y är vyer när rows är en slice.
+        y returneras som int när require_label=True, annars som float (kan innehålla NaN).
+        """
+        rows = self.rows(start, end, require_label=require_label)
+        X = self.X[rows]
+        y = None
+        if self.y is not None:
+            y = self.y[rows]
+            if require_label:
+                y = y.astype(int)
+        return X, y, rows
+
+    @staticmethod
+    def positions(rows) -> np.ndarray:
+        """rows (slice eller int-array) som int-array, för att skriva tillbaka resultat."""
+        if isinstance(rows, slice):
+            return np.arange(rows.start, rows.stop)
+        return np.asarray(rows)
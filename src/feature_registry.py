@@ -0,0 +1,222 @@
+# -*- coding: utf-8 -*-
+"""
+Deklarativt feature-register: varje feature anger vilka indikatorer den bygger på och
+hur lång uppvärmning (ledande NaN-rader) den har.
+
+- features slås upp på namn enligt samma mönster som build_feature_set använder:
+    SMA_{n}_avg / SMA_{n}_min   (SES-prognostiserad framåt-SMA, H = n)
+    MomEma_{n}_{ofs}, MomTema_{n}_{ofs}, RCTema_{n}, LogReturn_{n}, RTF_{n}_slope
+- plan(names) bygger den minimala beroendegrafen (DAG) i topologisk ordning; delade
+  mellanled (t.ex. EMA(100) för både MomEma_100_15 och RCTema_100, eller framåt-SMA(30)
+  för både _avg och _min) räknas en gång
+- warmup(name) ger antal ledande NaN-rader, så trimning av uppvärmningsprefixet kan
+  räknas ut i förväg istället för att upptäckas via dropna
+
+Beräkningarna körs med panel-funktionerna i panel_indicators.py på en (T x A)-array,
+så samma plan fungerar för en enskild serie (A = 1) och för många tillgångar.
+"""
+import re
+from dataclasses import dataclass
+from typing import Callable, Tuple
+
+import numpy as np
+import pandas as pd
+
+try:
+    from src import panel_indicators as pi
+    from src.indicators import rtf
+except ImportError:
+    try:
+        from . import panel_indicators as pi
+        from .indicators import rtf
+    except ImportError:
+        import panel_indicators as pi
+        from indicators import rtf
+
+# SES-alpha för framåt-SMA-featuresen (samma som build_feature_set)
+SES_ALPHA = 0.5
+
+# Sub-model 4 i samma kolumnordning som build_feature_set
+DEFAULT_FEATURES = (
+    "SMA_30_avg", "SMA_30_min", "SMA_100_avg", "SMA_100_min", "SMA_150_avg", "SMA_150_min",
+    "MomEma_150_15", "MomEma_70_15", "MomEma_100_15",
+    "MomTema_300_15",
+    "RCTema_200", "RCTema_100",
+    "LogReturn_30",
+)
+
+
+@dataclass(frozen=True)
+class Node:
+    """En nod i beroendegrafen: fn(P, *deps) -> (T x A)-array, warmup = ledande NaN-rader."""
+    name: str
+    deps: Tuple[str, ...]
+    fn: Callable
+    warmup: int
+
+
+def _ema_node(n, level):
+    # EMA av nivå 'level' (1 = på priset, 2 = EMA av EMA, ...); seedas efter föregående NaN-prefix
+    if level == 1:
+        return Node(f"ema{n}", (), lambda P: pi.ema_seeded_panel(P, n), n - 1)
+    prev = f"ema{n}" if level == 2 else f"ema{n}^{level - 1}"
+    return Node(f"ema{n}^{level}", (prev,), lambda P, e: pi.ema_seeded_panel(e, n), level * (n - 1))
+
+
+def _ratio_to_lag(x, ofs):
+    return x / pi._shift(x, ofs)
+
+
+_PATTERNS = []
+
+
+def _pattern(regex):
+    def deco(factory):
+        _PATTERNS.append((re.compile(regex), factory))
+        return factory
+    return deco
+
+
+@_pattern(r"^ema(\d+)$")
+def _ema1(n):
+    return _ema_node(int(n), 1)
+
+
+@_pattern(r"^ema(\d+)\^([23])$")
+def _ema_k(n, level):
+    return _ema_node(int(n), int(level))
+
+
+@_pattern(r"^tema(\d+)$")
+def _tema(n):
+    n = int(n)
+    return Node(f"tema{n}", (f"ema{n}", f"ema{n}^2", f"ema{n}^3"),
+                lambda P, e1, e2, e3: 3.0 * e1 - 3.0 * e2 + e3, 3 * (n - 1))
+
+
+@_pattern(r"^fwd_sma(\d+)$")
+def _fwd_sma(n):
+    n = int(n)
+    # ger en (2, T, A)-array: [avg, min]
+    def fn(P):
+        d = pi.ses_forward_sma_panel(P, alpha=SES_ALPHA, sma_windows=(n,))
+        return np.stack([d[f"FWD_SMA_{n}_avg"], d[f"FWD_SMA_{n}_min"]])
+    return Node(f"fwd_sma{n}", (), fn, 0)
+
+
+@_pattern(r"^SMA_(\d+)_(avg|min)$")
+def _sma_feature(n, stat):
+    i = 0 if stat == "avg" else 1
+    return Node(f"SMA_{n}_{stat}", (f"fwd_sma{int(n)}",), lambda P, f: f[i], 0)
+
+
+@_pattern(r"^MomEma_(\d+)_(\d+)$")
+def _mom_ema(n, ofs):
+    n, ofs = int(n), int(ofs)
+    return Node(f"MomEma_{n}_{ofs}", (f"ema{n}",), lambda P, e: _ratio_to_lag(e, ofs), n - 1 + ofs)
+
+
+@_pattern(r"^MomTema_(\d+)_(\d+)$")
+def _mom_tema(n, ofs):
+    n, ofs = int(n), int(ofs)
+    return Node(f"MomTema_{n}_{ofs}", (f"tema{n}",), lambda P, t: _ratio_to_lag(t, ofs), 3 * (n - 1) + ofs)
+
+
+@_pattern(r"^RCTema_(\d+)$")
+def _rc_tema(n):
+    n = int(n)
+    return Node(f"RCTema_{n}", (f"tema{n}",), lambda P, t: P / t, 3 * (n - 1))
+
+
+@_pattern(r"^LogReturn_(\d+)$")
+def _log_return(n):
+    n = int(n)
+    return Node(f"LogReturn_{n}", (), lambda P: pi.log_return_panel(P, n), n)
+
+
+@_pattern(r"^RTF_(\d+)_slope$")
+def _rtf(n):
+    n = int(n)
+    def fn(P):
+        return np.column_stack([rtf(pd.Series(P[:, a]), window=n).to_numpy() for a in range(P.shape[1])])
+    return Node(f"RTF_{n}_slope", (), fn, n - 1)
+
+
+_nodes = {}
+
+
+def node(name) -> Node:
+    """Slår upp (och cachar) noden för ett feature- eller indikatornamn."""
+    nd = _nodes.get(name)
+    if nd is None:
+        for regex, factory in _PATTERNS:
+            m = regex.match(name)
+            if m:
+                nd = _nodes[name] = factory(*m.groups())
+                break
+        else:
+            raise KeyError(f"Okänd feature: {name!r}")
+    return nd
+
+
+def warmup(name) -> int:
+    """Antal ledande NaN-rader för featuren (på en serie utan luckor)."""
+    return node(name).warmup
+
+
+def warmup_length(names=DEFAULT_FEATURES) -> int:
+    """Längsta uppvärmningen bland names = första rad där alla är giltiga."""
+    return max((warmup(n) for n in names), default=0)
+
+
+def plan(names=DEFAULT_FEATURES):
+    """Minimal beroendegraf för names i topologisk ordning (beroenden före användare)."""
+    order, seen = [], set()
+
+    def visit(name):
+        if name in seen:
+            return
+        seen.add(name)
+        for dep in node(name).deps:
+            visit(dep)
+        order.append(name)
+
+    for name in names:
+        visit(name)
+    return order
+
+
+def evaluate(P, names=DEFAULT_FEATURES) -> dict:
+    """Räknar names på (T x A)-arrayen P. Returnerar {namn: (T x A)}; mellanled släpps efter sista användning."""
+    P = pi._as_panel(P)
+    names = list(names)
+    order = plan(names)
+    last_use = {}
+    for i, name in enumerate(order):
+        for dep in node(name).deps:
+            last_use[dep] = i
+    wanted = set(names)
+
+    values = {}
+    for i, name in enumerate(order):
+        nd = node(name)
+        values[name] = nd.fn(P, *(values[d] for d in nd.deps))
+        for dep in nd.deps:
+            if last_use[dep] == i and dep not in wanted:
+                del values[dep]
+    return {n: values[n] for n in names}
+
+
+def compute_features(df: pd.DataFrame, names=DEFAULT_FEATURES, price_col="Close",
+                     trim_warmup=False) -> pd.DataFrame:
+    """
+    Bara de efterfrågade feature-kolumnerna för df (samma index, ingen kopia av df).
+    trim_warmup=True skär bort de första warmup_length(names) raderna.
+    """
+    names = list(names)
+    P = df[price_col].to_numpy(dtype=float)
+    vals = evaluate(P, names)
+    out = pd.DataFrame({n: vals[n][:, 0] for n in names}, index=df.index)
+    if trim_warmup:
+        out = out.iloc[warmup_length(names):]
+    return out
@@ -2,13 +2,124 @@
 """
 Adaptiv feature-subset: välj top-K features vid varje träningstillfälle.
 Vi använder mutual information som enkel, robust rankare.
+
+Standard är en binnad MI-skattning (kvantil-hinkar per feature) som räknas för alla
+features på en gång ur en gemensam räknetabell (feature x hink x klass). Tabellen kan
+uppdateras inkrementellt när träningsfönstret glider RETRAIN_STEP rader (lägg till nya
+rader, dra bort de som föll ur), så rankning per ankare blir billig och deterministisk.
+sklearn:s kNN-baserade mutual_info_classif finns kvar som method="knn".
 """
 import numpy as np
 import pandas as pd
 from sklearn.feature_selection import mutual_info_classif
 
-def rank_features(X: np.ndarray, y: np.ndarray, feature_names):
-    mi = mutual_info_classif(X, y, discrete_features=False, random_state=None)
+DEFAULT_N_BINS = 16
+
+
+def quantile_bin_edges(X: np.ndarray, n_bins: int = DEFAULT_N_BINS) -> np.ndarray:
+    """Inre kvantilgränser per feature, form (n_features, n_bins - 1)."""
+    qs = np.linspace(0.0, 1.0, n_bins + 1)[1:-1]
+    return np.nanquantile(np.asarray(X, dtype=float), qs, axis=0).T
+
+
+def digitize(X: np.ndarray, edges: np.ndarray) -> np.ndarray:
+    """Hinkindex (0..n_bins-1) per värde, vektoriserat över alla features."""
+    X = np.asarray(X, dtype=float)
+    # antal gränser som värdet är >= ger hinken (samma som searchsorted side='right')
+    return (X[:, :, None] >= edges[None, :, :]).sum(axis=2)
+
+
+def binned_counts(bins: np.ndarray, y: np.ndarray, n_bins: int, n_classes: int = 2) -> np.ndarray:
+    """Gemensam räknetabell (n_features, n_bins, n_classes) via en enda bincount."""
+    n_features = bins.shape[1]
+    y = np.asarray(y, dtype=np.int64)
+    flat = (np.arange(n_features)[None, :] * n_bins + bins) * n_classes + y[:, None]
+    counts = np.bincount(flat.ravel(), minlength=n_features * n_bins * n_classes)
+    return counts.reshape(n_features, n_bins, n_classes)
+
+
+def mi_from_counts(counts: np.ndarray) -> np.ndarray:
+    """Mutual information (nats) per feature ur räknetabellen."""
+    counts = counts.astype(float)
+    total = counts.sum(axis=(1, 2), keepdims=True)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        p_joint = counts / total
+        p_bin = p_joint.sum(axis=2, keepdims=True)
+        p_cls = p_joint.sum(axis=1, keepdims=True)
+        terms = p_joint * np.log(p_joint / (p_bin * p_cls))
+    return np.nansum(terms, axis=(1, 2))
+
+
+class BinnedMI:
+    """
+    Binnad MI med inkrementella räknare.
+    fit() fixerar kvantilgränserna och räknar upp fönstret; update() lägger till/drar bort rader.
+    """
+
+    def __init__(self, n_bins: int = DEFAULT_N_BINS, n_classes: int = 2):
+        self.n_bins = n_bins
+        self.n_classes = n_classes
+        self.edges_ = None
+        self.counts_ = None
+
+    def fit(self, X, y):
+        self.edges_ = quantile_bin_edges(X, self.n_bins)
+        self.counts_ = binned_counts(digitize(X, self.edges_), y, self.n_bins, self.n_classes)
+        return self
+
+    def update(self, X_add=None, y_add=None, X_remove=None, y_remove=None):
+        if X_add is not None and len(X_add):
+            self.counts_ += binned_counts(digitize(X_add, self.edges_), y_add, self.n_bins, self.n_classes)
+        if X_remove is not None and len(X_remove):
+            self.counts_ -= binned_counts(digitize(X_remove, self.edges_), y_remove, self.n_bins, self.n_classes)
+        return self
+
+    def scores(self) -> np.ndarray:
+        return mi_from_counts(self.counts_)
+
+
+class SlidingMIRanker:
+    """
+    Rankar features för ett glidande träningsfönster [start, end) över samma X/y.
+    Vid nästa fönster uppdateras räknarna bara med raderna som tillkom/föll bort.
+    Kvantilgränserna räknas om var refit_every:e anrop (0 = aldrig) så de följer fördelningen.
+    """
+
+    def __init__(self, feature_names, n_bins: int = DEFAULT_N_BINS, refit_every: int = 12):
+        self.feature_names = list(feature_names)
+        self.n_bins = n_bins
+        self.refit_every = refit_every
+        self._mi = None
+        self._window = None
+        self._calls = 0
+
+    def rank(self, X, y, start: int, end: int):
+        y = np.asarray(y)
+        prev = self._window
+        refit = (
+            self._mi is None
+            or prev is None
+            or start < prev[0] or end < prev[1] or start >= prev[1]
+            or (self.refit_every and self._calls % self.refit_every == 0)
+        )
+        if refit:
+            self._mi = BinnedMI(self.n_bins).fit(X[start:end], y[start:end])
+        else:
+            p_start, p_end = prev
+            self._mi.update(X[p_end:end], y[p_end:end], X[p_start:start], y[p_start:start])
+        self._window = (start, end)
+        self._calls += 1
+        return sorted(zip(self.feature_names, self._mi.scores()), key=lambda t: t[1], reverse=True)
+
+
+def rank_features(X: np.ndarray, y: np.ndarray, feature_names, method: str = "binned",
+                  n_bins: int = DEFAULT_N_BINS, random_state=0):
+    if method == "knn":
+        mi = mutual_info_classif(X, y, discrete_features=False, random_state=random_state)
+    elif method == "binned":
+        mi = BinnedMI(n_bins).fit(X, y).scores()
+    else:
+        raise ValueError(f"Okänd MI-metod: {method!r} (välj 'binned' eller 'knn')")
     ranking = sorted(zip(feature_names, mi), key=lambda t: t[1], reverse=True)
     return ranking
 
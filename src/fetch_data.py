@@ -21,6 +21,14 @@ except ImportError:
         except ImportError:
             DEFAULT_API_KEY = None
 
+try:
+    from src.instrumentation import timed
+except ImportError:
+    try:
+        from .instrumentation import timed
+    except ImportError:
+        from instrumentation import timed
+
 # Load environment variables from .env file if it exists
 def load_env_file():
     env_path = Path(__file__).parent.parent / '.env'
@@ -34,11 +42,21 @@ def load_env_file():
 
 load_env_file()
 
-FRED_BASE = "https://api.stlouisfed.org/fred/series/observations"
+FRED_ROOT = "https://api.stlouisfed.org/fred"
+FRED_BASE = f"{FRED_ROOT}/series/observations"
+# Alternativ FRED-rot, t.ex. en lokal FakeFred (src/benchmarks/fake_fred.py) för körningar utan nätverk
+FRED_URL_ENV = "PIPELINE_FRED_URL"
+
+
+def fred_root():
+    return (os.environ.get(FRED_URL_ENV) or FRED_ROOT).rstrip("/")
+
 
-def fetch_sp500_from_fred(start="1990-01-01", end=None, series_id="SP500"):
+@timed("fetch")
+def fetch_sp500_from_fred(start="1990-01-01", end=None, series_id="SP500", base_url=None):
     """
     Hämtar dagliga observationer (slutvärde) för S&P 500 från FRED.
+    base_url ersätter FRED-roten (default PIPELINE_FRED_URL eller api.stlouisfed.org/fred).
     Returnerar en DataFrame med kolumnerna: Date (datetime64[ns]), Close (float).
     """
     api_key = os.environ.get("FRED_API_KEY", DEFAULT_API_KEY)
@@ -55,7 +73,7 @@ def fetch_sp500_from_fred(start="1990-01-01", end=None, series_id="SP500"):
         "observation_start": start,
         "observation_end": end,
     }
-    r = requests.get(FRED_BASE, params=params, timeout=30)
+    r = requests.get(f"{(base_url or fred_root()).rstrip('/')}/series/observations", params=params, timeout=30)
     r.raise_for_status()
     data = r.json()["observations"]
     df = pd.DataFrame(data)
@@ -0,0 +1,179 @@
+# -*- coding: utf-8 -*-
+"""
+Snabb kontroll av hur färsk FRED-serien är (senaste observation och eftersläpning i dagar).
+
+Bara standardbiblioteket (urllib/json/datetime), så kontrollen startar på bråkdelen av en
+sekund istället för att betala för pandas/requests som fetch_data drar in.
+
+probe() är villkorlig och inkrementell mot en lokal cache (FRESHNESS_CACHE, default
+.freshness_cache.json i projektroten):
+  1. fred/series ger seriens last_updated (vintage). Samma vintage som i cachen betyder att
+     inget har publicerats eller reviderats, och då görs inget mer anrop
+  2. annars hämtas bara observationerna från senast sedda datum och framåt
+     (observation_start=<cachat datum>, sort_order=desc, limit), dvs. ett delta
+Cachen minns också vilket (datum, vintage) pipelinen senast körde på (mark_processed), så
+has_new_data() kan låta step1_safe2 och det dagliga jobbet hoppa över features, träning
+och CSV-skrivning när inget nytt har kommit.
+"""
+import json
+import os
+from datetime import date, datetime, timedelta, timezone
+from pathlib import Path
+from urllib.error import URLError
+from urllib.parse import urlencode
+from urllib.request import urlopen
+
+FRED_ROOT = "https://api.stlouisfed.org/fred"
+FRED_URL_ENV = "PIPELINE_FRED_URL"  # samma som fetch_data, t.ex. en lokal FakeFred
+CACHE_ENV = "FRESHNESS_CACHE"
+
+
+def _url(path):
+    return f"{(os.environ.get(FRED_URL_ENV) or FRED_ROOT).rstrip('/')}/{path}"
+
+
+def _api_key():
+    """FRED_API_KEY från miljön, .env i projektroten eller src/api_config.py."""
+    key = os.environ.get("FRED_API_KEY")
+    if key:
+        return key
+    env_path = Path(__file__).parent.parent / ".env"
+    if env_path.exists():
+        for line in env_path.read_text(encoding="utf-8").splitlines():
+            line = line.strip()
+            if line.startswith("FRED_API_KEY") and "=" in line:
+                return line.split("=", 1)[1].strip()
+    try:
+        from src.api_config import FRED_API_KEY
+    except ImportError:
+        try:
+            from .api_config import FRED_API_KEY
+        except ImportError:
+            FRED_API_KEY = None
+    return FRED_API_KEY
+
+
+def _get(url, params, api_key=None, timeout=10):
+    api_key = api_key or _api_key()
+    if not api_key:
+        raise RuntimeError("Saknar FRED_API_KEY i miljövariablerna. Sätt t.ex. export FRED_API_KEY='din-nyckel'")
+    params = dict(params, api_key=api_key, file_type="json")
+    try:
+        with urlopen(f"{url}?{urlencode(params)}", timeout=timeout) as resp:
+            return json.load(resp)
+    except (URLError, OSError, ValueError) as e:
+        raise RuntimeError(f"Kunde inte hämta {params.get('series_id')} från FRED: {e}") from e
+
+
+def series_vintage(series_id="SP500", api_key=None, timeout=10):
+    """Seriens last_updated hos FRED (ändras vid varje ny observation eller revidering)."""
+    seriess = _get(_url("series"), {"series_id": series_id}, api_key, timeout).get("seriess", [])
+    return seriess[0].get("last_updated") if seriess else None
+
+
+def latest_observation(series_id="SP500", days_back=10, api_key=None, timeout=10, since=None):
+    """
+    (datum, värde) för seriens senaste icke-saknade observation från since (datum-sträng)
+    eller de senaste days_back dagarna, eller (None, None) om inget finns. Nätverksfel och
+    saknad nyckel ger RuntimeError.
+    """
+    today = date.today()
+    params = {
+        "series_id": series_id,
+        "observation_start": since or (today - timedelta(days=days_back)).isoformat(),
+        "observation_end": today.isoformat(),
+        "sort_order": "desc",
+        "limit": days_back,  # saknade värden ('.') på helgdagar kan ligga först
+    }
+    data = _get(_url("series/observations"), params, api_key, timeout)
+    for obs in data.get("observations", []):
+        if obs.get("value") not in (".", "", None):
+            return datetime.strptime(obs["date"], "%Y-%m-%d").date(), float(obs["value"])
+    return None, None
+
+
+# --- Lokal cache ---
+
+def cache_path():
+    return os.environ.get(CACHE_ENV) or str(Path(__file__).parent.parent / ".freshness_cache.json")
+
+
+def load_cache(path=None):
+    try:
+        with open(path or cache_path(), encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def _save_cache(cache, path=None):
+    path = path or cache_path()
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(cache, f, indent=2)
+    os.replace(tmp, path)
+
+
+def probe(series_id="SP500", days_back=10, api_key=None, path=None, today=None):
+    """
+    Villkorlig kontroll mot cachen. Returnerar {"series", "vintage", "latest_date", "value",
+    "lag_days", "today", "requests", "new_data", "processed_date", "processed_vintage"};
+    new_data är True om (latest_date, vintage) skiljer sig från det pipelinen senast körde på.
+    """
+    today = today or date.today()
+    cache = load_cache(path)
+    entry = cache.get(series_id, {})
+
+    vintage = series_vintage(series_id, api_key)
+    requests = 1
+    if vintage is None or vintage != entry.get("vintage") or not entry.get("latest_date"):
+        latest, value = latest_observation(series_id, days_back, api_key, since=entry.get("latest_date"))
+        requests += 1
+        if latest is not None:
+            entry.update(latest_date=latest.isoformat(), value=value)
+        entry["vintage"] = vintage
+    entry["checked_at"] = datetime.now(timezone.utc).isoformat(timespec="seconds")
+    cache[series_id] = entry
+    _save_cache(cache, path)
+
+    latest_date = entry.get("latest_date")
+    processed = (entry.get("processed_date"), entry.get("processed_vintage"))
+    return {
+        "series": series_id,
+        "vintage": entry.get("vintage"),
+        "latest_date": latest_date,
+        "value": entry.get("value"),
+        "lag_days": (today - date.fromisoformat(latest_date)).days if latest_date else None,
+        "today": today.isoformat(),
+        "requests": requests,
+        "new_data": (latest_date, entry.get("vintage")) != processed,
+        "processed_date": processed[0],
+        "processed_vintage": processed[1],
+    }
+
+
+def mark_processed(info, path=None):
+    """Noterar att pipelinen har kört på info (från probe()), så nästa probe ger new_data=False."""
+    cache = load_cache(path)
+    entry = cache.setdefault(info["series"], {})
+    entry.update(processed_date=info["latest_date"], processed_vintage=info["vintage"],
+                 processed_at=datetime.now(timezone.utc).isoformat(timespec="seconds"))
+    _save_cache(cache, path)
+
+
+def has_new_data(series_id="SP500", path=None):
+    """
+    (True/False, info). Om FRED inte går att nå blir svaret True (info None), så att
+    pipelinen hellre kör i onödan än hoppar över en ny observation.
+    """
+    try:
+        info = probe(series_id, path=path)
+    except RuntimeError as e:
+        print(f"Freshness probe failed ({e}); running the pipeline anyway")
+        return True, None
+    return info["new_data"], info
+
+
+def data_lag(series_id="SP500", days_back=10, api_key=None, today=None):
+    """{"series", "latest_date", "value", "lag_days", "today", ...}; se probe()."""
+    return probe(series_id, days_back=days_back, api_key=api_key, today=today)
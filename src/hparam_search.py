@@ -0,0 +1,260 @@
+# -*- coding: utf-8 -*-
+"""
+Hyperparametersökning med successive halving över purged walk-forward-foldar.
+
+- konfigurationer dras ur SEARCH_SPACES (hgb: learning_rate/max_iter/trädstorlek,
+  mlp_bagging: alpha/n_estimators/hidden_mult/max_iter)
+- budgeten är antal foldar: walk_forward_folds är ordnade i tid, så de första foldarna
+  har kortast träningshistorik och är billigast. Rung 0 kör alla konfigurationer på de
+  första min_folds foldarna, de bästa 1/eta går vidare till eta gånger fler foldar, osv.
+  tills de kvarvarande körs på full historik
+- varje (konfiguration, fold) är en uppgift i en processpool; X/y skickas en gång per
+  worker via initializer
+- varje färdig uppgift skrivs atomärt till en checkpoint (JSON), så en avbruten körning
+  fortsätter där den slutade och tidigare utvärderingar återanvänds mellan rungs
+
+    python -m src.hparam_search --model hgb --synthetic 5000 --configs 27 --workers 4
+    python -m src.hparam_search --model mlp_bagging --start 1999-01-01 --checkpoint hparam_runs/mlp.json
+"""
+import argparse
+import hashlib
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import numpy as np
+from sklearn.metrics import average_precision_score, log_loss, roc_auc_score
+
+# Add project root to path if not already there
+project_root = os.path.join(os.path.dirname(__file__), '..')
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+
+try:
+    from src.config import LABEL_HORIZON
+    from src.model import MODEL_NAMES
+    from src.purged_cv import walk_forward_folds, fit_fold
+    from src.feature_matrix import FeatureMatrix
+except ImportError:
+    from config import LABEL_HORIZON
+    from model import MODEL_NAMES
+    from purged_cv import walk_forward_folds, fit_fold
+    from feature_matrix import FeatureMatrix
+
+SEARCH_SPACES = {
+    "hgb": {
+        "learning_rate": [0.02, 0.05, 0.1, 0.2],
+        "max_iter": [200, 400, 800],
+        "max_leaf_nodes": [15, 31, 63],
+        "min_samples_leaf": [20, 50, 100],
+        "l2_regularization": [0.0, 0.1, 1.0],
+    },
+    "mlp_bagging": {
+        "alpha": [1e-4, 1e-3, 1e-2],
+        "n_estimators": [5, 9, 15],
+        "hidden_mult": [1, 2, 4],
+        "max_iter": [200, 400],
+    },
+    "online": {
+        "alpha": [1e-5, 1e-4, 1e-3, 1e-2],
+        "n_epochs": [1, 3, 5, 10],
+    },
+}
+
+SCORERS = ("auc", "ap", "neg_log_loss")
+
+
+def sample_configs(space, n, seed=0):
+    """n olika konfigurationer ur rutnätet (hela rutnätet om det är mindre än n)."""
+    keys = sorted(space)
+    sizes = [len(space[k]) for k in keys]
+    total = int(np.prod(sizes))
+    rng = np.random.default_rng(seed)
+    flat = np.arange(total) if total <= n else rng.choice(total, size=n, replace=False)
+    configs = []
+    for i in flat:
+        idx = np.unravel_index(int(i), sizes)
+        configs.append({k: space[k][j] for k, j in zip(keys, idx)})
+    return configs
+
+
+def config_key(cfg) -> str:
+    return json.dumps(cfg, sort_keys=True)
+
+
+def score(y, p, scoring="auc"):
+    if scoring == "auc":
+        return float(roc_auc_score(y, p)) if len(np.unique(y)) == 2 else float("nan")
+    if scoring == "ap":
+        return float(average_precision_score(y, p))
+    if scoring == "neg_log_loss":
+        return -float(log_loss(y, np.clip(p, 1e-7, 1 - 1e-7), labels=[0, 1]))
+    raise ValueError(f"Okänd scoring: {scoring!r} (välj bland {', '.join(SCORERS)})")
+
+
+# --- Worker ---
+
+_X = None
+_y = None
+
+
+def _init_worker(X, y):
+    global _X, _y
+    _X, _y = X, y
+
+
+def _eval_task(model, cfg, fold, train_idx, test_idx, scoring):
+    t0 = time.perf_counter()
+    p = fit_fold(model, cfg, _X, _y, train_idx, test_idx)
+    s = float("nan") if p is None else score(_y[test_idx], p, scoring)
+    return config_key(cfg), fold, {"score": s, "seconds": time.perf_counter() - t0}
+
+
+# --- Checkpoint ---
+
+def _data_signature(X, y, folds):
+    h = hashlib.sha256()
+    h.update(np.ascontiguousarray(y).tobytes())
+    h.update(str(X.shape).encode())
+    for tr, te in folds:
+        h.update(f"{tr[0]}:{tr[-1]}:{te[0]}:{te[-1]}".encode())
+    return h.hexdigest()[:16]
+
+
+def _load_checkpoint(path, header):
+    if path and os.path.exists(path):
+        with open(path, encoding="utf-8") as f:
+            ckpt = json.load(f)
+        if all(ckpt.get(k) == v for k, v in header.items()):
+            return ckpt
+    return dict(header, evals={}, rungs=[], best=None)
+
+
+def _save_checkpoint(path, ckpt):
+    if not path:
+        return
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    tmp = path + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(ckpt, f, indent=2)
+    os.replace(tmp, path)
+
+
+# --- Sökning ---
+
+def successive_halving(X, y, model="hgb", space=None, n_configs=27, eta=3, n_folds=6, min_folds=1,
+                       purge=LABEL_HORIZON, scoring="auc", n_workers=None, checkpoint=None,
+                       seed=0, log=print):
+    """
+    Returnerar checkpoint-dicten: evals {konfig: {fold: {score, seconds}}}, rungs
+    (budget och överlevare per rung) och best {"config", "score"} (medel över alla foldar).
+    """
+    if model not in MODEL_NAMES:
+        raise ValueError(f"Okänd modell: {model!r} (välj bland {', '.join(MODEL_NAMES)})")
+    X = np.ascontiguousarray(X)
+    y = np.asarray(y).astype(int)
+    folds = walk_forward_folds(len(y), n_folds=n_folds, purge=purge)
+    if not folds:
+        raise ValueError("För lite data för walk-forward-foldar")
+    n_folds = len(folds)
+
+    configs = sample_configs(space or SEARCH_SPACES[model], n_configs, seed=seed)
+    header = {"model": model, "scoring": scoring, "data": _data_signature(X, y, folds)}
+    ckpt = _load_checkpoint(checkpoint, header)
+    evals = ckpt["evals"]
+    ckpt["rungs"] = []
+    if evals:
+        log(f"Resuming from {checkpoint}: {sum(len(v) for v in evals.values())} evaluations cached")
+
+    def mean_score(cfg, budget):
+        vals = [evals[config_key(cfg)][str(k)]["score"] for k in range(budget)]
+        vals = [v for v in vals if np.isfinite(v)]
+        return float(np.mean(vals)) if vals else float("-inf")
+
+    survivors = configs
+    budget = min(min_folds, n_folds)
+    t_start = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=n_workers, initializer=_init_worker, initargs=(X, y)) as pool:
+        while True:
+            todo = [(cfg, k) for cfg in survivors for k in range(budget)
+                    if str(k) not in evals.get(config_key(cfg), {})]
+            futures = [pool.submit(_eval_task, model, cfg, k, folds[k][0], folds[k][1], scoring)
+                       for cfg, k in todo]
+            for fut in as_completed(futures):
+                key, k, res = fut.result()
+                evals.setdefault(key, {})[str(k)] = res
+                _save_checkpoint(checkpoint, ckpt)
+
+            ranked = sorted(survivors, key=lambda c: mean_score(c, budget), reverse=True)
+            keep = max(1, len(ranked) // eta)
+            best_now = ranked[0]
+            log(f"rung {len(ckpt['rungs'])}: {len(survivors)} configs x {budget} folds "
+                f"({len(todo)} new fits), best {scoring}={mean_score(best_now, budget):.4f} "
+                f"{config_key(best_now)}  elapsed {time.perf_counter() - t_start:.0f}s")
+            ckpt["rungs"].append({"budget_folds": budget, "n_configs": len(survivors),
+                                  "survivors": [config_key(c) for c in ranked[:keep]]})
+            if budget >= n_folds:
+                break
+            survivors = ranked[:keep]
+            # en ensam överlevare går direkt till full historik
+            budget = n_folds if len(survivors) == 1 else min(n_folds, budget * eta)
+
+    ckpt["best"] = {"config": best_now, "score": mean_score(best_now, budget), "folds": budget}
+    _save_checkpoint(checkpoint, ckpt)
+    return ckpt
+
+
+def load_training_data(start="1999-01-01", synthetic=0):
+    """(X, y) för hela historiken: syntetisk GBM eller S&P 500 via stegcachen."""
+    try:
+        from src.stage_cache import sp500_pipeline
+        from src.benchmarks.synthetic import gbm_prices
+        from src.features import build_feature_set
+        from src.labels import labels_give_data_set_with_0_or_1
+    except ImportError:
+        from stage_cache import sp500_pipeline
+        from benchmarks.synthetic import gbm_prices
+        from features import build_feature_set
+        from labels import labels_give_data_set_with_0_or_1
+
+    if synthetic:
+        df_lab = labels_give_data_set_with_0_or_1(build_feature_set(gbm_prices(synthetic)))
+    else:
+        df_lab = sp500_pipeline(start=start).run("labels")
+    df_lab = df_lab.reset_index(drop=True)
+    feature_cols = [c for c in df_lab.columns if c not in ("label", "Close", "Date")]
+    X, y, _ = FeatureMatrix.from_frame(df_lab, feature_cols).window(0, len(df_lab), require_label=True)
+    return X, y
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Successive-halving hyperparameter search on walk-forward folds.")
+    ap.add_argument("--model", default="hgb", choices=list(MODEL_NAMES))
+    ap.add_argument("--start", default="1999-01-01", help="FRED start date (ignored with --synthetic).")
+    ap.add_argument("--synthetic", type=int, default=0, help="Use N synthetic GBM days instead of FRED.")
+    ap.add_argument("--configs", type=int, default=27)
+    ap.add_argument("--eta", type=int, default=3)
+    ap.add_argument("--folds", type=int, default=6)
+    ap.add_argument("--min-folds", type=int, default=1)
+    ap.add_argument("--scoring", default="auc", choices=list(SCORERS))
+    ap.add_argument("--workers", type=int, default=None)
+    ap.add_argument("--seed", type=int, default=0)
+    ap.add_argument("--checkpoint", default=None,
+                    help="JSON checkpoint (default hparam_runs/<model>.json).")
+    args = ap.parse_args(argv)
+
+    checkpoint = args.checkpoint or os.path.join("hparam_runs", f"{args.model}.json")
+    X, y = load_training_data(start=args.start, synthetic=args.synthetic)
+    ckpt = successive_halving(X, y, model=args.model, n_configs=args.configs, eta=args.eta,
+                              n_folds=args.folds, min_folds=args.min_folds, scoring=args.scoring,
+                              n_workers=args.workers, checkpoint=checkpoint, seed=args.seed)
+    best = ckpt["best"]
+    print(f"Best {args.scoring}={best['score']:.4f} over {best['folds']} folds: {config_key(best['config'])}")
+    print(f"Checkpoint written to {checkpoint}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
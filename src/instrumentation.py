@@ -0,0 +1,164 @@
+# -*- coding: utf-8 -*-
+"""
+Lätt instrumentering av pipelinens steg (fetch, features, labels, modell, tröskel, export).
+
+- timer("namn") som context manager och @timed("namn") som dekorator: summerar tid och antal anrop
+- increment("namn"): räknare, t.ex. antal modell-fit och predict-anrop
+- peak RSS samplas när varje steg avslutas
+- write_run_profile(): skriver JSON + CSV med stegtider, räknare och minnestopp för körningen
+- PIPELINE_CPROFILE=1 slår på cProfile runt en hel körning (profiled_run) och dumpar en .prof-fil
+
+Registret är processglobalt och kostar bara ett par perf_counter-anrop per steg.
+"""
+import cProfile
+import csv
+import functools
+import json
+import os
+import sys
+import time
+from contextlib import contextmanager
+from datetime import datetime, timezone
+
+PROFILE_DIR_ENV = "PIPELINE_PROFILE_DIR"
+CPROFILE_ENV = "PIPELINE_CPROFILE"
+
+# stage -> {"calls", "total_s", "max_s", "peak_rss_mb"}
+_stages = {}
+# name -> int
+_counters = {}
+_started_at = time.perf_counter()
+
+
+def peak_rss_mb():
+    """Processens högsta RSS hittills i MB (None om plattformen inte ger något mått)."""
+    try:
+        import resource
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # Linux rapporterar kB, macOS bytes
+        return peak / (1024.0 * 1024.0) if sys.platform == "darwin" else peak / 1024.0
+    except ImportError:
+        pass
+    try:
+        import psutil
+        info = psutil.Process().memory_info()
+        return getattr(info, "peak_wset", info.rss) / (1024.0 * 1024.0)
+    except Exception:
+        return None
+
+
+def _record(name, elapsed):
+    st = _stages.get(name)
+    if st is None:
+        st = _stages[name] = {"calls": 0, "total_s": 0.0, "max_s": 0.0, "peak_rss_mb": None}
+    st["calls"] += 1
+    st["total_s"] += elapsed
+    st["max_s"] = max(st["max_s"], elapsed)
+    rss = peak_rss_mb()
+    if rss is not None:
+        st["peak_rss_mb"] = rss if st["peak_rss_mb"] is None else max(st["peak_rss_mb"], rss)
+
+
+@contextmanager
+def timer(name):
+    t0 = time.perf_counter()
+    try:
+        yield
+    finally:
+        _record(name, time.perf_counter() - t0)
+
+
+def timed(name=None):
+    """Dekorator: tidsätter varje anrop under 'name' (default modul.funktionsnamn)."""
+    def deco(fn):
+        stage = name or f"{fn.__module__}.{fn.__qualname__}"
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            with timer(stage):
+                return fn(*args, **kwargs)
+        return wrapper
+    return deco
+
+
+def increment(name, n=1):
+    _counters[name] = _counters.get(name, 0) + n
+
+
+def reset():
+    global _started_at
+    _stages.clear()
+    _counters.clear()
+    _started_at = time.perf_counter()
+
+
+def snapshot():
+    """Nuvarande profil som dict (stegen sorterade på total tid)."""
+    stages = sorted(_stages.items(), key=lambda kv: kv[1]["total_s"], reverse=True)
+    return {
+        "wall_s": time.perf_counter() - _started_at,
+        "peak_rss_mb": peak_rss_mb(),
+        "stages": {k: dict(v) for k, v in stages},
+        "counters": dict(_counters),
+    }
+
+
+def write_run_profile(run_name, out_dir=None):
+    """
+    Skriver <out_dir>/<run_name>_<tid>.json och .csv. out_dir tas från PIPELINE_PROFILE_DIR
+    (default 'run_profiles'). Returnerar (json_path, csv_path).
+    """
+    out_dir = out_dir or os.environ.get(PROFILE_DIR_ENV, "run_profiles")
+    os.makedirs(out_dir, exist_ok=True)
+    stamp = datetime.now(timezone.utc).strftime("%Y%m%d-%H%M%S")
+    base = os.path.join(out_dir, f"{run_name}_{stamp}")
+
+    prof = snapshot()
+    prof["run"] = run_name
+    prof["timestamp"] = stamp
+    with open(base + ".json", "w", encoding="utf-8") as f:
+        json.dump(prof, f, indent=2)
+
+    with open(base + ".csv", "w", newline="", encoding="utf-8") as f:
+        w = csv.writer(f)
+        w.writerow(["kind", "name", "calls", "total_s", "max_s", "peak_rss_mb"])
+        for name, st in prof["stages"].items():
+            w.writerow(["stage", name, st["calls"], f"{st['total_s']:.6f}", f"{st['max_s']:.6f}",
+                        "" if st["peak_rss_mb"] is None else f"{st['peak_rss_mb']:.1f}"])
+        for name, n in prof["counters"].items():
+            w.writerow(["counter", name, n, "", "", ""])
+    return base + ".json", base + ".csv"
+
+
+def print_summary(top=15):
+    prof = snapshot()
+    rss = prof["peak_rss_mb"]
+    print(f"\n=== RUN PROFILE (wall {prof['wall_s']:.2f}s, peak RSS "
+          f"{'n/a' if rss is None else f'{rss:.0f} MB'}) ===")
+    for name, st in list(prof["stages"].items())[:top]:
+        print(f"  {name:<36} {st['calls']:>6} calls {st['total_s']:>10.3f}s")
+    for name, n in prof["counters"].items():
+        print(f"  {name:<36} {n:>6}")
+
+
+@contextmanager
+def profiled_run(run_name, out_dir=None):
+    """
+    Omsluter en hel körning: nollställer registret, kör cProfile om PIPELINE_CPROFILE=1,
+    och skriver run-profilen (samt .prof-dump) när blocket lämnas.
+    """
+    reset()
+    prof = cProfile.Profile() if os.environ.get(CPROFILE_ENV, "") not in ("", "0") else None
+    if prof is not None:
+        prof.enable()
+    try:
+        with timer(f"{run_name}.total"):
+            yield
+    finally:
+        if prof is not None:
+            prof.disable()
+        json_path, _ = write_run_profile(run_name, out_dir)
+        if prof is not None:
+            prof.dump_stats(json_path[:-len(".json")] + ".prof")
+        print_summary()
+        print(f"Run profile written to {json_path}")
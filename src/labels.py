@@ -25,26 +25,37 @@ except ImportError:
     except ImportError:
         from config import LABEL_HORIZON, STD_UP_MULT
 
-# def make_std_labels(df: pd.DataFrame, price_col="Close", vol_window=252, horizon=LABEL_HORIZON, up_mult=STD_UP_MULT):
-#     prices = df[price_col].astype(float)
-#     # dagliga logreturer
-#     logret = np.log(prices / prices.shift(1))
-#     vol = logret.rolling(vol_window, min_periods=vol_window).std()
-#     vol_h = vol * np.sqrt(horizon)  # skala till H-dagars horisont
+try:
+    from src.instrumentation import timed
+except ImportError:
+    try:
+        from .instrumentation import timed
+    except ImportError:
+        from instrumentation import timed
 
-#     # framtida avkastning (vanlig procentuell, enkel att förstå)
-#     fwd = prices.shift(-horizon) / prices - 1.0
+@timed("labels")
+def make_std_labels(df: pd.DataFrame, price_col="Close", vol_window=252, horizon=LABEL_HORIZON, up_mult=STD_UP_MULT):
+    prices = df[price_col].astype(float)
+    # dagliga logreturer
+    logret = np.log(prices / prices.shift(1))
+    vol = logret.rolling(vol_window, min_periods=vol_window).std()
+    vol_h = vol * np.sqrt(horizon)  # skala till H-dagars horisont
 
-#     label = np.where(fwd > (up_mult * vol_h), 1, 0).astype(float)
-#     # sista H dagarna har NaN label
-#     label[-horizon:] = np.nan
+    # framtida avkastning (vanlig procentuell, enkel att förstå)
+    fwd = prices.shift(-horizon) / prices - 1.0
 
-#     out = df.copy()
-#     out["label"] = label
-#     out["fwd_return"] = fwd
-#     out["vol_h"] = vol_h
-#     return out
+    label = np.where(fwd > (up_mult * vol_h), 1, 0).astype(float)
+    # sista H dagarna har NaN label
+    label[-horizon:] = np.nan
 
+    out = df.copy()
+    out["label"] = label
+    out["fwd_return"] = fwd
+    out["vol_h"] = vol_h
+    return out
+
+
+@timed("labels")
 def labels_give_data_set_with_0_or_1(df, price_col="Close"):
     prices = df[price_col].astype(float)
     n = len(prices)
@@ -70,4 +81,24 @@ def labels_give_data_set_with_0_or_1(df, price_col="Close"):
 
     out = df.copy()
     out["label"] = labels
-    return out
\ No newline at end of file
+    return out
+
+def labels_panel(P, window=70, rise=0.10, drop=-0.05):
+    """
+    labels_give_data_set_with_0_or_1 för en (T x A)-array (t.ex. simulerade banor) utan
+    radloop: max/min över de kommande window stängningarna via ett glidande fönster (vy).
+    De sista window raderna får NaN.
+    """
+    P = np.asarray(P, dtype=float)
+    if P.ndim == 1:
+        P = P[:, None]
+    T = P.shape[0]
+    labels = np.full(P.shape, np.nan)
+    if T <= window:
+        return labels
+    future = np.lib.stride_tricks.sliding_window_view(P[1:], window, axis=0)[:T - window]
+    base = P[:T - window]
+    max_up = future.max(axis=-1) / base - 1.0
+    min_down = future.min(axis=-1) / base - 1.0
+    labels[:T - window] = ((max_up >= rise) & (min_down > drop)).astype(float)
+    return labels
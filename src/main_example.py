@@ -11,30 +11,30 @@ if project_root not in sys.path:
 
 # Import with fallback strategies
 try:
-    from src.fetch_data import fetch_sp500_from_fred
-    from src.features import build_feature_set
     from src.labels import make_std_labels
     from src.train_predict import rolling_train_predict
     from src.backtest import backtest_six_windows
     from src.evaluate import confusion_counts, precision_recall_f1, equity_curve_buy_next_one, equity_curve_dca_baseline
     from src.config import LABEL_HORIZON
+    from src.stage_cache import sp500_pipeline
+    from src.run_store import RunStore
 except ImportError:
     try:
-        from .fetch_data import fetch_sp500_from_fred
-        from .features import build_feature_set
         from .labels import make_std_labels
         from .train_predict import rolling_train_predict
         from .backtest import backtest_six_windows
         from .evaluate import confusion_counts, precision_recall_f1, equity_curve_buy_next_one, equity_curve_dca_baseline
         from .config import LABEL_HORIZON
+        from .stage_cache import sp500_pipeline
+        from .run_store import RunStore
     except ImportError:
-        from fetch_data import fetch_sp500_from_fred
-        from features import build_feature_set
         from labels import make_std_labels
         from train_predict import rolling_train_predict
         from backtest import backtest_six_windows
         from evaluate import confusion_counts, precision_recall_f1, equity_curve_buy_next_one, equity_curve_dca_baseline
         from config import LABEL_HORIZON
+        from stage_cache import sp500_pipeline
+        from run_store import RunStore
 
 if __name__ == "__main__":
     # Dölj ConvergenceWarnings från MLPClassifier
@@ -58,9 +58,11 @@ if __name__ == "__main__":
     CUSTOM_THRESHOLD = 0.9
     print(f"🎯 Använder custom threshold: {CUSTOM_THRESHOLD}")
     
-    df = fetch_sp500_from_fred(start="2000-01-01")
-    df_feat = build_feature_set(df)
-    df_lab = make_std_labels(df_feat, horizon=LABEL_HORIZON)
+    # fetch/features/labels återanvänds från stegcachen när bara modellinställningar ändrats
+    pipe = sp500_pipeline(start="2000-01-01", label_fn=make_std_labels,
+                          label_params={"horizon": LABEL_HORIZON}, log=print)
+    df = pipe.run("fetch")
+    df_lab = pipe.run("labels")
 
     exclude = {"Date","Close","label","fwd_return","vol_h"}
     feature_cols = [c for c in df_lab.columns if c not in exclude]
@@ -71,6 +73,16 @@ if __name__ == "__main__":
     print("Backtest-rapport (per fönster):")
     print(report_df)
 
+    # Körningen (signaler, fönstermått, inställningar) till SQLite-historiken (PIPELINE_DB)
+    if RunStore.enabled():
+        with RunStore() as store:
+            run_id = store.start_run("main_example", kind="backtest",
+                                     params={"threshold": CUSTOM_THRESHOLD, "label_horizon": LABEL_HORIZON})
+            store.add_signals(run_id, df_pred.dropna(subset=["pred"]))
+            store.add_window_metrics(run_id, report_df)
+            store.set_model_meta(run_id, "mlp_bagging", CUSTOM_THRESHOLD, df_lab["Date"].max(), feature_cols)
+        print(f"Körning {run_id} sparad i {store.path}")
+
     if len(win_results) > 0:
         sample = win_results[0].dropna(subset=["label", "pred"])
         tp, tn, fp, fn = confusion_counts(sample["label"].values, sample["pred"].values)
@@ -103,8 +115,10 @@ if __name__ == "__main__":
     
     # Skapa S&P 500 graf med confusion matrix kategorier
     print(f"\n📈 Skapar S&P 500 visualisering med trading signals...")
-    import matplotlib.pyplot as plt
-    import numpy as np
+    try:
+        from src.plot import plot_confusion_signals, show_or_save
+    except ImportError:
+        from plot import plot_confusion_signals, show_or_save
     
     # Ta data med predictions
     analysis_df = df_pred.dropna(subset=["pred", "label"]).copy()
@@ -121,48 +135,9 @@ if __name__ == "__main__":
         print(f"   True Negatives: {true_negatives.sum()}")
         print(f"   False Negatives: {false_negatives.sum()}")
         
-        # Skapa graf
-        fig, ax = plt.subplots(1, 1, figsize=(15, 8))
-        
-        # Plot S&P 500 price
-        dates = pd.to_datetime(analysis_df["Date"])
-        prices = analysis_df["Close"]
-        ax.plot(dates, prices, 'b-', linewidth=1.5, alpha=0.7, label='S&P 500 Price', zorder=1)
-        
-        # Lägg till confusion matrix markers
-        if true_positives.sum() > 0:
-            tp_dates = dates[true_positives]
-            tp_prices = prices[true_positives]
-            ax.scatter(tp_dates, tp_prices, color='darkgreen', s=100, marker='^',
-                      label=f'✅ True Positives ({true_positives.sum()})', zorder=5, alpha=0.9, edgecolors='black')
-        
-        if false_positives.sum() > 0:
-            fp_dates = dates[false_positives]
-            fp_prices = prices[false_positives]
-            ax.scatter(fp_dates, fp_prices, color='red', s=100, marker='v',
-                      label=f'❌ False Positives ({false_positives.sum()})', zorder=5, alpha=0.9, edgecolors='black')
-        
-        if true_negatives.sum() > 0:
-            tn_dates = dates[true_negatives]
-            tn_prices = prices[true_negatives]
-            ax.scatter(tn_dates, tn_prices, color='lightblue', s=30, marker='o',
-                      label=f'✅ True Negatives ({true_negatives.sum()})', zorder=3, alpha=0.5)
-        
-        if false_negatives.sum() > 0:
-            fn_dates = dates[false_negatives]
-            fn_prices = prices[false_negatives]
-            ax.scatter(fn_dates, fn_prices, color='orange', s=80, marker='x',
-                      label=f'😞 False Negatives ({false_negatives.sum()})', zorder=4, alpha=0.8, linewidths=3)
-        
-        ax.set_title(f'S&P 500 Price with Trading Signals (Threshold: {CUSTOM_THRESHOLD})', fontsize=14, fontweight='bold')
-        ax.set_ylabel('Price ($)', fontsize=12)
-        ax.set_xlabel('Date', fontsize=12)
-        ax.legend(loc='upper left', fontsize=10)
-        ax.grid(True, alpha=0.3)
-        ax.tick_params(axis='x', rotation=45)
-        
-        plt.tight_layout()
-        plt.show()
+        # Skapa graf (decimerad linje, en markörsamling per kategori)
+        fig = plot_confusion_signals(analysis_df, threshold=CUSTOM_THRESHOLD)
+        show_or_save(fig, "signals_confusion.png")
         
         print(f"✅ Graf skapad med {len(analysis_df)} datapunkter!")
     else:
@@ -1,54 +1,66 @@
 # -*- coding: utf-8 -*-
 """
-Classifier: BalancedBaggingClassifier med MLP-basestimator.
-Förbehandling: MinMaxScaler. MLP: en dold lagerstorlek = 4 * (#features), ReLU i dolda lager, alpha=0.001.
+Classifier: balanserad bagging med MLP-medlemmar (BalancedBaggingMLP).
+Förbehandling: MinMaxScaler, anpassad en gång per träning och delad av alla medlemmar.
+MLP: en dold lagerstorlek = 4 * (#features), ReLU i dolda lager, alpha=0.001.
 Sklearn använder logistisk/sigmoid output för binär klass -> vi använder predict_proba[:,1] som sannolikhet för klass 1.
+
+Tidsbudget ("anytime"-träning): med time_budget (sekunder) anpassar fit antalet MLP-medlemmar
+och epoker, HGB antalet boosting-iterationer och OnlineLogistic antalet epoker efter
+väggklockan, och sparar vad som gjordes i budget_info_. Minst en medlem/epok/iterationsomgång
+tränas alltid, så resultatet är alltid en användbar modell.
 """
+import time
+
 import numpy as np
 from sklearn.base import BaseEstimator, ClassifierMixin, clone
 from sklearn.neural_network import MLPClassifier
 from sklearn.preprocessing import MinMaxScaler
 from sklearn.pipeline import Pipeline
 from sklearn.dummy import DummyClassifier
-from imblearn.ensemble import BalancedBaggingClassifier
 from sklearn.ensemble import HistGradientBoostingClassifier
+from sklearn.linear_model import SGDClassifier
+
+try:
+    from src.instrumentation import timer, increment
+except ImportError:
+    try:
+        from .instrumentation import timer, increment
+    except ImportError:
+        from instrumentation import timer, increment
+
+# Tidsbudget: en ny MLP-medlem påbörjas bara om minst så här många epoker ryms i resten av budgeten
+MIN_MEMBER_EPOCHS = 10
+# Tidsbudget: HGB:s första omgång (iterationer); provträningarna som skattar tiden per iteration är 1 och 2x så långa
+HGB_BUDGET_CHUNK = 10
+
+
+def _oob_tail(n, oob_rows):
+    """Mask för raderna som poängsätts out-of-bag: de sista oob_rows (alla om None)."""
+    tail = np.zeros(n, dtype=bool)
+    tail[max(n - oob_rows, 0) if oob_rows is not None else 0:] = True
+    return tail
 
-class CustomThresholdBaggingClassifier(BalancedBaggingClassifier):
-    """
-    BalancedBaggingClassifier som stöder anpassad decision threshold.
-    """
-    def __init__(self, estimator=None, decision_threshold=0.5, **kwargs):
-        super().__init__(estimator=estimator, **kwargs)
-        self.decision_threshold = decision_threshold
-    
-    def predict(self, X):
-        """
-        Använd anpassad threshold istället för majority voting.
-        """
-        if self.decision_threshold == 0.5:
-            # Använd standard prediction för 0.5 threshold
-            return super().predict(X)
-        else:
-            # Använd anpassad threshold på ensemble probabilities
-            y_proba = self.predict_proba(X)[:, 1]
-            return (y_proba >= self.decision_threshold).astype(int)
 
 class DynamicMLP(BaseEstimator, ClassifierMixin):
     """
-    Skapar en MLPClassifier där dolda lagrets storlek sätts till 4x antalet features vid fit().
+    Skapar en MLPClassifier där dolda lagrets storlek sätts till hidden_mult (default 4) x
+    antalet features vid fit().
     Stöder anpassad decision threshold istället för sklearn's standard 0.5.
     """
-    def __init__(self, alpha=0.001, random_state=None, decision_threshold=0.5):
+    def __init__(self, alpha=0.001, random_state=None, decision_threshold=0.5, hidden_mult=4, max_iter=400):
         self.alpha = alpha
         self.random_state = random_state
         self.decision_threshold = decision_threshold
+        self.hidden_mult = hidden_mult
+        self.max_iter = max_iter
         self.model_ = None
 
     def fit(self, X, y):
         n_features = X.shape[1]
-        hidden = (max(4, 4 * n_features),)
+        hidden = (max(4, int(self.hidden_mult * n_features)),)
         mlp = MLPClassifier(hidden_layer_sizes=hidden, activation="relu",
-                            alpha=self.alpha, max_iter=400, random_state=self.random_state)
+                            alpha=self.alpha, max_iter=self.max_iter, random_state=self.random_state)
         pipe = Pipeline([
             ("scaler", MinMaxScaler()),
             ("mlp", mlp)
@@ -73,28 +85,184 @@ class DynamicMLP(BaseEstimator, ClassifierMixin):
         # MLPClassifier ger proba via logistic/softmax i output
         return self.model_.predict_proba(X)
 
+
+def _member_deadline(now, deadline, members_left, epoch_time):
+    """
+    Deadline för nästa medlem: den återstående tiden delad på de medlemmar som återstår, men
+    på högst så många att var och en hinner minst MIN_MEMBER_EPOCHS epoker.
+    """
+    remaining = max(deadline - now, 0.0)
+    fit_in = int(remaining / (MIN_MEMBER_EPOCHS * epoch_time)) if epoch_time > 0 else members_left
+    return now + remaining / max(min(members_left, fit_in), 1)
+
+
+class BalancedBaggingMLP(BaseEstimator, ClassifierMixin):
+    """
+    Balanserad bagging av MLP:er som i BalancedBaggingClassifier(DynamicMLP), men:
+      - MinMaxScaler anpassas en gång och X skalas till EN delad float32-matris
+        (istället för en Pipeline med egen scaler per medlem)
+      - varje medlem dras som en indexarray: bootstrap av alla rader, därefter slumpvis
+        undersampling till minsta klassens antal (samma urval som bootstrap + RandomUnderSampler)
+      - medlemmen tränas på den delade matrisens rader för sin indexarray; bara det
+        balanserade urvalet (float32) finns kopierat, och bara under medlemmens fit
+    oob_proba=True sparar out-of-bag-sannolikheter i oob_proba_ (n_samples x n_classes): varje rad
+    poängsätts bara av de medlemmar som inte tränats på den, NaN om alla har sett raden. Med
+    oob_rows poängsätts bara de sista oob_rows raderna (övriga NaN).
+
+    time_budget (sekunder): medlemmarna tränas epok för epok (partial_fit, samma stoppvillkor
+    som MLPClassifier.fit: träningsförlusten förbättras inte med tol på n_iter_no_change epoker)
+    och varje medlem får sin andel av den återstående tiden. En ny medlem påbörjas bara om minst
+    MIN_MEMBER_EPOCHS epoker ryms; hellre färre färdigtränade medlemmar än många halvtränade.
+    Medlemmarna dras i samma ordning som utan budget. Se budget_info_.
+    """
+    def __init__(self, n_estimators=9, alpha=0.001, hidden_mult=4, max_iter=400, decision_threshold=0.5,
+                 oob_proba=False, random_state=None, time_budget=None, oob_rows=None):
+        self.n_estimators = n_estimators
+        self.alpha = alpha
+        self.hidden_mult = hidden_mult
+        self.max_iter = max_iter
+        self.decision_threshold = decision_threshold
+        self.oob_proba = oob_proba
+        self.random_state = random_state
+        self.time_budget = time_budget
+        self.oob_rows = oob_rows
+
+    def _shared(self, X):
+        return np.ascontiguousarray(self.scaler_.transform(X), dtype=np.float32)
+
+    def _draw(self, rng, y_codes, n_classes):
+        """Balanserad bootstrap-indexarray (sorterad, så att uppslaget läser minnet i ordning)."""
+        boot = rng.integers(0, len(y_codes), len(y_codes))
+        by_class = [boot[y_codes[boot] == k] for k in range(n_classes)]
+        # en klass som helt saknas i bootstrap-urvalet (bara vid mycket få rader) dras ur hela klassen
+        by_class = [b if len(b) else np.flatnonzero(y_codes == k) for k, b in enumerate(by_class)]
+        m = min(len(b) for b in by_class)
+        return np.sort(np.concatenate([rng.choice(b, m, replace=False) for b in by_class]))
+
+    def fit(self, X, y):
+        y = np.asarray(y)
+        self.classes_, y_codes = np.unique(y, return_inverse=True)
+        if len(self.classes_) < 2:
+            raise ValueError("BalancedBaggingMLP kräver minst två klasser i y")
+        self.scaler_ = MinMaxScaler().fit(X)
+        Xs = self._shared(X)
+        hidden = (max(4, int(self.hidden_mult * Xs.shape[1])),)
+        rng = np.random.default_rng(self.random_state)
+        seeds = rng.integers(0, 2**31 - 1, self.n_estimators)
+
+        n, k = len(y_codes), len(self.classes_)
+        oob_sum = np.zeros((n, k)) if self.oob_proba else None
+        oob_votes = np.zeros(n, dtype=int) if self.oob_proba else None
+        tail = _oob_tail(n, self.oob_rows)
+        self.estimators_, self.estimators_samples_ = [], []
+        budgeted = self.time_budget is not None
+        t0 = time.perf_counter()
+        deadline = t0 + max(float(self.time_budget), 0.0) if budgeted else None
+        epochs, epoch_time, cut_short = [], None, False
+        for i, seed in enumerate(seeds):
+            if budgeted:
+                now = time.perf_counter()
+                if i > 0 and deadline - now < MIN_MEMBER_EPOCHS * epoch_time:
+                    break
+            idx = self._draw(rng, y_codes, k)
+            if budgeted:
+                # RandomState-instans: partial_fit blandar om med en ny ordning varje epok
+                mlp = MLPClassifier(hidden_layer_sizes=hidden, activation="relu", alpha=self.alpha,
+                                    max_iter=self.max_iter, random_state=np.random.RandomState(seed))
+                n_epochs, stopped = self._fit_member(
+                    mlp, Xs[idx], y_codes[idx], k,
+                    lambda et, now=now, left=len(seeds) - i: _member_deadline(now, deadline, left, epoch_time or et))
+                epochs.append(n_epochs)
+                cut_short |= stopped
+                epoch_time = (time.perf_counter() - t0) / sum(epochs)
+            else:
+                mlp = MLPClassifier(hidden_layer_sizes=hidden, activation="relu", alpha=self.alpha,
+                                    max_iter=self.max_iter, random_state=int(seed))
+                mlp.fit(Xs[idx], y_codes[idx])
+            self.estimators_.append(mlp)
+            self.estimators_samples_.append(idx)
+            if self.oob_proba:
+                oob = tail.copy()
+                oob[idx] = False
+                if oob.any():
+                    oob_sum[oob] += mlp.predict_proba(Xs[oob])
+                    oob_votes[oob] += 1
+        if self.oob_proba:
+            with np.errstate(invalid="ignore", divide="ignore"):
+                self.oob_proba_ = np.where(oob_votes[:, None] > 0, oob_sum / oob_votes[:, None], np.nan)
+        else:
+            self.oob_proba_ = None
+        self.budget_info_ = None
+        if budgeted:
+            self.budget_info_ = {
+                "budget_s": float(self.time_budget), "seconds": round(time.perf_counter() - t0, 3),
+                "members": len(self.estimators_), "epochs": epochs,
+                "truncated": cut_short or len(self.estimators_) < self.n_estimators,
+            }
+        return self
+
+    def _fit_member(self, mlp, X, y, n_classes, deadline_for):
+        """
+        partial_fit en epok i taget till konvergens, max_iter eller deadline, där
+        deadline_for(epoktid) ger medlemmens deadline (sätts efter första epoken).
+        Returnerar (antal epoker, avbruten av deadline).
+        """
+        classes = np.arange(n_classes)
+        best, stale, n = np.inf, 0, 0
+        start = time.perf_counter()
+        deadline = None
+        while n < self.max_iter:
+            mlp.partial_fit(X, y, classes=classes)
+            n += 1
+            if deadline is None:
+                deadline = deadline_for(time.perf_counter() - start)
+            stale = stale + 1 if mlp.loss_ > best - mlp.tol else 0
+            best = min(best, mlp.loss_)
+            if stale > mlp.n_iter_no_change:
+                break
+            now = time.perf_counter()
+            if n < self.max_iter and now + (now - start) / n > deadline:
+                return n, True
+        return n, False
+
+    def predict_proba(self, X):
+        Xs = self._shared(X)
+        proba = np.zeros((len(Xs), len(self.classes_)))
+        for est in self.estimators_:
+            proba += est.predict_proba(Xs)
+        return proba / len(self.estimators_)
+
+    def predict(self, X):
+        proba = self.predict_proba(X)
+        if len(self.classes_) == 2:
+            return self.classes_[(proba[:, 1] >= self.decision_threshold).astype(int)]
+        return self.classes_[np.argmax(proba, axis=1)]
+
+
 def make_baseline():
     return DummyClassifier(strategy="most_frequent")
 
-def make_mlp_bagging(decision_threshold=0.5):
+def make_mlp_bagging(decision_threshold=0.5, alpha=0.001, n_estimators=9, hidden_mult=4, max_iter=400,
+                     oob_proba=False, random_state=None, time_budget=None, oob_rows=None):
     """
-    Skapar CustomThresholdBaggingClassifier med DynamicMLP och anpassad decision threshold.
+    Skapar BalancedBaggingMLP (balanserad bagging av MLP:er med delad skalning) med
+    anpassad decision threshold.
     
     Args:
         decision_threshold (float): Tröskelvärde för binär klassificering (default: 0.5)
+        alpha, hidden_mult, max_iter: MLP-inställningar (se hparam_search.py)
+        n_estimators (int): Antal MLP:er i baggingen
+        oob_proba (bool): Spara out-of-bag-sannolikheter i oob_proba_ vid fit
+        oob_rows (int): Poängsätt bara de sista oob_rows raderna out-of-bag (None = alla)
+        time_budget (float): Tidsbudget i sekunder för fit (None = ingen gräns)
     """
-    base = DynamicMLP(alpha=0.001)  # Remove threshold from base estimator
-    clf = CustomThresholdBaggingClassifier(
-        estimator=base,
-        decision_threshold=decision_threshold,
-        n_estimators=9,
-        sampling_strategy="auto",
-        bootstrap=True,
-        n_jobs=1  # Use single job to avoid pickle issues with custom classes
-    )
-    return clf
+    return BalancedBaggingMLP(n_estimators=n_estimators, alpha=alpha, hidden_mult=hidden_mult,
+                              max_iter=max_iter, decision_threshold=decision_threshold,
+                              oob_proba=oob_proba, random_state=random_state, time_budget=time_budget,
+                              oob_rows=oob_rows)
 
-def make_hgb(random_state=42, learning_rate=0.05, max_iter=800, early_stopping=True):
+def make_hgb(random_state=42, learning_rate=0.05, max_iter=800, early_stopping=True,
+             max_leaf_nodes=31, min_samples_leaf=20, l2_regularization=0.0):
     """Factory for HistGradientBoostingClassifier used by safe step1.
     Caller should pass sample_weight when fitting for class balance.
     """
@@ -102,11 +270,187 @@ def make_hgb(random_state=42, learning_rate=0.05, max_iter=800, early_stopping=T
         max_depth=None,
         learning_rate=learning_rate,
         max_iter=max_iter,
+        max_leaf_nodes=max_leaf_nodes,
+        min_samples_leaf=min_samples_leaf,
+        l2_regularization=l2_regularization,
         early_stopping=early_stopping,
         validation_fraction=0.1,
         random_state=random_state,
     )
 
+class OnlineLogistic(BaseEstimator, ClassifierMixin):
+    """
+    Logistisk regression tränad med SGD och strömmande MinMax-skalning.
+    fit() tränar från början (n_epochs pass över datan); partial_fit() tar in nya rader
+    (t.ex. dagens nyligen mognade label) i O(features) per rad, utan att träna om.
+    Klasserna balanseras med sample weights n / (k * n_c) från löpande klassräknare.
+    Med time_budget (sekunder) avbryter fit() efter den sista epok som ryms (minst en).
+    """
+    def __init__(self, alpha=1e-4, n_epochs=5, random_state=42, decision_threshold=0.5, time_budget=None):
+        self.alpha = alpha
+        self.n_epochs = n_epochs
+        self.random_state = random_state
+        self.decision_threshold = decision_threshold
+        self.time_budget = time_budget
+
+    def _reset(self):
+        self.scaler_ = MinMaxScaler(clip=True)
+        self.sgd_ = SGDClassifier(loss="log_loss", alpha=self.alpha, random_state=self.random_state)
+        self.class_counts_ = np.zeros(2)
+        self.classes_ = np.array([0, 1])
+
+    def _sgd_step(self, X, y):
+        # balanserade vikter från löpande klassräknare
+        weights = self.class_counts_.sum() / (2 * np.maximum(self.class_counts_, 1))
+        self.sgd_.partial_fit(self.scaler_.transform(X), y, classes=self.classes_, sample_weight=weights[y])
+
+    def fit(self, X, y):
+        self._reset()
+        X = np.asarray(X)
+        y = np.asarray(y).astype(int)
+        self.scaler_.partial_fit(X)
+        self.class_counts_ += np.bincount(y, minlength=2)
+        rng = np.random.default_rng(self.random_state)
+        t0 = time.perf_counter()
+        done = 0
+        for _ in range(self.n_epochs):
+            order = rng.permutation(len(y))
+            self._sgd_step(X[order], y[order])
+            done += 1
+            elapsed = time.perf_counter() - t0
+            if self.time_budget is not None and elapsed + elapsed / done > self.time_budget:
+                break
+        self.budget_info_ = None
+        if self.time_budget is not None:
+            self.budget_info_ = {"budget_s": float(self.time_budget), "seconds": round(time.perf_counter() - t0, 3),
+                                 "epochs": done, "truncated": done < self.n_epochs}
+        return self
+
+    def partial_fit(self, X, y):
+        if not hasattr(self, "sgd_"):
+            self._reset()
+        X = np.asarray(X)
+        if len(X) == 0:
+            return self
+        y = np.asarray(y).astype(int)
+        self.scaler_.partial_fit(X)
+        self.class_counts_ += np.bincount(y, minlength=2)
+        self._sgd_step(X, y)
+        return self
+
+    def predict_proba(self, X):
+        return self.sgd_.predict_proba(self.scaler_.transform(X))
+
+    def predict(self, X):
+        return (self.predict_proba(X)[:, 1] >= self.decision_threshold).astype(int)
+
+
+def make_online(alpha=1e-4, n_epochs=5, decision_threshold=0.5, time_budget=None):
+    """Online-modell för dagliga inkrementella uppdateringar (STEP1_MODEL=online)."""
+    return OnlineLogistic(alpha=alpha, n_epochs=n_epochs, decision_threshold=decision_threshold,
+                          time_budget=time_budget)
+
+
+MODEL_NAMES = ("hgb", "mlp_bagging", "online")
+
+
+def make_model(name, **params):
+    """Modellfabrik per namn (t.ex. från STEP1_MODEL): 'hgb', 'mlp_bagging' eller 'online'."""
+    if name == "hgb":
+        return make_hgb(**params)
+    if name == "mlp_bagging":
+        return make_mlp_bagging(**params)
+    if name == "online":
+        return make_online(**params)
+    raise ValueError(f"Okänd modell: {name!r} (välj bland {', '.join(MODEL_NAMES)})")
+
+
+# Tidsbudget: HGB:s uppmätta sekunder per iteration och träningsrad, per modellform (se _hgb_iter_cost)
+_hgb_iter_seconds = {}
+
+
+def _timed_fit(clf, X, y):
+    t = time.perf_counter()
+    clf.fit(X, y)
+    return time.perf_counter() - t
+
+
+def _hgb_iter_cost(clf, X, y, chunk):
+    """
+    Sekunder per boosting-iteration för clf på X. Mäts med två korta oviktade provträningar
+    (1 och 2*chunk iterationer, nästan ingen binning; skillnaden tar bort provets egen fasta
+    kostnad) första gången en modellform tränas i processen, och skalas sedan med antalet rader.
+    """
+    key = (X.shape[1], clf.max_leaf_nodes, clf.max_depth, clf.min_samples_leaf, clf.max_bins,
+           clf.early_stopping)
+    per_row = _hgb_iter_seconds.get(key)
+    if per_row is None:
+        probe = [_timed_fit(clone(clf).set_params(warm_start=False, max_iter=n), X, y)
+                 for n in (1, 2 * chunk)]
+        per_iter = max(probe[1] - probe[0], probe[1] / 2) / (2 * chunk - 1)
+        per_row = _hgb_iter_seconds[key] = per_iter / len(X)
+    return per_row * len(X)
+
+
+def _fit_hgb_budgeted(clf, X, y, sample_weight, time_budget):
+    """
+    HGB med tidsbudget: en första omgång om HGB_BUDGET_CHUNK iterationer, sedan warm_start
+    med så många iterationer till som ryms, tills max_iter, early stopping eller budgeten.
+    Varje fit() binnar om datan med viktade percentiler, en fast kostnad som ofta är större
+    än själva träden. Kostnaden per iteration tas därför separat (_hgb_iter_cost, mätt en gång
+    per process) och den fasta kostnaden är första omgången minus dess iterationer.
+    Ryms resten av max_iter i budgeten körs den i en enda omgång.
+    Den första omgången tränas alltid.
+    """
+    t0 = time.perf_counter()
+    target = clf.max_iter
+    chunk = min(HGB_BUDGET_CHUNK, target)
+    clf.set_params(warm_start=True, max_iter=chunk)
+    try:
+        clf.fit(X, y, sample_weight=sample_weight)
+        first_round = time.perf_counter() - t0
+        if clf.n_iter_ == chunk < target:
+            per_iter = _hgb_iter_cost(clf, X, y, chunk)
+            fixed = max(first_round - chunk * per_iter, 0.0)
+            while clf.n_iter_ == clf.max_iter < target:
+                done = clf.n_iter_
+                left = time_budget - (time.perf_counter() - t0) - fixed
+                step = min(target - done, int(left / per_iter))
+                if step <= 0:
+                    break
+                clf.set_params(max_iter=done + step)
+                clf.fit(X, y, sample_weight=sample_weight)
+        stopped_early = clf.n_iter_ < clf.max_iter
+    finally:
+        clf.set_params(warm_start=False, max_iter=target)
+    clf.budget_info_ = {"budget_s": float(time_budget), "seconds": round(time.perf_counter() - t0, 3),
+                        "iterations": int(clf.n_iter_), "max_iter": int(target),
+                        "truncated": not stopped_early and clf.n_iter_ < target}
+    return clf
+
+
+def fit_model(clf, X, y, time_budget=None):
+    """
+    Tränar clf. HistGradientBoosting balanserar inte klasserna själv, så den får
+    sample weights n / (k * n_c); BalancedBagging undersamplar redan per estimator.
+    time_budget (sekunder) ger "anytime"-träning för HGB, BalancedBaggingMLP och
+    OnlineLogistic; vad som hann tränas står i clf.budget_info_.
+    """
+    y = np.asarray(y).astype(int)
+    if isinstance(clf, HistGradientBoostingClassifier):
+        classes, counts = np.unique(y, return_counts=True)
+        weights = len(y) / (len(classes) * counts)
+        sample_weight = weights[np.searchsorted(classes, y)]
+        if time_budget is not None:
+            return _fit_hgb_budgeted(clf, X, y, sample_weight, time_budget)
+        clf.fit(X, y, sample_weight=sample_weight)
+    else:
+        if time_budget is not None and "time_budget" in clf.get_params(deep=False):
+            clf.set_params(time_budget=time_budget)
+        clf.fit(X, y)
+    return clf
+
+
 def fit_predict(clf, X_train, y_train, X_test, debug=False):
     """
     Tränar klassificerare och gör förutsägelser med stöd för anpassad threshold.
@@ -114,12 +458,16 @@ def fit_predict(clf, X_train, y_train, X_test, debug=False):
     Args:
         debug (bool): Om True, returnera extra debug-information
     """
-    clf.fit(X_train, y_train)
-    y_pred = clf.predict(X_test)
-    try:
-        y_proba = clf.predict_proba(X_test)[:, 1]
-    except Exception:
-        y_proba = np.zeros(len(y_pred))
+    with timer("model.fit"):
+        clf.fit(X_train, y_train)
+    increment("model.fit_calls")
+    with timer("model.predict"):
+        y_pred = clf.predict(X_test)
+        try:
+            y_proba = clf.predict_proba(X_test)[:, 1]
+        except Exception:
+            y_proba = np.zeros(len(y_pred))
+    increment("model.predict_calls")
     
     if debug:
         # Extra information för debugging
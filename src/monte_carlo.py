@@ -0,0 +1,302 @@
+# -*- coding: utf-8 -*-
+"""
+Monte Carlo av strategin ("köp på nästa '1'-dag efter insättning") mot DCA på simulerade
+prisbanor, istället för en enda historisk equity-kurva.
+
+- banor: block-bootstrap av historiska logavkastningar (cirkulära block om --block dagar,
+  behåller volatilitetskluster och autokorrelation inom blocken) eller GBM med mu/sigma
+  skattade från historiken
+- features räknas med feature_registry.evaluate på hela (dagar x banor)-arrayen i ett pass,
+  labels med labels.labels_panel; modellen (tränad en gång på historiken) poängsätter alla
+  banor i ett predict_proba-anrop per chunk
+- equity för strategi och DCA räknas batchat med evaluate.signal_dca_positions/dca_units
+  på samma TradingCalendar för alla banor
+- banorna delas i chunkar som ryms i minnesbudgeten (--memory-mb) och körs i en processpool;
+  varje chunk har ett eget deterministiskt frö, så resultatet beror inte på antal workers.
+  Bara per-bana-resultat (några tal) skickas tillbaka
+
+    python -m src.monte_carlo --synthetic 5000 --paths 2000 --workers 4
+    python -m src.monte_carlo --start 1999-01-01 --method gbm --paths 5000 --out mc_paths.csv
+"""
+import argparse
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import numpy as np
+import pandas as pd
+
+# Add project root to path if not already there
+project_root = os.path.join(os.path.dirname(__file__), '..')
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+
+try:
+    from src.feature_registry import DEFAULT_FEATURES, evaluate, warmup_length
+    from src.labels import labels_panel
+    from src.evaluate import signal_dca_positions, dca_units
+    from src.trading_calendar import TradingCalendar
+    from src.model import MODEL_NAMES
+except ImportError:
+    from feature_registry import DEFAULT_FEATURES, evaluate, warmup_length
+    from labels import labels_panel
+    from evaluate import signal_dca_positions, dca_units
+    from trading_calendar import TradingCalendar
+    from model import MODEL_NAMES
+
+METHODS = ("bootstrap", "gbm")
+DEFAULT_BLOCK = 20
+DEFAULT_MEMORY_MB = 512
+QUANTILES = (0.05, 0.25, 0.5, 0.75, 0.95)
+
+
+# --- Banor ---
+
+def fit_gbm(close):
+    """(mu, sigma) per år från dagliga logavkastningar (dt = 1/252, som gbm_prices)."""
+    r = np.diff(np.log(np.asarray(close, dtype=float)))
+    sigma = r.std(ddof=1) * np.sqrt(252.0)
+    return r.mean() * 252.0 + 0.5 * sigma ** 2, sigma
+
+
+def gbm_paths(n_paths, n_days, mu, sigma, s0=1000.0, rng=None):
+    """(n_days x n_paths) GBM-banor som startar i s0."""
+    rng = rng if rng is not None else np.random.default_rng()
+    dt = 1.0 / 252.0
+    log_ret = (mu - 0.5 * sigma ** 2) * dt + sigma * np.sqrt(dt) * rng.standard_normal((n_days, n_paths))
+    log_ret[0] = 0.0
+    return s0 * np.exp(np.cumsum(log_ret, axis=0))
+
+
+def block_bootstrap_paths(log_ret, n_paths, n_days, block=DEFAULT_BLOCK, s0=1000.0, rng=None):
+    """
+    (n_days x n_paths) banor ur cirkulär block-bootstrap av log_ret: slumpade startpunkter,
+    block om block dagar i följd (med omslag i slutet av historiken).
+    """
+    rng = rng if rng is not None else np.random.default_rng()
+    log_ret = np.asarray(log_ret, dtype=float)
+    n_blocks = -(-(n_days - 1) // block)
+    starts = rng.integers(0, len(log_ret), size=(n_blocks, 1, n_paths))
+    idx = (starts + np.arange(block)[None, :, None]) % len(log_ret)
+    steps = log_ret[idx.reshape(n_blocks * block, n_paths)[:n_days - 1]]
+    out = np.empty((n_days, n_paths))
+    out[0] = 0.0
+    np.cumsum(steps, axis=0, out=out[1:])
+    return s0 * np.exp(out)
+
+
+# --- Utvärdering av en chunk ---
+
+def evaluate_paths(P, model, threshold, calendar, feature_cols=DEFAULT_FEATURES, monthly_day=25,
+                   contribution=1000.0):
+    """
+    Per-bana-mått för (T x A)-banorna P. Simuleringen börjar på första raden där alla
+    features är giltiga; calendar ska täcka raderna därifrån.
+    """
+    feature_cols = list(feature_cols)
+    start = warmup_length(feature_cols)
+    vals = evaluate(P, feature_cols)
+    X = np.stack([vals.pop(n)[start:] for n in feature_cols], axis=-1).astype(np.float32)
+    close = P[start:]
+    T, A = close.shape
+    proba = model.predict_proba(X.reshape(T * A, -1))[:, 1].reshape(T, A)
+    del X
+    buy = proba > threshold
+
+    deposit_rows = calendar.deposit_rows(monthly_day)
+    cash, units = signal_dca_positions(close, buy, deposit_rows, contribution)
+    strategy = cash[-1] + units[-1] * close[-1]
+    dca = dca_units(close, deposit_rows, contribution)[-1] * close[-1]
+
+    labels = labels_panel(close)
+    labeled = np.isfinite(labels)
+    predicted = buy & labeled
+    n_pred = predicted.sum(axis=0)
+    tp = (predicted & (labels == 1)).sum(axis=0)
+    return {
+        "final_strategy": strategy,
+        "final_dca": dca,
+        "invested": np.full(A, contribution * len(deposit_rows)),
+        "outperformance": strategy / dca - 1.0,
+        "buy_rate": buy.mean(axis=0),
+        "precision": np.where(n_pred > 0, tp / np.maximum(n_pred, 1), np.nan),
+        "label_rate": np.nanmean(np.where(labeled, labels, np.nan), axis=0),
+        "path_return": close[-1] / close[0] - 1.0,
+    }
+
+
+def chunk_size(n_days, n_features, memory_mb=DEFAULT_MEMORY_MB):
+    """Antal banor per chunk så att features, X och equity-arrayer ryms i memory_mb."""
+    # float64-features (med några levande mellanled), float32-X och ~12 (T x A)-arbetsarrayer
+    per_path = n_days * (8 * (n_features + 4) + 4 * n_features + 8 * 12)
+    return max(1, int(memory_mb * 2**20 // per_path))
+
+
+# --- Worker ---
+
+_STATE = None
+
+
+def _init_worker(state):
+    global _STATE
+    _STATE = state
+
+
+def _run_chunk(chunk, n_paths):
+    s = _STATE
+    rng = np.random.default_rng([s["seed"], chunk])
+    if s["method"] == "gbm":
+        P = gbm_paths(n_paths, s["n_days"], s["mu"], s["sigma"], s["s0"], rng)
+    else:
+        P = block_bootstrap_paths(s["log_ret"], n_paths, s["n_days"], s["block"], s["s0"], rng)
+    res = evaluate_paths(P, s["model"], s["threshold"], s["calendar"], s["feature_cols"],
+                         s["monthly_day"], s["contribution"])
+    res["path"] = chunk * s["chunk_paths"] + np.arange(n_paths)
+    return chunk, res
+
+
+# --- Driver ---
+
+def run_monte_carlo(close, model, threshold=0.5, feature_cols=DEFAULT_FEATURES, n_paths=1000, n_days=None,
+                    method="bootstrap", block=DEFAULT_BLOCK, monthly_day=25, contribution=1000.0,
+                    start="2000-01-03", n_workers=None, memory_mb=DEFAULT_MEMORY_MB, seed=0, log=print):
+    """
+    Simulerar n_paths banor (default lika långa som close) och returnerar en DataFrame med en
+    rad per bana (se evaluate_paths); df.attrs["summary"] = summarize(df).
+    """
+    if method not in METHODS:
+        raise ValueError(f"Okänd metod: {method!r} (välj bland {', '.join(METHODS)})")
+    close = np.asarray(close, dtype=float)
+    close = close[np.isfinite(close)]
+    feature_cols = list(feature_cols)
+    n_days = int(n_days or len(close))
+    warm = warmup_length(feature_cols)
+    if n_days <= warm + 70:
+        raise ValueError(f"n_days={n_days} är för kort (uppvärmning {warm} + labelhorisont 70)")
+
+    mu, sigma = fit_gbm(close)
+    per_chunk = min(n_paths, chunk_size(n_days, len(feature_cols), memory_mb))
+    state = {
+        "method": method, "n_days": n_days, "block": block, "s0": float(close[-1]),
+        "log_ret": np.diff(np.log(close)), "mu": mu, "sigma": sigma,
+        "model": model, "threshold": float(threshold), "feature_cols": feature_cols,
+        "calendar": TradingCalendar(pd.bdate_range(start=start, periods=n_days)[warm:]),
+        "monthly_day": monthly_day, "contribution": contribution,
+        "seed": seed, "chunk_paths": per_chunk,
+    }
+    sizes = [min(per_chunk, n_paths - i) for i in range(0, n_paths, per_chunk)]
+    log(f"Monte Carlo: {n_paths} {method} paths x {n_days} days in {len(sizes)} chunk(s) of "
+        f"<= {per_chunk} (memory budget {memory_mb} MB)")
+
+    t0 = time.perf_counter()
+    results = {}
+
+    def _collect(chunk, res):
+        results[chunk] = res
+        done = sum(len(r["path"]) for r in results.values())
+        log(f"  chunk {chunk + 1}/{len(sizes)} done, {done}/{n_paths} paths, "
+            f"{time.perf_counter() - t0:.1f}s")
+
+    if n_workers == 1 or len(sizes) == 1:
+        _init_worker(state)
+        for chunk, n in enumerate(sizes):
+            _collect(*_run_chunk(chunk, n))
+    else:
+        with ProcessPoolExecutor(max_workers=n_workers, initializer=_init_worker, initargs=(state,)) as pool:
+            futures = [pool.submit(_run_chunk, chunk, n) for chunk, n in enumerate(sizes)]
+            for fut in as_completed(futures):
+                _collect(*fut.result())
+
+    df = pd.concat([pd.DataFrame(results[c]) for c in sorted(results)], ignore_index=True)
+    df = df[["path"] + [c for c in df.columns if c != "path"]]
+    df.attrs["summary"] = summarize(df)
+    df.attrs["summary"].update(method=method, n_days=n_days, seconds=time.perf_counter() - t0)
+    return df
+
+
+def summarize(df) -> dict:
+    """Fördelningen av outperformance (strategi/DCA - 1) över banorna."""
+    out = df["outperformance"].to_numpy()
+    q = np.quantile(out, QUANTILES)
+    tail = out[out <= q[0]]
+    return {
+        "n_paths": int(len(out)),
+        "p_outperform": float((out > 0).mean()),
+        "mean": float(out.mean()),
+        **{f"q{int(p * 100):02d}": float(v) for p, v in zip(QUANTILES, q)},
+        "cvar05": float(tail.mean()) if len(tail) else float("nan"),
+        "median_precision": float(np.nanmedian(df["precision"])),
+        "median_buy_rate": float(df["buy_rate"].median()),
+    }
+
+
+def train_on_history(df, model="hgb", feature_cols=DEFAULT_FEATURES):
+    """Modell tränad en gång på hela historiken (features + labels på df med Date/Close)."""
+    try:
+        from src.features import build_feature_set
+        from src.labels import labels_give_data_set_with_0_or_1
+        from src.feature_matrix import FeatureMatrix
+        from src.model import make_model, fit_model
+    except ImportError:
+        from features import build_feature_set
+        from labels import labels_give_data_set_with_0_or_1
+        from feature_matrix import FeatureMatrix
+        from model import make_model, fit_model
+
+    df_lab = labels_give_data_set_with_0_or_1(build_feature_set(df, features=feature_cols)).reset_index(drop=True)
+    X, y, _ = FeatureMatrix.from_frame(df_lab, feature_cols).window(0, len(df_lab), require_label=True)
+    return fit_model(make_model(model), X, y)
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Monte Carlo of the signal strategy vs DCA on simulated price paths.")
+    ap.add_argument("--start", default="1999-01-01", help="FRED start date (ignored with --synthetic).")
+    ap.add_argument("--synthetic", type=int, default=0, help="Use N synthetic GBM days as history instead of FRED.")
+    ap.add_argument("--method", default="bootstrap", choices=list(METHODS))
+    ap.add_argument("--block", type=int, default=DEFAULT_BLOCK, help="Bootstrap block length in days.")
+    ap.add_argument("--paths", type=int, default=1000)
+    ap.add_argument("--days", type=int, default=None, help="Path length; default the history length.")
+    ap.add_argument("--model", default="hgb", choices=list(MODEL_NAMES))
+    ap.add_argument("--threshold", type=float, default=0.5)
+    ap.add_argument("--monthly-day", type=int, default=25)
+    ap.add_argument("--workers", type=int, default=None)
+    ap.add_argument("--memory-mb", type=int, default=DEFAULT_MEMORY_MB, help="Memory budget per chunk.")
+    ap.add_argument("--seed", type=int, default=0)
+    ap.add_argument("--out", default=None, help="Write per-path results as CSV.")
+    args = ap.parse_args(argv)
+
+    if args.synthetic:
+        try:
+            from src.benchmarks.synthetic import gbm_prices
+        except ImportError:
+            from benchmarks.synthetic import gbm_prices
+        df = gbm_prices(args.synthetic)
+    else:
+        try:
+            from src.stage_cache import sp500_pipeline
+        except ImportError:
+            from stage_cache import sp500_pipeline
+        df = sp500_pipeline(start=args.start).run("fetch")
+
+    t0 = time.perf_counter()
+    model = train_on_history(df, args.model)
+    print(f"Trained {args.model} on {len(df)} days of history in {time.perf_counter() - t0:.1f}s")
+
+    res = run_monte_carlo(df["Close"], model, threshold=args.threshold, n_paths=args.paths, n_days=args.days,
+                          method=args.method, block=args.block, monthly_day=args.monthly_day,
+                          start=str(pd.Timestamp(df["Date"].iloc[0]).date()), n_workers=args.workers,
+                          memory_mb=args.memory_mb, seed=args.seed)
+    s = res.attrs["summary"]
+    print(f"\nStrategy vs DCA over {s['n_paths']} {s['method']} paths ({s['seconds']:.1f}s):")
+    print(f"  P(outperform) {s['p_outperform']:.1%}   mean {s['mean']:+.2%}   CVaR5 {s['cvar05']:+.2%}")
+    print("  quantiles     " + "  ".join(f"q{int(p * 100):02d} {s[f'q{int(p * 100):02d}']:+.2%}" for p in QUANTILES))
+    print(f"  median precision {s['median_precision']:.3f}, median buy rate {s['median_buy_rate']:.3f}")
+    if args.out:
+        res.to_csv(args.out, index=False)
+        print(f"Wrote {len(res)} paths to {args.out}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
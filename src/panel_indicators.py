@@ -0,0 +1,230 @@
+# -*- coding: utf-8 -*-
+"""
+Panel-varianter av indikatorerna i indicators.py för många tillgångar samtidigt.
+
+Indata är en (T x A) float-array (tid x tillgång, t.ex. hundratals tickers/FRED-serier).
+Alla tillgångar beräknas i samma vektoriserade pass, så kostnaden skalar med arrayens
+bredd istället för med ett Python-anrop per tillgång:
+  - rekursioner (EMA, SES) körs med scipy.signal.lfilter längs tidsaxeln
+  - rullande summor/medel via kumulativa summor
+Varje kolumn hanteras från sin egen första giltiga observation (ledande NaN), vilket
+motsvarar att köra enkelseriefunktionen på kolumnen efter dropna av prefixet.
+NaN mitt i en serie propagerar som i originalfunktionerna.
+
+build_feature_panel() ger samma Sub-model 4-features som features.build_feature_set,
+i brett (MultiIndex-kolumner feature/tillgång) eller långt format (Date, asset, features...).
+"""
+import numpy as np
+import pandas as pd
+from scipy.signal import lfilter
+
+
+def _as_panel(prices) -> np.ndarray:
+    P = np.asarray(prices, dtype=float)
+    if P.ndim == 1:
+        P = P[:, None]
+    return P
+
+
+def first_valid_index(P: np.ndarray) -> np.ndarray:
+    """Första rad med ändligt värde per kolumn (T om kolumnen saknar data)."""
+    finite = np.isfinite(P)
+    first = np.argmax(finite, axis=0)
+    first[~finite.any(axis=0)] = P.shape[0]
+    return first
+
+
+def _shift(P: np.ndarray, k: int) -> np.ndarray:
+    out = np.full_like(P, np.nan)
+    if k < P.shape[0]:
+        out[k:] = P[:P.shape[0] - k]
+    return out
+
+
+def sma_panel(P, window: int) -> np.ndarray:
+    """Rullande medel; NaN om fönstret innehåller NaN (som rolling(min_periods=window))."""
+    P = _as_panel(P)
+    T = P.shape[0]
+    finite = np.isfinite(P)
+    zero = np.zeros((1, P.shape[1]))
+    csum = np.vstack([zero, np.cumsum(np.where(finite, P, 0.0), axis=0)])
+    ccnt = np.vstack([zero, np.cumsum(finite, axis=0)])
+    out = np.full_like(P, np.nan)
+    if window > T:
+        return out
+    s = csum[window:] - csum[:-window]
+    c = ccnt[window:] - ccnt[:-window]
+    out[window - 1:] = np.where(c == window, s / window, np.nan)
+    return out
+
+
+def ema_seeded_panel(P, n: int) -> np.ndarray:
+    """
+    indicators.ema_seeded per kolumn: SMA(n)-seed på kolumnens första n giltiga värden,
+    därefter EMA_t = k*C_t + (1-k)*EMA_{t-1}. Rekursionen körs med lfilter för alla kolumner.
+    """
+    P = _as_panel(P)
+    T, A = P.shape
+    k = 2.0 / (n + 1.0)
+    out = np.full_like(P, np.nan)
+
+    first = first_valid_index(P)
+    seed_pos = first + n - 1
+    ok = seed_pos < T
+    if not ok.any():
+        return out
+
+    cols = np.flatnonzero(ok)
+    rows = seed_pos[cols]
+    # seed = medel av de n första giltiga värdena per kolumn
+    offs = first[cols][None, :] + np.arange(n)[:, None]
+    seeds = P[offs, cols[None, :]].mean(axis=0)
+
+    # Före seed: indata 0 (=> utdata 0); vid seed: x = seed/k så att k*x = seed; därefter priserna.
+    t_idx = np.arange(T)[:, None]
+    X = np.where(t_idx > seed_pos[None, :], P, 0.0)
+    X[rows, cols] = seeds / k
+    E = lfilter([k], [1.0, -(1.0 - k)], X[:, cols], axis=0)
+    E[t_idx < seed_pos[None, cols]] = np.nan
+    out[:, cols] = E
+    return out
+
+
+def tema_panel(P, n: int) -> np.ndarray:
+    """indicators.tema_paper: 3*EMA1 - 3*EMA2 + EMA3 (EMA2/EMA3 seedas efter föregående lagers NaN-prefix)."""
+    e1 = ema_seeded_panel(P, n)
+    e2 = ema_seeded_panel(e1, n)
+    e3 = ema_seeded_panel(e2, n)
+    return 3.0 * e1 - 3.0 * e2 + e3
+
+
+def mom_ema_panel(P, n: int, ofs: int, log_ratio: bool = False) -> np.ndarray:
+    e = ema_seeded_panel(P, n)
+    ratio = e / _shift(e, ofs)
+    return np.log(ratio) if log_ratio else ratio
+
+
+def mom_tema_panel(P, n: int, ofs: int, log_ratio: bool = False) -> np.ndarray:
+    t = tema_panel(P, n)
+    ratio = t / _shift(t, ofs)
+    return np.log(ratio) if log_ratio else ratio
+
+
+def rc_tema_panel(P, n: int, mode: str = "ratio") -> np.ndarray:
+    P = _as_panel(P)
+    ratio = P / tema_panel(P, n)
+    if mode == "log":
+        return np.log(ratio)
+    if mode == "pct":
+        return ratio - 1.0
+    return ratio
+
+
+def log_return_panel(P, n: int) -> np.ndarray:
+    P = _as_panel(P)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        logp = np.log(np.where(P == 0, np.nan, P))
+    return logp - _shift(logp, n)
+
+
+def ses_forward_sma_panel(P, alpha: float = 0.3, sma_windows=(30, 100, 150), max_chunk_bytes=64 * 2**20):
+    """
+    Panelversion av indicators.rtf_recursive_ses_H_eq_n.
+
+    För varje t och fönster n (H = n) är de H framtida SMA(n)-värdena på [seed + H prognoser]:
+        SMA_k = (summa(seed[k:]) + (k+1)*l_t) / n,  k = 0..n-1
+    där seed är de n-1 senaste stängningarna och l_t SES-nivån. Med kumulativa summor C blir
+    summa(seed[k:]) = C[t+1] - C[t-n+2+k], så avg/min över k räknas utan inre Python-loop
+    (i tidsblock för att begränsa minnet). Vänsterutfyllnaden med första värdet motsvaras av
+    att serien förlängs med n-1 kopior av kolumnens första giltiga värde.
+
+    Returnerar dict {"FWD_SMA_{n}_avg": (T x A), "FWD_SMA_{n}_min": (T x A)}.
+    """
+    P = _as_panel(P)
+    T, A = P.shape
+    first = first_valid_index(P)
+    has = first < T
+    first_val = np.where(has, P[np.minimum(first, T - 1), np.arange(A)], np.nan)
+
+    # Ledande NaN ersätts med kolumnens första värde (samma som att serien börjar där)
+    t_idx = np.arange(T)[:, None]
+    Y = np.where(t_idx < first[None, :], first_val[None, :], P)
+
+    # SES: l_t = a*y_t + (1-a)*l_{t-1}, l_{-1} = y_0
+    level = lfilter([alpha], [1.0, -(1.0 - alpha)], Y, axis=0, zi=((1.0 - alpha) * Y[0])[None, :])[0]
+
+    out = {}
+    for n in sma_windows:
+        pad = np.repeat(Y[:1], n - 1, axis=0)
+        C = np.vstack([np.zeros((1, A)), np.cumsum(np.vstack([pad, Y]), axis=0)])
+        k = np.arange(n)
+        avg = np.empty((T, A))
+        mn = np.empty((T, A))
+        chunk = max(1, int(max_chunk_bytes // (8 * n * max(A, 1))))
+        for t0 in range(0, T, chunk):
+            t = np.arange(t0, min(T, t0 + chunk))
+            p = t + n - 1                                   # position i den utfyllda serien
+            head = C[p + 1]                                 # (chunk, A)
+            tail = C[(p - n + 2)[:, None] + k[None, :]]     # (chunk, n, A)
+            vals = (head[:, None, :] - tail + (k[None, :, None] + 1) * level[t][:, None, :]) / n
+            avg[t] = vals.mean(axis=1)
+            mn[t] = vals.min(axis=1)
+        avg[t_idx < first[None, :]] = np.nan
+        mn[t_idx < first[None, :]] = np.nan
+        out[f"FWD_SMA_{n}_avg"] = avg
+        out[f"FWD_SMA_{n}_min"] = mn
+    return out
+
+
+def compute_feature_arrays(P, ses_alpha: float = 0.5, sma_windows=(30, 100, 150)) -> dict:
+    """Sub-model 4-features (samma namn som build_feature_set) som {namn: (T x A)}."""
+    P = _as_panel(P)
+    feats = {}
+    fwd = ses_forward_sma_panel(P, alpha=ses_alpha, sma_windows=sma_windows)
+    for n in sma_windows:
+        feats[f"SMA_{n}_avg"] = fwd[f"FWD_SMA_{n}_avg"]
+        feats[f"SMA_{n}_min"] = fwd[f"FWD_SMA_{n}_min"]
+    feats["MomEma_150_15"] = mom_ema_panel(P, n=150, ofs=15)
+    feats["MomEma_70_15"] = mom_ema_panel(P, n=70, ofs=15)
+    feats["MomEma_100_15"] = mom_ema_panel(P, n=100, ofs=15)
+    feats["MomTema_300_15"] = mom_tema_panel(P, n=300, ofs=15)
+    feats["RCTema_200"] = rc_tema_panel(P, n=200)
+    feats["RCTema_100"] = rc_tema_panel(P, n=100)
+    feats["LogReturn_30"] = log_return_panel(P, 30)
+    return feats
+
+
+def build_feature_panel(prices, dates=None, assets=None, layout: str = "wide",
+                        ses_alpha: float = 0.5) -> pd.DataFrame:
+    """
+    prices: (T x A) array eller DataFrame (index = datum, kolumner = tillgångar).
+    layout='wide': index = Date, kolumner = MultiIndex (feature, asset)
+    layout='long': kolumner Date, asset, Close, <features...> (en rad per datum och tillgång)
+    """
+    if isinstance(prices, pd.DataFrame):
+        dates = prices.index if dates is None else dates
+        assets = list(prices.columns) if assets is None else assets
+        P = prices.to_numpy(dtype=float)
+    else:
+        P = _as_panel(prices)
+    T, A = P.shape
+    dates = pd.RangeIndex(T) if dates is None else pd.Index(dates, name="Date")
+    assets = list(range(A)) if assets is None else list(assets)
+
+    feats = compute_feature_arrays(P, ses_alpha=ses_alpha)
+
+    if layout == "wide":
+        names = list(feats)
+        data = np.concatenate([feats[f] for f in names], axis=1)
+        cols = pd.MultiIndex.from_product([names, assets], names=["feature", "asset"])
+        return pd.DataFrame(data, index=dates, columns=cols)
+    if layout == "long":
+        long = {
+            "Date": np.repeat(np.asarray(dates), A),
+            "asset": np.tile(np.asarray(assets, dtype=object), T),
+            "Close": P.reshape(-1),
+        }
+        for name, arr in feats.items():
+            long[name] = arr.reshape(-1)
+        return pd.DataFrame(long)
+    raise ValueError(f"Okänd layout: {layout!r} (välj 'wide' eller 'long')")
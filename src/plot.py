@@ -1,26 +1,212 @@
 # -*- coding: utf-8 -*-
 """
 Enkla matplotlib-plots (ingen styling specificeras).
+
+Serierna decimeras till figurens pixelbredd (min/max per pixelkolumn) innan de ritas,
+kategorimarkörer ritas som en samling per kategori och figurer återanvänds via namn.
+Med MPLBACKEND=Agg (t.ex. i CI) sparas figurerna som PNG/SVG istället för att visas.
 """
+import sys
+import os
+
+import numpy as np
+import pandas as pd
 import matplotlib.pyplot as plt
 
-def plot_equity(df):
-    plt.figure()
-    plt.plot(df["Date"], df["equity"])
-    plt.title("Equity-kurva (DCA + köp vid nästa '1')")
-    plt.xlabel("Datum")
-    plt.ylabel("Värde")
-    plt.tight_layout()
-    return plt.gcf()
-
-
-def plot_equity_comparison(df_signal, df_baseline):
-    plt.figure()
-    plt.plot(df_signal["Date"], df_signal["equity"], label="Signalstyrd DCA")
-    plt.plot(df_baseline["Date"], df_baseline["equity"], label="Ren DCA (baseline)")
-    plt.title("Equity-kurvor: Signalstyrd vs Baseline")
-    plt.xlabel("Datum")
-    plt.ylabel("Värde")
-    plt.legend()
-    plt.tight_layout()
-    return plt.gcf()
+# Add project root to path if not already there
+project_root = os.path.join(os.path.dirname(__file__), '..')
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+
+try:
+    from src.chart_payloads import minmax_indices
+except ImportError:
+    try:
+        from .chart_payloads import minmax_indices
+    except ImportError:
+        from chart_payloads import minmax_indices
+
+DEFAULT_DPI = 100
+DEFAULT_FIGSIZE = (12, 6)
+
+# Backends utan fönster -> spara till fil istället för plt.show()
+NON_INTERACTIVE_BACKENDS = {"agg", "svg", "pdf", "ps", "cairo", "pgf", "template"}
+
+
+def _figure(name, figsize=DEFAULT_FIGSIZE, dpi=DEFAULT_DPI):
+    """Hämtar (och rensar) figuren med detta namn istället för att skapa en ny varje gång."""
+    return plt.figure(num=name, figsize=figsize, dpi=dpi, clear=True)
+
+
+def _width_px(fig):
+    return int(fig.get_figwidth() * fig.dpi)
+
+
+def decimate_indices(y, width_px: int) -> np.ndarray:
+    """Index som behåller min och max per pixelkolumn (högst ~2*width_px punkter)."""
+    return minmax_indices(np.asarray(y, dtype=float), 2 * width_px)
+
+
+def _decimate(x, y, width_px):
+    x = np.asarray(x)
+    y = np.asarray(y, dtype=float)
+    if len(y) <= 2 * width_px:
+        return x, y
+    y_filled = pd.Series(y).ffill().bfill().to_numpy()
+    idx = decimate_indices(y_filled, width_px)
+    return x[idx], y[idx]
+
+
+def _thin_markers(mask, width_px):
+    """Behåll högst en markör per pixelkolumn för positionerna där mask är sann."""
+    pos = np.flatnonzero(np.asarray(mask))
+    n = len(mask)
+    if len(pos) <= width_px or n == 0:
+        return pos
+    cols = pos * width_px // n
+    _, first = np.unique(cols, return_index=True)
+    return pos[first]
+
+
+def is_headless() -> bool:
+    return plt.get_backend().lower() in NON_INTERACTIVE_BACKENDS
+
+
+def save_figure(fig, path, dpi=DEFAULT_DPI):
+    """Sparar figuren; formatet (png/svg/...) bestäms av filändelsen."""
+    fig.savefig(path, dpi=dpi)
+    return path
+
+
+def show_or_save(fig, path):
+    """Visa interaktivt, eller spara till path om backend saknar fönster (CI)."""
+    if is_headless():
+        save_figure(fig, path)
+        print(f"Saved plot to {path}")
+    else:
+        plt.show()
+
+
+def plot_equity(df, path=None):
+    fig = _figure("equity")
+    ax = fig.gca()
+    x, y = _decimate(pd.to_datetime(df["Date"]).to_numpy(), df["equity"].to_numpy(), _width_px(fig))
+    ax.plot(x, y)
+    ax.set_title("Equity-kurva (DCA + köp vid nästa '1')")
+    ax.set_xlabel("Datum")
+    ax.set_ylabel("Värde")
+    fig.tight_layout()
+    if path:
+        save_figure(fig, path)
+    return fig
+
+
+def plot_equity_comparison(df_signal, df_baseline, path=None):
+    fig = _figure("equity_comparison")
+    ax = fig.gca()
+    w = _width_px(fig)
+    x, y = _decimate(pd.to_datetime(df_signal["Date"]).to_numpy(), df_signal["equity"].to_numpy(), w)
+    ax.plot(x, y, label="Signalstyrd DCA")
+    x, y = _decimate(pd.to_datetime(df_baseline["Date"]).to_numpy(), df_baseline["equity"].to_numpy(), w)
+    ax.plot(x, y, label="Ren DCA (baseline)")
+    ax.set_title("Equity-kurvor: Signalstyrd vs Baseline")
+    ax.set_xlabel("Datum")
+    ax.set_ylabel("Värde")
+    ax.legend()
+    fig.tight_layout()
+    if path:
+        save_figure(fig, path)
+    return fig
+
+
+# kategori -> (mask-funktion (label, pred), scatter-stil)
+_CONFUSION_STYLES = {
+    "TP": (lambda l, p: (l == 1) & (p == 1),
+           dict(color='darkgreen', s=100, marker='^', zorder=5, alpha=0.9, edgecolors='black'),
+           '✅ True Positives'),
+    "FP": (lambda l, p: (l == 0) & (p == 1),
+           dict(color='red', s=100, marker='v', zorder=5, alpha=0.9, edgecolors='black'),
+           '❌ False Positives'),
+    "TN": (lambda l, p: (l == 0) & (p == 0),
+           dict(color='lightblue', s=30, marker='o', zorder=3, alpha=0.5),
+           '✅ True Negatives'),
+    "FN": (lambda l, p: (l == 1) & (p == 0),
+           dict(color='orange', s=80, marker='x', zorder=4, alpha=0.8, linewidths=3),
+           '😞 False Negatives'),
+}
+
+
+def plot_confusion_signals(df, threshold=None, path=None):
+    """
+    Pris med TP/FP/TN/FN-markörer. Varje kategori blir en enda scatter-samling och
+    markörerna glesas ut till högst en per pixelkolumn; legenden visar fulla antal.
+    """
+    fig = _figure("confusion_signals", figsize=(15, 8))
+    ax = fig.gca()
+    w = _width_px(fig)
+
+    dates = pd.to_datetime(df["Date"]).to_numpy()
+    prices = df["Close"].to_numpy(dtype=float)
+    label = df["label"].to_numpy()
+    pred = df["pred"].to_numpy()
+
+    x, y = _decimate(dates, prices, w)
+    ax.plot(x, y, 'b-', linewidth=1.5, alpha=0.7, label='S&P 500 Price', zorder=1)
+
+    for name, (mask_fn, style, text) in _CONFUSION_STYLES.items():
+        mask = mask_fn(label, pred)
+        total = int(mask.sum())
+        if total == 0:
+            continue
+        keep = _thin_markers(mask, w)
+        ax.scatter(dates[keep], prices[keep], label=f'{text} ({total})', **style)
+
+    title = 'S&P 500 Price with Trading Signals'
+    if threshold is not None:
+        title += f' (Threshold: {threshold})'
+    ax.set_title(title, fontsize=14, fontweight='bold')
+    ax.set_ylabel('Price ($)', fontsize=12)
+    ax.set_xlabel('Date', fontsize=12)
+    ax.legend(loc='upper left', fontsize=10)
+    ax.grid(True, alpha=0.3)
+    ax.tick_params(axis='x', rotation=45)
+    fig.tight_layout()
+    if path:
+        save_figure(fig, path)
+    return fig
+
+
+def plot_equity_vs_dca(df_signals, path=None):
+    """
+    Equity Value och DCA Value (vänster axel) mot Close med Buy/Hold-markörer (höger axel).
+    Buy/Hold ritas som en samling med färg per punkt.
+    """
+    fig = _figure("equity_vs_dca", figsize=(14, 7))
+    ax1 = fig.gca()
+    w = _width_px(fig)
+    dates = pd.to_datetime(df_signals["Date"]).to_numpy()
+
+    x, y = _decimate(dates, df_signals["Equity Value"].to_numpy(), w)
+    ax1.plot(x, y, label="Equity Value", alpha=0.7, color='blue')
+    x, y = _decimate(dates, df_signals["DCA Value"].to_numpy(), w)
+    ax1.plot(x, y, label="DCA Value", alpha=0.7, color='orange')
+    ax1.set_xlabel("Date")
+    ax1.set_ylabel("Portfolio Value ($)", color='black')
+    ax1.legend(loc='upper left')
+
+    ax2 = ax1.twinx()
+    close = df_signals["Close"].to_numpy(dtype=float)
+    x, y = _decimate(dates, close, w)
+    ax2.plot(x, y, label="Close Price", alpha=0.5, color='gray')
+    buy = (df_signals["Signal"] == "Buy").to_numpy()
+    keep = np.union1d(_thin_markers(buy, w), _thin_markers(~buy, w))
+    colors = np.where(buy[keep], "green", "red")
+    ax2.scatter(dates[keep], close[keep], c=colors, label="Signals", s=20)
+    ax2.set_ylabel("Stock Price ($)", color='gray')
+    ax2.legend(loc='upper right')
+
+    ax1.set_title("Equity and DCA Value Over Time with Stock Price")
+    fig.tight_layout()
+    if path:
+        save_figure(fig, path)
+    return fig
@@ -0,0 +1,123 @@
+# -*- coding: utf-8 -*-
+"""
+Tidsserie-korsvalidering med purge/embargo för labels som tittar LABEL_HORIZON dagar framåt.
+
+En label på rad i beror på priserna i..i+h (h = LABEL_HORIZON). En träningsrad vars
+horisont överlappar testblocket läcker alltså testperiodens utfall in i träningen:
+  - purge:   träningsrader i [test_start - h, test_start) tas bort
+  - embargo: (bara purged_kfold_folds) träningsrader i [test_end, test_end + embargo)
+             tas bort, eftersom deras horisont överlappar testradernas
+
+Foldarna är färdiga int-arrayer med radpositioner (ingen DataFrame-filtrering); X/y kan
+vara FeatureMatrix-arrayerna direkt. cross_val_oof_proba() tränar foldarna parallellt
+(joblib) och returnerar out-of-fold-sannolikheter för tröskelval. Purge skyddar bara mellan
+foldarna: för att valet inte ska titta förbi dagens datum måste X/y dessutom bara innehålla
+rader vars label redan är känd (i + h <= dagens rad; se step1_safe2._matured_end).
+"""
+import numpy as np
+import pandas as pd
+from joblib import Parallel, delayed, effective_n_jobs
+from sklearn.metrics import precision_recall_fscore_support, roc_auc_score
+
+try:
+    from src.config import LABEL_HORIZON
+    from src.model import make_model, fit_model
+    from src.instrumentation import timer, increment
+except ImportError:
+    try:
+        from .config import LABEL_HORIZON
+        from .model import make_model, fit_model
+        from .instrumentation import timer, increment
+    except ImportError:
+        from config import LABEL_HORIZON
+        from model import make_model, fit_model
+        from instrumentation import timer, increment
+
+
+def walk_forward_folds(n, n_folds=5, test_size=None, purge=LABEL_HORIZON, min_train=400,
+                       train_window=None):
+    """
+    Expanderande (eller med train_window glidande) walk-forward: n_folds på varandra följande
+    testblock i slutet av serien, var och en tränad på raderna före blocket minus purge.
+    Foldar med färre än min_train träningsrader hoppas över.
+    Returnerar [(train_idx, test_idx)].
+    """
+    if test_size is None:
+        test_size = n // (n_folds + 1)
+    folds = []
+    first_test = n - n_folds * test_size
+    for k in range(n_folds):
+        t0 = first_test + k * test_size
+        t1 = n if k == n_folds - 1 else t0 + test_size
+        tr_end = max(0, t0 - purge)
+        tr_start = 0 if train_window is None else max(0, tr_end - train_window)
+        if tr_end - tr_start < min_train or t1 <= t0:
+            continue
+        folds.append((np.arange(tr_start, tr_end), np.arange(t0, t1)))
+    return folds
+
+
+def purged_kfold_folds(n, n_folds=5, purge=LABEL_HORIZON, embargo=None):
+    """
+    Blockad K-fold: varje sammanhängande block testas en gång, träning på raderna före
+    (minus purge) och efter (minus embargo, default = purge). För utvärdering där modellen
+    får se data på båda sidor om testperioden; för driftlik simulering, använd walk_forward_folds.
+    """
+    embargo = purge if embargo is None else embargo
+    bounds = np.linspace(0, n, n_folds + 1).astype(int)
+    folds = []
+    for t0, t1 in zip(bounds[:-1], bounds[1:]):
+        before = np.arange(0, max(0, t0 - purge))
+        after = np.arange(min(n, t1 + embargo), n)
+        folds.append((np.concatenate([before, after]), np.arange(t0, t1)))
+    return folds
+
+
+def fit_fold(model, model_params, X, y, train_idx, test_idx, time_budget=None):
+    """P(klass 1) på test_idx från en modell tränad på train_idx (None om bara en klass)."""
+    y_tr = y[train_idx]
+    if len(np.unique(y_tr)) < 2:
+        return None
+    clf = fit_model(make_model(model, **model_params), X[train_idx], y_tr, time_budget=time_budget)
+    return clf.predict_proba(X[test_idx])[:, 1]
+
+
+def cross_val_oof_proba(X, y, folds, model="hgb", model_params=None, n_jobs=-1, threshold=0.5,
+                        time_budget=None):
+    """
+    Tränar en modell per fold (parallellt) och returnerar (oof, report):
+      oof:    out-of-fold P(klass 1) per rad, NaN för rader som aldrig testats
+      report: DataFrame per fold med n_train, n_test, auc, precision/recall/f1 vid threshold
+    time_budget (sekunder) gäller hela anropet: varje fold får sin andel efter hur många
+    foldar som tränas efter varandra med n_jobs (se model.fit_model).
+    """
+    X = np.asarray(X)
+    y = np.asarray(y).astype(int)
+    model_params = dict(model_params or {})
+    if time_budget is not None and len(folds):
+        waves = -(-len(folds) // min(effective_n_jobs(n_jobs), len(folds)))
+        time_budget = time_budget / waves
+    with timer("cv.folds"):
+        probas = Parallel(n_jobs=n_jobs)(
+            delayed(fit_fold)(model, model_params, X, y, tr, te, time_budget) for tr, te in folds
+        )
+    increment("model.fit_calls", sum(p is not None for p in probas))
+
+    oof = np.full(len(y), np.nan)
+    rows = []
+    for k, ((tr, te), p) in enumerate(zip(folds, probas)):
+        row = {"fold": k, "train_start": int(tr[0]) if len(tr) else None,
+               "train_end": int(tr[-1]) + 1 if len(tr) else None,
+               "test_start": int(te[0]), "test_end": int(te[-1]) + 1,
+               "n_train": int(len(tr)), "n_test": int(len(te))}
+        if p is not None:
+            oof[te] = p
+            y_te = y[te]
+            prec, rec, f1, _ = precision_recall_fscore_support(
+                y_te, (p >= threshold).astype(int), labels=[0, 1], zero_division=0)
+            row.update({
+                "auc": float(roc_auc_score(y_te, p)) if len(np.unique(y_te)) == 2 else np.nan,
+                "precision_1": float(prec[1]), "recall_1": float(rec[1]), "f1_1": float(f1[1]),
+            })
+        rows.append(row)
+    return oof, pd.DataFrame(rows)
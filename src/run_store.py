@@ -0,0 +1,306 @@
+# -*- coding: utf-8 -*-
+"""
+SQLite-lager för körningar: signaler per dag, backtest-mått per fönster och modellmetadata.
+
+Tabeller (en fil, default runs.sqlite; PIPELINE_DB ändrar sökvägen, PIPELINE_DB=0 stänger av):
+  runs           run_id, name, kind, created_at, git_commit, params (JSON), notes
+  signals        (run_id, date) -> close, signal, proba_buy, label, outcome (TP/FP/TN/FN)
+  window_metrics (run_id, window_start) -> window_end, tp, tn, fp, fn, precision_1, recall_1, f1_1, n
+  model_meta     run_id -> model, threshold, trained_until, n_features, feature_cols (JSON), params (JSON)
+
+Datum lagras som ISO-strängar (YYYY-MM-DD), så datumintervall är indexerade range-frågor.
+signals och window_metrics är WITHOUT ROWID med primärnyckel (run_id, datum), och signals har
+dessutom ett index på date för att skära samma period ur många körningar. Skrivningar går
+via executemany i en transaktion; frågehjälparna returnerar DataFrames.
+
+    store = RunStore()
+    run_id = store.start_run("step1_safe2", kind="walkforward", params={"model": "hgb"})
+    store.add_signals(run_id, df_signals)
+    store.compare_runs()                              # en rad per körning
+    store.signals(start="2024-01-01", end="2024-06-30")
+"""
+import json
+import os
+import sqlite3
+import subprocess
+import sys
+from datetime import datetime, timezone
+
+import numpy as np
+import pandas as pd
+
+# Add project root to path if not already there
+project_root = os.path.join(os.path.dirname(__file__), '..')
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+
+try:
+    from src.instrumentation import timed
+except ImportError:
+    try:
+        from .instrumentation import timed
+    except ImportError:
+        from instrumentation import timed
+
+DB_ENV = "PIPELINE_DB"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    run_id      INTEGER PRIMARY KEY AUTOINCREMENT,
+    name        TEXT NOT NULL,
+    kind        TEXT NOT NULL,
+    created_at  TEXT NOT NULL,
+    git_commit  TEXT,
+    params      TEXT,
+    notes       TEXT
+);
+CREATE INDEX IF NOT EXISTS runs_kind_created ON runs (kind, created_at);
+
+CREATE TABLE IF NOT EXISTS signals (
+    run_id      INTEGER NOT NULL REFERENCES runs (run_id) ON DELETE CASCADE,
+    date        TEXT NOT NULL,
+    close       REAL,
+    signal      TEXT,
+    proba_buy   REAL,
+    label       INTEGER,
+    outcome     TEXT,
+    PRIMARY KEY (run_id, date)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS signals_date ON signals (date, run_id);
+
+CREATE TABLE IF NOT EXISTS window_metrics (
+    run_id       INTEGER NOT NULL REFERENCES runs (run_id) ON DELETE CASCADE,
+    window_start TEXT NOT NULL,
+    window_end   TEXT NOT NULL,
+    tp           INTEGER,
+    tn           INTEGER,
+    fp           INTEGER,
+    fn           INTEGER,
+    precision_1  REAL,
+    recall_1     REAL,
+    f1_1         REAL,
+    n            INTEGER,
+    PRIMARY KEY (run_id, window_start)
+) WITHOUT ROWID;
+
+CREATE TABLE IF NOT EXISTS model_meta (
+    run_id        INTEGER PRIMARY KEY REFERENCES runs (run_id) ON DELETE CASCADE,
+    model         TEXT,
+    threshold     REAL,
+    trained_until TEXT,
+    n_features    INTEGER,
+    feature_cols  TEXT,
+    params        TEXT
+);
+"""
+
+
+_commit = []
+
+
+def _git_commit():
+    """HEAD för projektet (en gång per process)."""
+    if not _commit:
+        try:
+            _commit.append(subprocess.check_output(["git", "rev-parse", "HEAD"], text=True,
+                                                   stderr=subprocess.DEVNULL, cwd=project_root).strip())
+        except Exception:
+            _commit.append(None)
+    return _commit[0]
+
+
+def _iso_dates(values):
+    return pd.to_datetime(pd.Series(values)).dt.strftime("%Y-%m-%d").tolist()
+
+
+def _nullable(values, dtype):
+    """Lista för executemany med NaN/tomma strängar som NULL (dtype: "float64", "Int64", "string")."""
+    s = pd.Series(values)
+    if s.dtype == object:
+        s = s.replace("", None)
+    s = s.astype(dtype)
+    return s.astype(object).where(s.notna(), None).tolist()
+
+
+def _in_clause(column, ids):
+    return f" AND {column} IN ({','.join('?' * len(ids))})", [int(i) for i in ids]
+
+
+class RunStore:
+    def __init__(self, path=None):
+        self.path = path or os.environ.get(DB_ENV, "runs.sqlite")
+        self.conn = sqlite3.connect(self.path)
+        self.conn.execute("PRAGMA foreign_keys = ON")
+        if self.path != ":memory:":
+            self.conn.execute("PRAGMA journal_mode = WAL")
+            self.conn.execute("PRAGMA synchronous = NORMAL")  # säkert med WAL, fsync bara vid checkpoint
+        self.conn.executescript(_SCHEMA)
+
+    @staticmethod
+    def enabled():
+        return os.environ.get(DB_ENV, "runs.sqlite") not in ("0", "false", "no", "")
+
+    def close(self):
+        self.conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    # --- Skrivning ---
+
+    def start_run(self, name, kind="walkforward", params=None, notes=None) -> int:
+        with self.conn:
+            cur = self.conn.execute(
+                "INSERT INTO runs (name, kind, created_at, git_commit, params, notes) VALUES (?, ?, ?, ?, ?, ?)",
+                (name, kind, datetime.now(timezone.utc).isoformat(timespec="seconds"), _git_commit(),
+                 json.dumps(params or {}, sort_keys=True, default=repr), notes))
+        return int(cur.lastrowid)
+
+    @timed("run_store.add_signals")
+    def add_signals(self, run_id, df: pd.DataFrame) -> int:
+        """
+        Signaler per dag. Förstår step1-formatet (Signal, proba_buy, TN_TP_FP_FN) och
+        rolling_train_predict-formatet (pred, proba); label tas från label-kolumnen eller,
+        om den saknas, från utfallet (TP/FN = 1, FP/TN = 0).
+        """
+        n = len(df)
+        if n == 0:
+            return 0
+        if "Signal" in df:
+            signal = df["Signal"].to_numpy()
+        elif "pred" in df:
+            pred = df["pred"].to_numpy(float)
+            signal = np.where(np.isnan(pred), "", np.where(pred == 1, "Buy", "Hold")).astype(object)
+        else:
+            signal = [None] * n
+        proba_col = "proba_buy" if "proba_buy" in df else ("proba" if "proba" in df else None)
+        if "label" in df:
+            label = df["label"].to_numpy()
+        elif "TN_TP_FP_FN" in df:
+            label = df["TN_TP_FP_FN"].map({"TP": 1, "FN": 1, "FP": 0, "TN": 0}).to_numpy()
+        else:
+            label = None
+        none = [None] * n
+        rows = zip(
+            [int(run_id)] * n,
+            _iso_dates(df["Date"]),
+            _nullable(df["Close"].to_numpy(), "float64") if "Close" in df else none,
+            _nullable(signal, "string"),
+            _nullable(df[proba_col].to_numpy(), "float64") if proba_col else none,
+            _nullable(label, "Int64") if label is not None else none,
+            _nullable(df["TN_TP_FP_FN"].to_numpy(), "string") if "TN_TP_FP_FN" in df else none,
+        )
+        with self.conn:
+            self.conn.executemany(
+                "INSERT OR REPLACE INTO signals (run_id, date, close, signal, proba_buy, label, outcome) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)", rows)
+        return n
+
+    def add_window_metrics(self, run_id, report_df: pd.DataFrame) -> int:
+        """report_df från backtest_six_windows (window_start, window_end, TP, TN, FP, FN, ...)."""
+        cols = ["window_start", "window_end", "TP", "TN", "FP", "FN", "precision_1", "recall_1", "f1_1", "n"]
+        rows = [(int(run_id), *(None if pd.isna(v) else v for v in rec))
+                for rec in report_df.reindex(columns=cols).itertuples(index=False, name=None)]
+        with self.conn:
+            self.conn.executemany(
+                "INSERT OR REPLACE INTO window_metrics (run_id, window_start, window_end, tp, tn, fp, fn, "
+                "precision_1, recall_1, f1_1, n) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)", rows)
+        return len(rows)
+
+    def set_model_meta(self, run_id, model, threshold=None, trained_until=None, feature_cols=(), params=None):
+        trained_until = None if trained_until is None else pd.Timestamp(trained_until).strftime("%Y-%m-%d")
+        with self.conn:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO model_meta (run_id, model, threshold, trained_until, n_features, "
+                "feature_cols, params) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (int(run_id), model, None if threshold is None else float(threshold), trained_until,
+                 len(feature_cols), json.dumps(list(feature_cols)),
+                 json.dumps(params or {}, sort_keys=True, default=repr)))
+
+    def delete_run(self, run_id):
+        with self.conn:
+            self.conn.execute("DELETE FROM runs WHERE run_id = ?", (int(run_id),))
+
+    # --- Frågor ---
+
+    def query(self, sql, params=(), parse_dates=None) -> pd.DataFrame:
+        return pd.read_sql_query(sql, self.conn, params=list(params), parse_dates=parse_dates)
+
+    def runs(self, kind=None, name=None) -> pd.DataFrame:
+        sql, args = "SELECT * FROM runs WHERE 1 = 1", []
+        if kind is not None:
+            sql += " AND kind = ?"
+            args.append(kind)
+        if name is not None:
+            sql += " AND name = ?"
+            args.append(name)
+        return self.query(sql + " ORDER BY run_id", args)
+
+    def signals(self, run_ids=None, start=None, end=None) -> pd.DataFrame:
+        """Signaler för run_ids (alla om None) med start <= date <= end."""
+        sql, args = "SELECT * FROM signals WHERE 1 = 1", []
+        if run_ids is not None:
+            clause, ids = _in_clause("run_id", run_ids)
+            sql += clause
+            args += ids
+        if start is not None:
+            sql += " AND date >= ?"
+            args.append(pd.Timestamp(start).strftime("%Y-%m-%d"))
+        if end is not None:
+            sql += " AND date <= ?"
+            args.append(pd.Timestamp(end).strftime("%Y-%m-%d"))
+        return self.query(sql + " ORDER BY run_id, date", args, parse_dates=["date"])
+
+    def window_metrics(self, run_ids=None) -> pd.DataFrame:
+        sql, args = "SELECT * FROM window_metrics WHERE 1 = 1", []
+        if run_ids is not None:
+            clause, args = _in_clause("run_id", run_ids)
+            sql += clause
+        return self.query(sql + " ORDER BY run_id, window_start", args,
+                          parse_dates=["window_start", "window_end"])
+
+    def model_meta(self, run_ids=None) -> pd.DataFrame:
+        sql, args = "SELECT * FROM model_meta WHERE 1 = 1", []
+        if run_ids is not None:
+            clause, args = _in_clause("run_id", run_ids)
+            sql += clause
+        return self.query(sql + " ORDER BY run_id", args)
+
+    def compare_runs(self, run_ids=None, start=None, end=None) -> pd.DataFrame:
+        """
+        En rad per körning: antal signaler, andel Buy, och precision/recall på klass 1 från
+        utfallskolumnen (räknat i SQL över den indexerade datumperioden).
+        """
+        where, args = "", []
+        if start is not None:
+            where += " AND s.date >= ?"
+            args.append(pd.Timestamp(start).strftime("%Y-%m-%d"))
+        if end is not None:
+            where += " AND s.date <= ?"
+            args.append(pd.Timestamp(end).strftime("%Y-%m-%d"))
+        run_filter = ""
+        if run_ids is not None:
+            run_filter, ids = _in_clause("r.run_id", run_ids)
+            args += ids
+        sql = f"""
+            SELECT r.run_id, r.name, r.kind, r.created_at, m.model, m.threshold,
+                   COUNT(s.date) AS n_signals,
+                   MIN(s.date) AS first_date, MAX(s.date) AS last_date,
+                   AVG(s.signal = 'Buy') AS buy_rate,
+                   SUM(s.outcome = 'TP') AS tp, SUM(s.outcome = 'FP') AS fp,
+                   SUM(s.outcome = 'TN') AS tn, SUM(s.outcome = 'FN') AS fn
+            FROM runs r
+            LEFT JOIN signals s ON s.run_id = r.run_id {where}
+            LEFT JOIN model_meta m ON m.run_id = r.run_id
+            WHERE 1 = 1 {run_filter}
+            GROUP BY r.run_id
+            ORDER BY r.run_id
+        """
+        df = self.query(sql, args)
+        tp, fp, fn = (df[c].fillna(0) for c in ("tp", "fp", "fn"))
+        df["precision_1"] = np.where(tp + fp > 0, tp / (tp + fp).where(tp + fp > 0, 1), np.nan)
+        df["recall_1"] = np.where(tp + fn > 0, tp / (tp + fn).where(tp + fn > 0, 1), np.nan)
+        return df
@@ -4,13 +4,14 @@ Skapar en schema-generator för återträning var 30:e handelsdag.
 """
 import pandas as pd
 from .config import RETRAIN_STEP, ROLLING_TRAIN_WINDOW
+from .trading_calendar import calendar_for
 
-def retrain_anchors(dates: pd.Series, step: int = RETRAIN_STEP):
+def retrain_anchors(dates, step: int = RETRAIN_STEP):
     """
     Returnerar indexpositioner för när modellen ska tränas om.
+    dates: datumserie eller en redan byggd TradingCalendar (ankarna cachas per step).
     """
-    idxs = list(range(step, len(dates), step))
-    return idxs
+    return [int(i) for i in calendar_for(dates).anchors(step)]
 
 def training_window_indices(anchor_idx: int, window: int = ROLLING_TRAIN_WINDOW):
     start = max(0, anchor_idx - window)
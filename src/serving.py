@@ -0,0 +1,280 @@
+# -*- coding: utf-8 -*-
+"""
+Lokal signaltjänst: modell, tröskel och feature-state laddas en gång och hålls i minnet.
+
+- step1_safe2 skriver en snapshot (modell, tröskel, feature-kolumner, prishistorik) till
+  STEP1_SERVING_STATE (default serving_state.pkl); SignalService.load() räknar features och
+  sannolikheter för hela historiken en gång, så GET /signal är en uppslagning i minnet
+- POST /price med en intradagskurs uppdaterar (eller lägger till) sista dagen och räknar om
+  bara den radens features: EMA-baserade features på de senaste FEATURE_TAIL raderna (EMA
+  glömmer geometriskt, rel. fel < 1e-9 mot hela historiken), framåt-SMA/LogReturn/RTF på
+  sitt ändliga fönster. Sedan poängsätts bara den raden (några ms totalt)
+
+    python -m src.serving --state serving_state.pkl --port 8765
+    python -m src.serving --synthetic 5000          # utan FRED, för test/lasttest
+
+Endpoints (JSON):
+    GET  /health
+    GET  /signal                 senaste dagen
+    GET  /signal?date=YYYY-MM-DD senaste handelsdagen <= date
+    POST /price  {"close": 5123.4, "date": "YYYY-MM-DD"}   date default = sista dagen
+"""
+import argparse
+import json
+import os
+import pickle
+import re
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+import numpy as np
+import pandas as pd
+
+# Add project root to path if not already there
+project_root = os.path.join(os.path.dirname(__file__), '..')
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+
+try:
+    from src.feature_registry import evaluate, warmup
+    from src.instrumentation import increment
+except ImportError:
+    from feature_registry import evaluate, warmup
+    from instrumentation import increment
+
+DEFAULT_STATE_PATH = "serving_state.pkl"
+
+# Rader bakåt för rekursiva (EMA/TEMA-baserade) features vid inkrementell uppdatering
+FEATURE_TAIL = 3000
+
+_FWD_SMA_RE = re.compile(r"^SMA_(\d+)_(avg|min)$")
+_WINDOW_RE = re.compile(r"^(LogReturn|RTF)_(\d+)")
+
+
+def _tail_rows(name) -> int:
+    """Hur många rader bakåt som behövs för att räkna featurens sista värde."""
+    m = _FWD_SMA_RE.match(name)
+    if m:
+        # n-1 senaste stängningarna + SES-nivån (alpha 0.5 glömmer på ~50 rader)
+        return int(m.group(1)) + 64
+    if _WINDOW_RE.match(name):
+        return warmup(name) + 1
+    return max(FEATURE_TAIL, 2 * warmup(name))
+
+
+class SignalService:
+    """Signal (Buy/Hold) per handelsdag från en tränad modell, med inkrementell prisuppdatering."""
+
+    def __init__(self, model, threshold, feature_cols, dates, closes, meta=None):
+        self.model = model
+        self.threshold = float(threshold)
+        self.feature_cols = list(feature_cols)
+        self.meta = dict(meta or {})
+        self.dates = np.asarray(pd.to_datetime(dates), dtype="datetime64[ns]")
+        self.closes = np.array(closes, dtype=float)  # egen kopia, uppdateras på plats
+        self.intraday = set()  # datum vars kurs kommit via POST /price
+        self._lock = threading.Lock()
+
+        # grupper av features som räknas på samma svans vid uppdatering
+        self._tail_groups = {}
+        for name in self.feature_cols:
+            self._tail_groups.setdefault(_tail_rows(name), []).append(name)
+
+        vals = evaluate(self.closes, self.feature_cols)
+        self.X = np.column_stack([vals[n][:, 0] for n in self.feature_cols])
+        self.proba = np.full(len(self.closes), np.nan)
+        ok = np.isfinite(self.X).all(axis=1)
+        if ok.any():
+            self.proba[ok] = self.model.predict_proba(self.X[ok])[:, 1]
+
+    @classmethod
+    def from_frame(cls, model, threshold, df: pd.DataFrame, feature_cols, price_col="Close", meta=None):
+        df = df.dropna(subset=[price_col])
+        return cls(model, threshold, feature_cols, df["Date"], df[price_col], meta=meta)
+
+    # --- Snapshot ---
+
+    def save(self, path=DEFAULT_STATE_PATH):
+        state = {"model": self.model, "threshold": self.threshold, "feature_cols": self.feature_cols,
+                 "dates": self.dates, "closes": self.closes, "meta": self.meta}
+        tmp = f"{path}.{os.getpid()}.tmp"
+        with open(tmp, "wb") as f:
+            pickle.dump(state, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp, path)
+
+    @classmethod
+    def load(cls, path=DEFAULT_STATE_PATH):
+        with open(path, "rb") as f:
+            state = pickle.load(f)
+        return cls(**state)
+
+    # --- Frågor ---
+
+    def _row_payload(self, i):
+        p = self.proba[i]
+        date = pd.Timestamp(self.dates[i])
+        return {
+            "date": date.strftime("%Y-%m-%d"),
+            "close": float(self.closes[i]),
+            "signal": None if np.isnan(p) else ("Buy" if p > self.threshold else "Hold"),
+            "proba_buy": None if np.isnan(p) else float(p),
+            "threshold": self.threshold,
+            "intraday": date in self.intraday,
+        }
+
+    def signal(self, date=None):
+        """Signal för senaste handelsdagen <= date (senaste dagen om date är None); None om ingen finns."""
+        with self._lock:  # update_price byter ut dates före proba/X
+            if date is None:
+                i = len(self.dates) - 1
+            else:
+                i = int(np.searchsorted(self.dates, np.datetime64(pd.Timestamp(date), "ns"), side="right")) - 1
+            if i < 0:
+                return None
+            increment("serving.signal")
+            return self._row_payload(i)
+
+    def update_price(self, close, date=None):
+        """Sätter sista dagens kurs (eller lägger till en ny dag) och poängsätter om den raden."""
+        with self._lock:
+            last = self.dates[-1]
+            date = last if date is None else np.datetime64(pd.Timestamp(date).normalize(), "ns")
+            if date < last:
+                raise ValueError(f"Bara sista dagen ({pd.Timestamp(last).date()}) eller senare kan uppdateras")
+            if date > last:
+                self.dates = np.append(self.dates, date)
+                self.closes = np.append(self.closes, float(close))
+                self.X = np.vstack([self.X, np.full((1, self.X.shape[1]), np.nan)])
+                self.proba = np.append(self.proba, np.nan)
+            else:
+                self.closes[-1] = float(close)
+
+            col = {n: j for j, n in enumerate(self.feature_cols)}
+            for tail, names in self._tail_groups.items():
+                vals = evaluate(self.closes[-tail:], names)
+                for n in names:
+                    self.X[-1, col[n]] = vals[n][-1, 0]
+            row = self.X[-1:]
+            self.proba[-1] = self.model.predict_proba(row)[0, 1] if np.isfinite(row).all() else np.nan
+            self.intraday.add(pd.Timestamp(date))
+            increment("serving.price_update")
+            return self._row_payload(len(self.dates) - 1)
+
+    def health(self):
+        with self._lock:
+            dates = self.dates
+        return {"status": "ok", "rows": int(len(dates)),
+                "first_date": pd.Timestamp(dates[0]).strftime("%Y-%m-%d"),
+                "last_date": pd.Timestamp(dates[-1]).strftime("%Y-%m-%d"),
+                "features": self.feature_cols, "threshold": self.threshold, **self.meta}
+
+
+# --- HTTP ---
+
+def _make_handler(service):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"  # keep-alive
+        # headers och body skrivs separat; utan TCP_NODELAY ger Nagle + fördröjd ACK ~40 ms per svar
+        disable_nagle_algorithm = True
+
+        def _send(self, status, payload):
+            body = json.dumps(payload).encode()
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_GET(self):
+            url = urlparse(self.path)
+            if url.path == "/health":
+                return self._send(200, service.health())
+            if url.path in ("/signal", "/signal/latest"):
+                date = parse_qs(url.query).get("date", [None])[0]
+                try:
+                    out = service.signal(date)
+                except ValueError as e:
+                    return self._send(400, {"error": str(e)})
+                if out is None:
+                    return self._send(404, {"error": f"Ingen handelsdag <= {date}"})
+                return self._send(200, out)
+            self._send(404, {"error": f"Okänd sökväg: {url.path}"})
+
+        def do_POST(self):
+            if urlparse(self.path).path != "/price":
+                return self._send(404, {"error": f"Okänd sökväg: {self.path}"})
+            try:
+                body = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+                out = service.update_price(float(body["close"]), body.get("date"))
+            except (KeyError, TypeError, ValueError) as e:
+                return self._send(400, {"error": str(e)})
+            self._send(200, out)
+
+        def log_message(self, format, *args):
+            pass  # ingen rad per request; latensen mäts av serve_load
+
+    return Handler
+
+
+def make_server(service, host="127.0.0.1", port=8765) -> ThreadingHTTPServer:
+    server = ThreadingHTTPServer((host, port), _make_handler(service))
+    server.daemon_threads = True
+    return server
+
+
+def synthetic_service(n_days=5000, model="online", seed=0) -> SignalService:
+    """Tjänst på en syntetisk GBM-serie med en snabbt tränad modell (ingen FRED/snapshot behövs)."""
+    try:
+        from src.benchmarks.synthetic import gbm_prices
+        from src.features import build_feature_set
+        from src.feature_registry import DEFAULT_FEATURES
+        from src.feature_matrix import FeatureMatrix
+        from src.labels import labels_give_data_set_with_0_or_1
+        from src.model import make_model, fit_model
+    except ImportError:
+        from benchmarks.synthetic import gbm_prices
+        from features import build_feature_set
+        from feature_registry import DEFAULT_FEATURES
+        from feature_matrix import FeatureMatrix
+        from labels import labels_give_data_set_with_0_or_1
+        from model import make_model, fit_model
+
+    df = gbm_prices(n_days, seed=seed)
+    df_lab = labels_give_data_set_with_0_or_1(build_feature_set(df)).reset_index(drop=True)
+    X, y, _ = FeatureMatrix.from_frame(df_lab, DEFAULT_FEATURES).window(0, len(df_lab), require_label=True)
+    clf = fit_model(make_model(model), X, y)
+    return SignalService.from_frame(clf, 0.5, df, DEFAULT_FEATURES, meta={"model": model, "source": "synthetic"})
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Serve Buy/Hold signals from an in-memory model.")
+    ap.add_argument("--state", default=os.environ.get("STEP1_SERVING_STATE", DEFAULT_STATE_PATH),
+                    help="Snapshot written by step1_safe2.")
+    ap.add_argument("--synthetic", type=int, default=0, help="Serve N synthetic GBM days instead of a snapshot.")
+    ap.add_argument("--model", default="online", help="Model for --synthetic.")
+    ap.add_argument("--threshold", type=float, default=None, help="Override the snapshot threshold.")
+    ap.add_argument("--host", default="127.0.0.1")
+    ap.add_argument("--port", type=int, default=8765)
+    args = ap.parse_args(argv)
+
+    t0 = time.perf_counter()
+    service = synthetic_service(args.synthetic, args.model) if args.synthetic else SignalService.load(args.state)
+    if args.threshold is not None:
+        service.threshold = args.threshold
+    server = make_server(service, args.host, args.port)
+    print(f"Loaded {len(service.dates)} days in {time.perf_counter() - t0:.2f}s; "
+          f"serving on http://{args.host}:{server.server_port}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
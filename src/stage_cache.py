@@ -0,0 +1,250 @@
+# -*- coding: utf-8 -*-
+"""
+Innehållsadresserad disk-cache för pipelinens steg (fetch -> features -> labels -> modell).
+
+Varje steg deklareras med sin funktion, sina parametrar och vilka steg den bygger på.
+Stegets nyckel är en hash av:
+  - stegets namn och parametrar
+  - kodversionen: innehållet i källfilerna för funktionen (och ev. extra moduler i code=)
+  - nycklarna för stegen den bygger på (så en ändring uppströms ogiltigförklarar allt nedströms)
+Utdata pickles till <cache_dir>/<nyckel>.pkl. Ändrar man bara modellinställningar blir
+fetch/features/labels cache-träffar direkt.
+
+Cachen har ett storlekstak: när den växer över max_bytes slängs de minst nyligen använda
+filerna (mtime uppdateras vid varje träff) tills den är under taket igen.
+
+Miljövariabler: PIPELINE_CACHE_DIR (default .stage_cache), PIPELINE_CACHE_MAX_MB (default 1024),
+PIPELINE_CACHE=0 stänger av cachen (allt räknas om, inget skrivs).
+"""
+import hashlib
+import inspect
+import json
+import os
+import pickle
+import sys
+import types
+
+import pandas as pd
+
+# Add project root to path if not already there
+project_root = os.path.join(os.path.dirname(__file__), '..')
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+
+try:
+    from src.instrumentation import increment
+except ImportError:
+    try:
+        from .instrumentation import increment
+    except ImportError:
+        from instrumentation import increment
+
+CACHE_DIR_ENV = "PIPELINE_CACHE_DIR"
+CACHE_MAX_MB_ENV = "PIPELINE_CACHE_MAX_MB"
+CACHE_ENABLED_ENV = "PIPELINE_CACHE"
+
+_source_hashes = {}
+
+
+def _source_file(obj):
+    if isinstance(obj, str):
+        return obj
+    if not isinstance(obj, types.ModuleType):
+        obj = inspect.unwrap(obj)
+    return inspect.getsourcefile(obj)
+
+
+def code_version(*objs) -> str:
+    """Hash av källfilerna för funktioner/moduler/sökvägar (cachad per fil och process)."""
+    h = hashlib.sha256()
+    for path in sorted({os.path.abspath(_source_file(o)) for o in objs}):
+        digest = _source_hashes.get(path)
+        if digest is None:
+            with open(path, "rb") as f:
+                digest = _source_hashes[path] = hashlib.sha256(f.read()).hexdigest()
+        h.update(os.path.basename(path).encode())
+        h.update(digest.encode())
+    return h.hexdigest()
+
+
+def _param_repr(params) -> str:
+    return json.dumps(params, sort_keys=True, default=repr)
+
+
+class StageCache:
+    def __init__(self, cache_dir=None, max_bytes=None, enabled=None):
+        self.cache_dir = cache_dir or os.environ.get(CACHE_DIR_ENV, ".stage_cache")
+        if max_bytes is None:
+            max_bytes = int(float(os.environ.get(CACHE_MAX_MB_ENV, "1024")) * 1024 * 1024)
+        self.max_bytes = max_bytes
+        if enabled is None:
+            enabled = os.environ.get(CACHE_ENABLED_ENV, "1") not in ("0", "false", "no")
+        self.enabled = enabled
+        self.hits = 0
+        self.misses = 0
+
+    def _path(self, key):
+        return os.path.join(self.cache_dir, key + ".pkl")
+
+    def get(self, key):
+        """(True, värde) vid träff, annars (False, None)."""
+        if not self.enabled:
+            return False, None
+        path = self._path(key)
+        try:
+            with open(path, "rb") as f:
+                value = pickle.load(f)
+        except (OSError, EOFError, pickle.UnpicklingError):
+            return False, None
+        os.utime(path)  # LRU: senast använd
+        return True, value
+
+    def put(self, key, value):
+        if not self.enabled:
+            return
+        os.makedirs(self.cache_dir, exist_ok=True)
+        path = self._path(key)
+        tmp = f"{path}.{os.getpid()}.tmp"
+        with open(tmp, "wb") as f:
+            pickle.dump(value, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp, path)
+        self.evict()
+
+    def entries(self):
+        """[(sökväg, storlek, mtime)] för alla cachefiler, äldst först."""
+        if not os.path.isdir(self.cache_dir):
+            return []
+        out = []
+        for name in os.listdir(self.cache_dir):
+            if name.endswith(".pkl"):
+                path = os.path.join(self.cache_dir, name)
+                try:
+                    st = os.stat(path)
+                except OSError:
+                    continue
+                out.append((path, st.st_size, st.st_mtime))
+        return sorted(out, key=lambda e: e[2])
+
+    def size_bytes(self):
+        return sum(size for _, size, _ in self.entries())
+
+    def evict(self):
+        """Tar bort minst nyligen använda filer tills cachen ryms under max_bytes."""
+        entries = self.entries()
+        total = sum(size for _, size, _ in entries)
+        removed = 0
+        for path, size, _ in entries:
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                continue
+            total -= size
+            removed += 1
+        return removed
+
+    def clear(self):
+        for path, _, _ in self.entries():
+            os.remove(path)
+
+
+class Pipeline:
+    """
+    Steg-DAG ovanpå StageCache. fn anropas som fn(*deps_värden, **params).
+
+        pipe = Pipeline()
+        pipe.add("fetch", fetch_sp500_from_fred, params={"start": "1999-01-01", "end": "2024-05-01"})
+        pipe.add("features", build_feature_set, deps=["fetch"], params={"price_col": "Close"})
+        df_feat = pipe.run("features")
+    """
+
+    def __init__(self, cache=None, log=None):
+        self.cache = cache if cache is not None else StageCache()
+        self.log = log
+        self._stages = {}
+        self._keys = {}
+        self._values = {}
+
+    def add(self, name, fn, deps=(), params=None, code=(), key_params=None):
+        """key_params ingår i nyckeln men skickas inte till fn (t.ex. datakällans vintage)."""
+        self._stages[name] = {"fn": fn, "deps": tuple(deps), "params": dict(params or {}),
+                              "key_params": dict(key_params or {}), "code": (fn,) + tuple(code)}
+        self._keys.clear()
+        self._values.pop(name, None)
+        return self
+
+    def key(self, name) -> str:
+        key = self._keys.get(name)
+        if key is None:
+            st = self._stages[name]
+            h = hashlib.sha256()
+            h.update(name.encode())
+            h.update(_param_repr(st["params"]).encode())
+            if st["key_params"]:
+                h.update(_param_repr(st["key_params"]).encode())
+            h.update(code_version(*st["code"]).encode())
+            for dep in st["deps"]:
+                h.update(self.key(dep).encode())
+            key = self._keys[name] = f"{name}-{h.hexdigest()[:24]}"
+        return key
+
+    def run(self, name):
+        """Värdet för steget: från minnet, från disk, eller beräknat (och då skrivet till disk)."""
+        if name in self._values:
+            return self._values[name]
+        st = self._stages[name]
+        key = self.key(name)
+        hit, value = self.cache.get(key)
+        if hit:
+            self.cache.hits += 1
+            increment("stage_cache.hit")
+        else:
+            self.cache.misses += 1
+            increment("stage_cache.miss")
+            inputs = [self.run(dep) for dep in st["deps"]]
+            value = st["fn"](*inputs, **st["params"])
+            self.cache.put(key, value)
+        if self.log:
+            self.log(f"[stage-cache] {name}: {'hit' if hit else 'computed'} ({key})")
+        self._values[name] = value
+        return value
+
+
+def sp500_pipeline(start="1999-01-01", end=None, series_id="SP500", price_col="Close",
+                   label_fn=None, label_params=None, cache=None, log=None, vintage=None) -> Pipeline:
+    """
+    Standardkedjan fetch -> features -> labels. end=None betyder idag, så fetch-steget
+    cachas per kalenderdag. vintage (t.ex. (latest_date, vintage) från freshness.probe)
+    ingår i fetch-nyckeln, så en ny observation eller revision samma dag hämtas om och
+    ogiltigförklarar features/labels. label_fn default labels_give_data_set_with_0_or_1.
+    """
+    try:
+        from src import config, feature_registry, indicators, panel_indicators
+        from src.fetch_data import fetch_sp500_from_fred, fred_root, FRED_ROOT
+        from src.features import build_feature_set
+        from src.labels import labels_give_data_set_with_0_or_1
+    except ImportError:
+        import config, feature_registry, indicators, panel_indicators
+        from fetch_data import fetch_sp500_from_fred, fred_root, FRED_ROOT
+        from features import build_feature_set
+        from labels import labels_give_data_set_with_0_or_1
+
+    if end is None:
+        end = pd.Timestamp.today().strftime("%Y-%m-%d")
+    if label_fn is None:
+        label_fn = labels_give_data_set_with_0_or_1
+    label_params = {"price_col": price_col} if label_params is None else dict(label_params)
+
+    pipe = Pipeline(cache=cache, log=log)
+    fetch_params = {"start": start, "end": end, "series_id": series_id}
+    if fred_root() != FRED_ROOT:
+        # annan källa (t.ex. FakeFred) ska inte dela cache med riktiga FRED
+        fetch_params["base_url"] = fred_root()
+    pipe.add("fetch", fetch_sp500_from_fred, params=fetch_params,
+             key_params=None if vintage is None else {"vintage": vintage})
+    pipe.add("features", build_feature_set, deps=["fetch"], params={"price_col": price_col},
+             code=(feature_registry, panel_indicators, indicators, config))
+    # config.py (LABEL_HORIZON, STD_UP_MULT, ...) ingår i koden för features och labels
+    pipe.add("labels", label_fn, deps=["features"], params=label_params, code=(config,))
+    return pipe
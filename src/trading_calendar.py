@@ -0,0 +1,90 @@
+# -*- coding: utf-8 -*-
+"""
+Handelskalender byggd en gång per serie (dagarna som faktiskt finns i datat, inte
+veckodagar), så att månadsbyten, insättningsdagar, återträningsankare och fönstergränser
+blir array-uppslag istället för pd.to_datetime(row["Date"]) rad för rad:
+
+  - ordinals:    int64 dagnummer (dagar sedan 1970-01-01) per rad, sorterade
+  - month_id:    år*12 + (månad-1) per rad
+  - day:         dag i månaden per rad
+  - month_start: radposition för första handelsdagen i varje månad
+  - deposit_rows(k):  första handelsdagen med dag >= k i varje månad (cachad per k)
+  - anchors(step):    återträningsankare var step:e rad (cachad per step)
+  - position(date):   searchsorted på ordinals
+"""
+import numpy as np
+import pandas as pd
+
+
+class TradingCalendar:
+    def __init__(self, dates):
+        d = pd.DatetimeIndex(pd.to_datetime(np.asarray(dates)))
+        self.ordinals = d.values.astype("datetime64[D]").astype(np.int64)
+        if len(self.ordinals) > 1 and (np.diff(self.ordinals) < 0).any():
+            raise ValueError("TradingCalendar kräver datumsorterade rader")
+        self.month_id = (d.year.to_numpy(np.int64) * 12 + d.month.to_numpy(np.int64) - 1)
+        self.day = d.day.to_numpy(np.int64)
+        new_month = np.ones(len(self.month_id), dtype=bool)
+        new_month[1:] = self.month_id[1:] != self.month_id[:-1]
+        self.month_start = np.flatnonzero(new_month)
+        self._deposit_cache = {}
+        self._anchor_cache = {}
+
+    @classmethod
+    def from_frame(cls, df: pd.DataFrame, date_col="Date"):
+        return cls(df[date_col])
+
+    def __len__(self):
+        return len(self.ordinals)
+
+    @staticmethod
+    def _ordinal(date) -> int:
+        return int(np.datetime64(pd.Timestamp(date).normalize(), "D").astype(np.int64))
+
+    def date(self, i) -> pd.Timestamp:
+        """Datum för radposition i (negativa index räknas från slutet)."""
+        return pd.Timestamp(np.datetime64(int(self.ordinals[i]), "D"))
+
+    def position(self, date, side="left") -> int:
+        """Radposition för date (side='left': första rad >= date, 'right': första rad > date)."""
+        return int(np.searchsorted(self.ordinals, self._ordinal(date), side=side))
+
+    def positions(self, dates, side="left") -> np.ndarray:
+        """position() för flera datum i ett anrop."""
+        ords = np.array([self._ordinal(d) for d in dates], dtype=np.int64)
+        return np.searchsorted(self.ordinals, ords, side=side)
+
+    def deposit_rows(self, monthly_day) -> np.ndarray:
+        """
+        Radpositioner för första handelsdagen med dag >= monthly_day i varje månad. Månader
+        där ingen sådan dag finns (t.ex. en avkapad sista månad) saknas.
+        """
+        rows = self._deposit_cache.get(monthly_day)
+        if rows is None:
+            cand = np.flatnonzero(self.day >= monthly_day)
+            # cand är sorterad, så första kandidaten per månad är där month_id byter värde
+            first = np.ones(len(cand), dtype=bool)
+            first[1:] = self.month_id[cand[1:]] != self.month_id[cand[:-1]]
+            rows = cand[first]
+            rows.flags.writeable = False
+            self._deposit_cache[monthly_day] = rows
+        return rows
+
+    def deposit_mask(self, monthly_day) -> np.ndarray:
+        mask = np.zeros(len(self), dtype=bool)
+        mask[self.deposit_rows(monthly_day)] = True
+        return mask
+
+    def anchors(self, step) -> np.ndarray:
+        """Återträningsankare: radpositionerna step, 2*step, ... < len."""
+        rows = self._anchor_cache.get(step)
+        if rows is None:
+            rows = np.arange(step, len(self), step, dtype=np.int64)
+            rows.flags.writeable = False
+            self._anchor_cache[step] = rows
+        return rows
+
+
+def calendar_for(dates) -> TradingCalendar:
+    """dates om det redan är en TradingCalendar, annars en ny byggd från dates."""
+    return dates if isinstance(dates, TradingCalendar) else TradingCalendar(dates)
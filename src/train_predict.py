@@ -1,42 +1,141 @@
 # -*- coding: utf-8 -*-
 """
 Rullande träning i driftläge (var 30:e handelsdag) på fast feature-set enligt Sub-model 4.
+Träningsfönstret vid ett ankare slutar på sista raden vars label är känd då (rad <= ankare -
+LABEL_HORIZON), som i backtest.py och step1_safe2.
+
+Med top_k satt rankas features (binnad MI, feature_select.SlidingMIRanker) vid varje ankare
+och modellen tränas bara på de K bästa kolumnerna; MLP:erna får då ett dolt lager på 4*K.
+Rankningen återanvänds från det senast rankade fönstret om högst rank_reuse_frac av
+träningsfönstrets rader är nya (faktisk överlappning, se _window_change), annars uppdateras
+räknetabellen inkrementellt. out.attrs["feature_ranking"] räknar rankningar och återanvändningar.
+
+Med retrain="drift" (se drift.py) tränas modellen bara om när feature- eller
+prognosfördelningen driftat från träningsfönstret, eller när den nått DRIFT_MAX_AGE rader;
+out.attrs["retrain"] rapporterar antal träningar och överhoppade fasta omträningar.
 """
+import numpy as np
 import pandas as pd
 from .schedule import retrain_anchors, training_window_indices
-from .config import RETRAIN_STEP, ROLLING_TRAIN_WINDOW
+from .config import (RETRAIN_STEP, ROLLING_TRAIN_WINDOW, ADAPTIVE_TOP_K, RANK_REUSE_FRAC,
+                     RETRAIN_MODE, DRIFT_CHECK_STEP, LABEL_HORIZON)
 from .model import make_mlp_bagging, fit_predict
+from .feature_matrix import FeatureMatrix
+from .feature_select import SlidingMIRanker, select_top_k
+from .trading_calendar import TradingCalendar
+from .drift import DriftRetrainScheduler
+from .instrumentation import increment
+
+
+def _window_change(old, new) -> float:
+    """Andel av raderna i fönstret new = [start, end) som inte fanns i old (1.0 utan old)."""
+    if old is None or new[1] <= new[0]:
+        return 1.0
+    overlap = max(0, min(old[1], new[1]) - max(old[0], new[0]))
+    return 1.0 - overlap / (new[1] - new[0])
+
+
+class AdaptiveRanking:
+    """
+    Top-K-urvalet per träningsfönster [tr_start, tr_end) (radpositioner i fm). Rankningen
+    (SlidingMIRanker) körs om bara när mer än reuse_frac av fönstrets tränbara rader är nya
+    jämfört med det senast rankade fönstret; counts räknar rankningar och återanvändningar.
+    """
+
+    def __init__(self, fm: FeatureMatrix, top_k, reuse_frac=RANK_REUSE_FRAC):
+        self.feature_cols = list(fm.feature_cols)
+        self.top_k = top_k
+        self.reuse_frac = reuse_frac
+        # Kompakta arrayer med bara tränbara rader, så rankarens fönster är [start, end) i dem
+        self.lab_rows = np.flatnonzero(fm.valid & fm.labeled)
+        self.X_lab, self.y_lab = fm.X[self.lab_rows], fm.y[self.lab_rows].astype(int)
+        self.ranker = SlidingMIRanker(self.feature_cols)
+        self.window = None
+        self.keep_idx = np.arange(len(self.feature_cols))
+        self.counts = {"computed": 0, "reused": 0}
 
-def rolling_train_predict(df_feat_label: pd.DataFrame, feature_cols):
+    def keep(self, tr_start, tr_end) -> np.ndarray:
+        start, end = (int(i) for i in np.searchsorted(self.lab_rows, [tr_start, tr_end]))
+        if _window_change(self.window, (start, end)) > self.reuse_frac:
+            scores = self.ranker.rank(self.X_lab, self.y_lab, start, end)
+            keep = set(select_top_k(self.feature_cols, scores, self.top_k))
+            self.keep_idx = np.array([i for i, c in enumerate(self.feature_cols) if c in keep])
+            self.window = (start, end)
+            self.counts["computed"] += 1
+        else:
+            self.counts["reused"] += 1
+        return self.keep_idx
+
+
+def rolling_train_predict(df_feat_label: pd.DataFrame, feature_cols, top_k=ADAPTIVE_TOP_K,
+                          rank_reuse_frac=RANK_REUSE_FRAC, retrain=RETRAIN_MODE, decision_threshold=0.5):
+    feature_cols = list(feature_cols)
     dates = df_feat_label["Date"].reset_index(drop=True)
-    anchors = retrain_anchors(dates, RETRAIN_STEP)
+
+    # retrain="fixed": omträning vid varje ankare (var RETRAIN_STEP:e rad).
+    # retrain="drift": kontroll var DRIFT_CHECK_STEP:e rad, omträning bara vid drift eller max ålder.
+    drift = retrain == "drift"
+    step = DRIFT_CHECK_STEP if drift else RETRAIN_STEP
+    anchors = retrain_anchors(TradingCalendar(dates), step)
+    scheduler = DriftRetrainScheduler() if drift else None
+
+    # En float32-matris för hela serien; tränings/testfönster nedan är vyer i den
+    fm = FeatureMatrix.from_frame(df_feat_label, feature_cols)
 
     preds = pd.Series(index=range(len(df_feat_label)), dtype=float)
     probas = pd.Series(index=range(len(df_feat_label)), dtype=float)
 
+    adaptive = top_k is not None and 0 < top_k < len(feature_cols)
+    ranking = AdaptiveRanking(fm, top_k, rank_reuse_frac) if adaptive else None
+    keep_idx = slice(None)
+    rankings = {}
+    clf = None
+    n_fits = 0
+
     for anchor in anchors:
-        tr_start, tr_end = training_window_indices(anchor, ROLLING_TRAIN_WINDOW)
-        train_slice = df_feat_label.iloc[tr_start:tr_end].copy().dropna(subset=["label"] + feature_cols)
-        if len(train_slice) < 400:
+        X_test, _, test_rows = fm.window(anchor, anchor + step)
+        if len(X_test) == 0:
             continue
 
-        X_train = train_slice[feature_cols].values
-        y_train = train_slice["label"].values
+        due, reason = scheduler.due(anchor) if drift else (True, "fixed")
+        if due:
+            # purge: labels tittar LABEL_HORIZON rader framåt, bara de som är kända vid ankaret
+            tr_start, tr_end = training_window_indices(max(anchor - LABEL_HORIZON + 1, 0),
+                                                       ROLLING_TRAIN_WINDOW)
+            X_train, y_train, _ = fm.window(tr_start, tr_end, require_label=True)
+            if len(X_train) < 400:
+                continue
 
-        next_anchor = anchor + RETRAIN_STEP
-        test_slice = df_feat_label.iloc[anchor:next_anchor].copy().dropna(subset=feature_cols)
-        if test_slice.empty:
-            continue
+            if adaptive:
+                keep_idx = ranking.keep(tr_start, tr_end)
+                rankings[dates.iloc[anchor]] = [feature_cols[i] for i in keep_idx]
 
-        X_test = test_slice[feature_cols].values
+            clf = make_mlp_bagging(decision_threshold=decision_threshold)
+            y_pred, y_proba, _ = fit_predict(clf, X_train[:, keep_idx], y_train, X_test[:, keep_idx])
+            n_fits += 1
+            if drift:
+                scheduler.fitted(anchor, X_train, reason)
+        elif clf is not None:
+            y_pred = clf.predict(X_test[:, keep_idx])
+            y_proba = clf.predict_proba(X_test[:, keep_idx])[:, 1]
+        else:
+            continue
 
-        clf = make_mlp_bagging()
-        y_pred, y_proba, _ = fit_predict(clf, X_train, y_train, X_test)
+        if drift:
+            scheduler.observe(X_test, y_proba)
 
-        preds.iloc[test_slice.index] = y_pred.astype(float)
-        probas.iloc[test_slice.index] = y_proba.astype(float)
+        pos = FeatureMatrix.positions(test_rows)
+        preds.iloc[pos] = y_pred.astype(float)
+        probas.iloc[pos] = y_proba.astype(float)
 
     out = df_feat_label.copy()
-    out["pred"] = preds
-    out["proba"] = probas
+    out["pred"] = preds.values
+    out["proba"] = probas.values
+    # valda features per ankare (tomt när alla features används)
+    out.attrs["feature_subsets"] = rankings
+    out.attrs["feature_ranking"] = ranking.counts if adaptive else {"computed": 0, "reused": 0}
+    # antal omträningar och (vid drift-schema) hur många fasta omträningar som hoppades över
+    out.attrs["retrain"] = scheduler.summary() if drift else {"fits": n_fits, "skipped": 0}
+    increment("retrain.skipped", out.attrs["retrain"]["skipped"])
+    increment("feature_rank.reused", out.attrs["feature_ranking"]["reused"])
     return out
@@ -0,0 +1,98 @@
+# -*- coding: utf-8 -*-
+"""
+Tidsbudget för träningen i en körning (t.ex. det dagliga CI-jobbet), så att pipelinen håller
+sitt schema även på långsamma runners.
+
+  - per_fit: högst så många sekunder per modellträning
+  - per_run: väggklocka för hela körningen, räknad från start(); det som återstår delas
+    jämnt på de träningar som återstår enligt plan(n_fits)
+
+allowance() ger sekunderna för nästa träning (None = ingen budget), som skickas till
+model.fit_model(..., time_budget=...). Tid som gått åt till annat (features, prognoser, en
+träning som drog över) minskar automatiskt de kommande andelarna. När andelen blir 0 tränar
+modellerna sitt minimum (en medlem/epok/iterationsomgång); exhausted() säger när inte ens det
+ryms i per_run längre, och anroparen behåller då sin senaste modell (skip()).
+
+    budget = TrainingBudget(per_run=1200).start()
+    budget.plan(25)
+    if not budget.exhausted():
+        clf = fit_model(make_model("hgb"), X, y, time_budget=budget.allowance())
+        budget.record("fit", seconds, clf.budget_info_)
+    budget.summary()   # -> run store params
+"""
+import time
+
+
+class TrainingBudget:
+    def __init__(self, per_fit=None, per_run=None):
+        self.per_fit = per_fit
+        self.per_run = per_run
+        self.planned = None
+        self.fits = []
+        self.skipped = 0
+        self._t0 = None
+
+    @property
+    def enabled(self) -> bool:
+        return self.per_fit is not None or self.per_run is not None
+
+    def start(self):
+        self._t0 = time.perf_counter()
+        return self
+
+    def elapsed(self) -> float:
+        if self._t0 is None:
+            self.start()
+        return time.perf_counter() - self._t0
+
+    def plan(self, n_fits):
+        """Förväntat antal träningar i körningen (en uppskattning räcker, se allowance)."""
+        self.planned = max(int(n_fits), 1)
+        return self
+
+    def remaining_fits(self) -> int:
+        if self.planned is None:
+            return 1
+        return max(self.planned - len(self.fits), 1)
+
+    def allowance(self):
+        """Sekunder för nästa träning: min(per_fit, återstående per_run / återstående träningar)."""
+        if not self.enabled:
+            return None
+        limits = []
+        if self.per_fit is not None:
+            limits.append(float(self.per_fit))
+        if self.per_run is not None:
+            limits.append(max(float(self.per_run) - self.elapsed(), 0.0) / self.remaining_fits())
+        return min(limits)
+
+    def exhausted(self, n_fits=1) -> bool:
+        """True när återstoden av per_run är kortare än n_fits av de snabbaste träningarna hittills."""
+        if self.per_run is None or not self.fits:
+            return False
+        fastest = min(f["seconds"] for f in self.fits)
+        return float(self.per_run) - self.elapsed() < n_fits * fastest
+
+    def skip(self):
+        """En träning som hoppades över för att budgeten var slut."""
+        self.skipped += 1
+
+    def record(self, kind, seconds, info=None, allowance=None):
+        """En genomförd träning: typ (t.ex. 'fit', 'cv'), tid, tilldelning och modellens budget_info_."""
+        self.fits.append({"kind": kind, "seconds": round(float(seconds), 3),
+                          "allowance_s": None if allowance is None else round(float(allowance), 3),
+                          "truncated": bool((info or {}).get("truncated", False)),
+                          "info": info})
+
+    def summary(self) -> dict:
+        total = sum(f["seconds"] for f in self.fits)
+        return {
+            "per_fit_s": self.per_fit, "per_run_s": self.per_run, "planned_fits": self.planned,
+            "fits": len(self.fits), "truncated_fits": sum(f["truncated"] for f in self.fits),
+            "skipped_fits": self.skipped,
+            "fit_seconds": round(total, 3), "max_fit_seconds": max((f["seconds"] for f in self.fits), default=0.0),
+            "run_seconds": round(self.elapsed(), 3) if self._t0 is not None else None,
+            "over_allowance": sum(f["allowance_s"] is not None and f["seconds"] > f["allowance_s"]
+                                  for f in self.fits),
+            "last_fit": self.fits[-1] if self.fits else None,
+        }
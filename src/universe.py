@@ -0,0 +1,253 @@
+# -*- coding: utf-8 -*-
+"""
+Kör hela pipelinen (fetch -> build_feature_set -> labels -> träning -> signal) för ett
+universum av symboler, fördelat över en processpool.
+
+- varje symbol är en uppgift; resultatet skrivs direkt som en del-fil i en gemensam
+  kolumnär katalog (<out>/signals/<symbol>.parquet, eller .csv om pyarrow saknas)
+- del-filen skrivs atomärt (tmp + rename) och fungerar som klar-markör, så en avbruten
+  körning kan återupptas: symboler som redan har en del-fil hoppas över
+- per-worker minnesgräns via RLIMIT_AS (POSIX); en symbol som tar slut på minne markeras
+  som misslyckad istället för att fälla hela körningen
+- progress/ETA skrivs efter varje klar symbol och i <out>/progress.json
+
+Laddaren (symbol -> DataFrame med Date, Close) måste vara picklebar: fred_loader för
+riktiga serier eller synthetic_loader för lokala tester utan nätverk.
+
+    python -m src.universe --symbols SP500 NASDAQCOM DJIA --workers 3 --out data/universe
+    python -m src.universe --synthetic 50 --workers 4 --out /tmp/universe
+"""
+import argparse
+import functools
+import json
+import os
+import sys
+import time
+import zlib
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import numpy as np
+import pandas as pd
+
+# Add project root to path if not already there
+project_root = os.path.join(os.path.dirname(__file__), '..')
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+
+try:
+    from src.config import RETRAIN_STEP, ROLLING_TRAIN_WINDOW, LABEL_HORIZON
+    from src.features import build_feature_set
+    from src.labels import labels_give_data_set_with_0_or_1
+    from src.model import MODEL_NAMES, make_model, fit_model
+    from src.feature_matrix import FeatureMatrix
+except ImportError:
+    from config import RETRAIN_STEP, ROLLING_TRAIN_WINDOW, LABEL_HORIZON
+    from features import build_feature_set
+    from labels import labels_give_data_set_with_0_or_1
+    from model import MODEL_NAMES, make_model, fit_model
+    from feature_matrix import FeatureMatrix
+
+try:
+    import pyarrow  # noqa: F401
+    PART_EXT = ".parquet"
+except ImportError:
+    PART_EXT = ".csv"
+
+
+# --- Laddare ---
+
+def fred_loader(symbol, start="1990-01-01"):
+    try:
+        from src.fetch_data import fetch_sp500_from_fred
+    except ImportError:
+        from fetch_data import fetch_sp500_from_fred
+    return fetch_sp500_from_fred(start=start, series_id=symbol)
+
+
+def synthetic_loader(symbol, n_days=3000):
+    """GBM-serie seedad av symbolnamnet (deterministisk, ingen nätverksåtkomst)."""
+    try:
+        from src.benchmarks.synthetic import gbm_prices
+    except ImportError:
+        from benchmarks.synthetic import gbm_prices
+    return gbm_prices(n_days, seed=zlib.crc32(str(symbol).encode()))
+
+
+# --- Pipeline per symbol ---
+
+def symbol_signals(df, model="hgb", retrain_step=RETRAIN_STEP, train_window=ROLLING_TRAIN_WINDOW,
+                   threshold=0.5, min_train=400):
+    """
+    Rullande träning (som train_predict.rolling_train_predict) för en symbol; vid varje ankare
+    tränas bara på rader vars label är känd (rad <= ankare - LABEL_HORIZON).
+    Returnerar Date, Close, label, proba_buy, Signal för rader med giltiga features.
+    """
+    df_feat = build_feature_set(df, price_col="Close")
+    df_lab = labels_give_data_set_with_0_or_1(df_feat, price_col="Close").reset_index(drop=True)
+    feature_cols = [c for c in df_lab.columns if c not in ("label", "Close", "Date")]
+    fm = FeatureMatrix.from_frame(df_lab, feature_cols)
+
+    proba = np.full(len(fm), np.nan)
+    for anchor in range(retrain_step, len(fm), retrain_step):
+        tr_end = max(anchor - LABEL_HORIZON + 1, 0)
+        X_tr, y_tr, _ = fm.window(max(0, tr_end - train_window), tr_end, require_label=True)
+        if len(X_tr) < min_train or len(np.unique(y_tr)) < 2:
+            continue
+        X_te, _, rows = fm.window(anchor, anchor + retrain_step)
+        if len(X_te) == 0:
+            continue
+        clf = fit_model(make_model(model), X_tr, y_tr)
+        proba[FeatureMatrix.positions(rows)] = clf.predict_proba(X_te)[:, 1]
+
+    out = df_lab[["Date", "Close", "label"]].copy()
+    out["proba_buy"] = proba
+    out["Signal"] = np.where(proba >= threshold, "Buy", "Hold")
+    return out[np.isfinite(proba)].reset_index(drop=True)
+
+
+# --- Worker ---
+
+def _init_worker(memory_limit_mb):
+    if memory_limit_mb:
+        try:
+            import resource
+            limit = int(memory_limit_mb) * 1024 * 1024
+            resource.setrlimit(resource.RLIMIT_AS, (limit, limit))
+        except (ImportError, ValueError, OSError):
+            pass  # plattformen saknar RLIMIT_AS (t.ex. Windows): kör utan gräns
+
+
+def _part_path(out_dir, symbol):
+    safe = "".join(ch if ch.isalnum() or ch in "-_." else "_" for ch in str(symbol))
+    return os.path.join(out_dir, "signals", safe + PART_EXT)
+
+
+def _write_part(df, path):
+    tmp = path + ".tmp"
+    if PART_EXT == ".parquet":
+        df.to_parquet(tmp, index=False)
+    else:
+        df.to_csv(tmp, index=False)
+    os.replace(tmp, path)
+
+
+def _run_symbol(symbol, loader, out_dir, model, threshold):
+    t0 = time.perf_counter()
+    try:
+        df = loader(symbol)
+        sig = symbol_signals(df, model=model, threshold=threshold)
+        sig.insert(1, "symbol", str(symbol))
+        _write_part(sig, _part_path(out_dir, symbol))
+        return {"symbol": symbol, "status": "done", "rows": int(len(sig)),
+                "seconds": time.perf_counter() - t0}
+    except MemoryError:
+        return {"symbol": symbol, "status": "failed", "error": "MemoryError (per-worker limit)",
+                "seconds": time.perf_counter() - t0}
+    except Exception as e:
+        return {"symbol": symbol, "status": "failed", "error": f"{type(e).__name__}: {e}",
+                "seconds": time.perf_counter() - t0}
+
+
+# --- Driver ---
+
+def _fmt_eta(seconds):
+    seconds = int(max(0, seconds))
+    return f"{seconds // 3600:d}h{seconds % 3600 // 60:02d}m{seconds % 60:02d}s"
+
+
+def run_universe(symbols, out_dir, loader=fred_loader, n_workers=None, memory_limit_mb=None,
+                 model="hgb", threshold=0.5, resume=True, log=print):
+    """
+    Kör pipelinen för alla symboler. Returnerar progress-dict (även skriven till progress.json).
+    resume=True hoppar över symboler som redan har en del-fil i out_dir.
+    """
+    os.makedirs(os.path.join(out_dir, "signals"), exist_ok=True)
+    progress_path = os.path.join(out_dir, "progress.json")
+    progress = {"symbols": {}}
+    if resume and os.path.exists(progress_path):
+        with open(progress_path, encoding="utf-8") as f:
+            progress = json.load(f)
+
+    symbols = list(dict.fromkeys(str(s) for s in symbols))
+    todo = [s for s in symbols if not (resume and os.path.exists(_part_path(out_dir, s)))]
+    skipped = len(symbols) - len(todo)
+    if skipped:
+        log(f"Resuming: {skipped} of {len(symbols)} symbols already done")
+
+    def _save():
+        tmp = progress_path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(progress, f, indent=2)
+        os.replace(tmp, progress_path)
+
+    t_start = time.perf_counter()
+    n_done = 0
+    with ProcessPoolExecutor(max_workers=n_workers, initializer=_init_worker,
+                             initargs=(memory_limit_mb,)) as pool:
+        futures = [pool.submit(_run_symbol, s, loader, out_dir, model, threshold) for s in todo]
+        for fut in as_completed(futures):
+            res = fut.result()
+            progress["symbols"][res["symbol"]] = res
+            n_done += 1
+            elapsed = time.perf_counter() - t_start
+            eta = elapsed / n_done * (len(todo) - n_done)
+            status = res["status"] if res["status"] == "done" else f"FAILED ({res['error']})"
+            log(f"[{n_done + skipped}/{len(symbols)}] {res['symbol']:<12} {status:<10} "
+                f"{res['seconds']:.1f}s  elapsed {_fmt_eta(elapsed)}  ETA {_fmt_eta(eta)}")
+            _save()
+
+    n_failed = sum(1 for s in symbols if progress["symbols"].get(s, {}).get("status") == "failed")
+    log(f"Universe run finished: {len(symbols) - n_failed} done, {n_failed} failed "
+        f"in {_fmt_eta(time.perf_counter() - t_start)}")
+    _save()
+    return progress
+
+
+def load_universe_signals(out_dir, symbols=None) -> pd.DataFrame:
+    """Läser ihop alla (eller valda) symbolers del-filer till en DataFrame."""
+    sig_dir = os.path.join(out_dir, "signals")
+    parts = sorted(p for p in os.listdir(sig_dir) if p.endswith((".parquet", ".csv")))
+    if symbols is not None:
+        wanted = {os.path.basename(_part_path(out_dir, s)) for s in symbols}
+        parts = [p for p in parts if p in wanted]
+    frames = []
+    for p in parts:
+        path = os.path.join(sig_dir, p)
+        frames.append(pd.read_parquet(path) if p.endswith(".parquet") else pd.read_csv(path, parse_dates=["Date"]))
+    if not frames:
+        return pd.DataFrame(columns=["Date", "symbol", "Close", "label", "proba_buy", "Signal"])
+    return pd.concat(frames, ignore_index=True)
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Run the signal pipeline over a universe of symbols.")
+    ap.add_argument("--symbols", nargs="*", default=[], help="FRED series ids.")
+    ap.add_argument("--synthetic", type=int, default=0,
+                    help="Use N synthetic GBM symbols (SYN000..) instead of FRED.")
+    ap.add_argument("--days", type=int, default=3000, help="Length of synthetic series.")
+    ap.add_argument("--out", default=os.path.join("data", "universe"))
+    ap.add_argument("--workers", type=int, default=None)
+    ap.add_argument("--memory-limit-mb", type=int, default=None)
+    ap.add_argument("--model", default="hgb", choices=list(MODEL_NAMES))
+    ap.add_argument("--threshold", type=float, default=0.5)
+    ap.add_argument("--no-resume", action="store_true")
+    args = ap.parse_args(argv)
+
+    if args.synthetic:
+        symbols = [f"SYN{i:03d}" for i in range(args.synthetic)]
+        loader = functools.partial(synthetic_loader, n_days=args.days)
+    else:
+        symbols = args.symbols
+        loader = fred_loader
+    if not symbols:
+        ap.error("give --symbols or --synthetic N")
+
+    progress = run_universe(symbols, args.out, loader=loader, n_workers=args.workers,
+                            memory_limit_mb=args.memory_limit_mb, model=args.model,
+                            threshold=args.threshold, resume=not args.no_resume)
+    failed = [s for s, r in progress["symbols"].items() if r.get("status") == "failed"]
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,7 @@
+import os
+import sys
+
+# Add project root to path if not already there (src.* importeras som i skripten)
+project_root = os.path.join(os.path.dirname(__file__), '..')
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
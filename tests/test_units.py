@@ -0,0 +1,186 @@
+# -*- coding: utf-8 -*-
+"""
+Enhetstester för de rena byggstenarna: drift-statistik, handelskalendern, DCA-simuleringen,
+stegcachens nycklar, färskhetskontrollen (mot FakeFred) och körningshistoriken.
+
+    python -m pytest -q tests
+"""
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.drift import Welford, psi
+from src.evaluate import dca_units, signal_dca_positions
+from src.freshness import has_new_data, mark_processed, probe
+from src.run_store import RunStore
+from src.stage_cache import Pipeline, StageCache
+from src.trading_calendar import TradingCalendar
+
+
+# --- drift ---
+
+def test_welford_matches_batch_statistics():
+    X = np.random.default_rng(0).normal(size=(257, 3)) * [1.0, 5.0, 0.1] + [0.0, 3.0, -2.0]
+    w = Welford()
+    w.update(X[:100]).update(X[100])
+    for block in np.array_split(X[101:], 4):
+        w.update(block)
+    w.update(X[:0])  # tomt block ändrar inget
+    assert w.n == len(X)
+    np.testing.assert_allclose(w.mean, X.mean(axis=0))
+    np.testing.assert_allclose(w.var, X.var(axis=0, ddof=1))
+
+
+def test_welford_variance_undefined_for_one_row():
+    assert np.isnan(Welford().update([1.0, 2.0]).var).all()
+
+
+def test_psi():
+    rng = np.random.default_rng(1)
+    base = rng.normal(size=5000)
+    assert psi(base, base) == pytest.approx(0.0, abs=1e-12)
+    assert psi(base, rng.normal(size=5000)) < 0.05
+    assert psi(base, rng.normal(loc=1.0, size=5000)) > 0.25
+    assert psi(base, []) == 0.0
+    # givna hinkgränser: allt i samma hink på båda sidor
+    assert psi([0.1, 0.2], [0.3, 0.4], edges=np.array([1.0])) == pytest.approx(0.0)
+
+
+# --- handelskalendern ---
+
+def test_deposit_rows_first_trading_day_on_or_after_monthly_day():
+    dates = pd.bdate_range("2024-01-01", "2024-04-20")  # april saknar dag >= 25
+    cal = TradingCalendar(dates)
+    rows = cal.deposit_rows(25)
+    assert [cal.date(i) for i in rows] == [pd.Timestamp("2024-01-25"), pd.Timestamp("2024-02-26"),
+                                           pd.Timestamp("2024-03-25")]
+    assert cal.deposit_mask(25).sum() == 3
+    assert cal.deposit_rows(25) is rows  # cachad
+
+
+def test_calendar_requires_sorted_dates():
+    with pytest.raises(ValueError):
+        TradingCalendar(pd.to_datetime(["2024-01-03", "2024-01-02"]))
+
+
+# --- DCA ---
+
+def test_signal_dca_positions_invests_all_cash_on_buy_days():
+    close = np.array([10.0, 20.0, 10.0, 20.0, 5.0])
+    buy = np.array([False, True, False, True, True])
+    cash, units = signal_dca_positions(close, buy, deposit_rows=[0, 2], contribution=100.0)
+    np.testing.assert_allclose(cash, [100.0, 0.0, 100.0, 0.0, 0.0])
+    np.testing.assert_allclose(units, [0.0, 5.0, 5.0, 10.0, 10.0])  # inget nytt att investera rad 4
+
+
+def test_signal_dca_positions_deposit_before_buy_same_day():
+    cash, units = signal_dca_positions([10.0, 10.0], [True, False], deposit_rows=[0], contribution=100.0)
+    np.testing.assert_allclose(cash, [0.0, 0.0])
+    np.testing.assert_allclose(units, [10.0, 10.0])
+
+
+def test_dca_units_and_panel_match_columns():
+    rng = np.random.default_rng(2)
+    close = 100 * np.exp(np.cumsum(rng.normal(0, 0.01, size=(60, 3)), axis=0))
+    buy = rng.random((60, 3)) < 0.2
+    deposits = np.arange(0, 60, 20)
+    np.testing.assert_allclose(dca_units(close[:, 0], deposits, 50.0),
+                               np.cumsum(np.where(np.isin(np.arange(60), deposits), 50.0 / close[:, 0], 0.0)))
+    cash, units = signal_dca_positions(close, buy, deposits)
+    for a in range(3):
+        c, u = signal_dca_positions(close[:, a], buy[:, a], deposits)
+        np.testing.assert_allclose(cash[:, a], c)
+        np.testing.assert_allclose(units[:, a], u)
+    np.testing.assert_allclose(dca_units(close, deposits)[:, 1], dca_units(close[:, 1], deposits))
+
+
+# --- stegcachen ---
+
+def _double(df, factor=2):
+    return df * factor
+
+
+def _source(n=3):
+    return pd.DataFrame({"x": np.arange(n)})
+
+
+def _pipeline(tmp_path, n=3, factor=2, key_params=None):
+    pipe = Pipeline(cache=StageCache(cache_dir=str(tmp_path), enabled=True))
+    pipe.add("source", _source, params={"n": n}, key_params=key_params)
+    pipe.add("double", _double, deps=["source"], params={"factor": factor})
+    return pipe
+
+
+def test_stage_keys_follow_params_key_params_and_upstream(tmp_path):
+    base = _pipeline(tmp_path)
+    assert base.key("double") == _pipeline(tmp_path).key("double")
+    assert base.key("double") != _pipeline(tmp_path, factor=3).key("double")
+    assert base.key("source") == _pipeline(tmp_path, factor=3).key("source")
+    # parametrar och key_params uppströms ogiltigförklarar nedströms
+    assert base.key("double") != _pipeline(tmp_path, n=4).key("double")
+    vintaged = _pipeline(tmp_path, key_params={"vintage": ("2026-10-16", "v1")})
+    assert vintaged.key("source") != base.key("source")
+    assert vintaged.key("double") != base.key("double")
+    assert vintaged.key("double") != _pipeline(tmp_path, key_params={"vintage": ("2026-10-19", "v2")}).key("double")
+
+
+def test_stage_cache_hit_returns_stored_value(tmp_path):
+    first = _pipeline(tmp_path)
+    out = first.run("double")
+    assert first.cache.misses == 2 and first.cache.hits == 0
+    second = _pipeline(tmp_path)
+    pd.testing.assert_frame_equal(second.run("double"), out)
+    assert second.cache.hits == 1 and second.cache.misses == 0  # source behövs inte vid träff
+
+
+# --- färskhetskontrollen ---
+
+def test_freshness_probe_against_fake_fred(tmp_path):
+    from src.benchmarks.fake_fred import FakeFred
+
+    path = str(tmp_path / "freshness.json")
+    with FakeFred(n_days=300) as fred:
+        new, info = has_new_data("SP500", path=path)
+        assert new and info["latest_date"] == str(fred.end)
+        assert info["requests"] == 2
+        mark_processed(info, path=path)
+
+        new, info = has_new_data("SP500", path=path)
+        assert not new
+        assert info["requests"] == 1  # samma vintage: inget observationsanrop
+
+        fred.append("SP500", 1234.5)
+        info = probe("SP500", path=path)
+        assert info["new_data"]
+        assert info["latest_date"] == pd.Timestamp.today().strftime("%Y-%m-%d")
+        assert info["value"] == pytest.approx(1234.5)
+
+
+# --- körningshistoriken ---
+
+def test_run_store_round_trip(tmp_path):
+    df = pd.DataFrame({"Date": pd.bdate_range("2024-01-01", periods=4), "Close": [1.0, 2.0, 3.0, 4.0],
+                       "pred": [1.0, 0.0, 1.0, np.nan], "proba": [0.9, 0.2, 0.7, np.nan],
+                       "label": [1.0, 1.0, 0.0, np.nan]})
+    report = pd.DataFrame([{"window_start": "2024-01-01", "window_end": "2024-03-01", "TP": 1, "TN": 0,
+                            "FP": 1, "FN": 1, "precision_1": 0.5, "recall_1": 0.5, "f1_1": 0.5, "n": 3}])
+    with RunStore(str(tmp_path / "runs.sqlite")) as store:
+        run_id = store.start_run("test", kind="backtest", params={"threshold": 0.4})
+        assert store.add_signals(run_id, df) == 4
+        store.add_window_metrics(run_id, report)
+        store.set_model_meta(run_id, "mlp_bagging", 0.4, "2024-01-04", ["a", "b"])
+
+        runs = store.runs(kind="backtest")
+        assert runs["run_id"].tolist() == [run_id]
+        sig = store.signals([run_id])
+        assert sig["date"].tolist() == df["Date"].tolist()
+        assert sig["signal"].tolist()[:3] == ["Buy", "Hold", "Buy"]
+        np.testing.assert_allclose(sig["proba_buy"].to_numpy(float)[:3], [0.9, 0.2, 0.7])
+        assert sig["label"].iloc[3] is None or pd.isna(sig["label"].iloc[3])
+        assert len(store.signals([run_id], start="2024-01-02", end="2024-01-03")) == 2
+        assert store.window_metrics([run_id])[["tp", "fp", "fn", "n"]].iloc[0].tolist() == [1, 1, 1, 3]
+        meta = store.model_meta([run_id]).iloc[0]
+        assert (meta["model"], meta["threshold"], meta["n_features"]) == ("mlp_bagging", 0.4, 2)
+
+        store.delete_run(run_id)
+        assert store.runs().empty and store.signals().empty